@@ -0,0 +1,70 @@
+# 透光、不算碰撞的方塊（樹葉）；網格、碰撞與放置檢查共用
+NON_SOLID_BLOCKS = frozenset({"oak_leaves", "birch_leaves"})
+
+# 材質會依座標隨機旋轉的自然方塊；草地只旋轉頂面
+ROTATABLE_BLOCKS = frozenset({
+    "grass_block", "dirt", "sand", "stone", "oak_leaves", "birch_leaves",
+    "gravel", "coal_ore", "iron_ore", "gold_ore", "diamond_ore", "lapis_ore",
+})
+
+# 各面材質不同的方塊，順序同 face_index：右、左、上、下、後、前
+FACE_TEXTURES = {
+    "grass_block": ("grass_block_side", "grass_block_side", "grass_block_top", "grass_block_bottom", "grass_block_side", "grass_block_side"),
+    "oak_log": ("oak_log_side", "oak_log_side", "oak_log_top", "oak_log_top", "oak_log_side", "oak_log_side"),
+    "birch_log": ("birch_log_side", "birch_log_side", "birch_log_top", "birch_log_top", "birch_log_side", "birch_log_side"),
+    "crafting_table": ("crafting_table_side", "crafting_table_side", "crafting_table_top", "oak_planks", "crafting_table_front", "crafting_table_side"),
+}
+
+# 物品欄圖示用的材質（沒列出的直接用物品名稱）
+ICON_TEXTURES = {
+    "grass_block": "grass_block_top",
+    "oak_log": "oak_log_side",
+    "birch_log": "birch_log_side",
+    "crafting_table": "crafting_table_top",
+}
+
+
+class BlockRegistry:
+    """啟動時把每個方塊 ID 編譯成查表：六個面的材質、是否隨機旋轉、是否透光、是否擋光。
+
+    以 ID 為索引的串列給網格產生器用；手持方塊與物品圖示則以名稱查詢（不會替物品登錄調色盤 ID）。
+    找不到材質的方塊一律用 default_texture。
+    """
+
+    def __init__(self, palette, texture_keys, default_texture="stone"):
+        self.palette = palette
+        self.texture_keys = frozenset(texture_keys)
+        self.default_texture = default_texture
+        self._faces_by_name = {}
+        self.face_textures = []
+        self.rotate_faces = []
+        self.transparent = bytearray()
+        self.opaque = bytearray()
+        self.refresh()
+
+    def refresh(self):
+        names = list(self.palette.names)
+        self.face_textures = [self.block_faces(name) if name else None for name in names]
+        self.rotate_faces = [self._rotate_faces(name) if name else None for name in names]
+        self.transparent = bytearray(1 if name in NON_SOLID_BLOCKS else 0 for name in names)
+        # 會擋住天空光、產生 ambient occlusion 的方塊（空氣與樹葉以外）
+        self.opaque = bytearray(1 if name and name not in NON_SOLID_BLOCKS else 0 for name in names)
+
+    def ensure(self, block_id):
+        # 背景生成可能登錄新方塊，查表前確認長度足夠
+        if block_id >= len(self.face_textures): self.refresh()
+
+    def block_faces(self, name):
+        faces = self._faces_by_name.get(name)
+        if faces is None:
+            faces = FACE_TEXTURES.get(name) or (name,) * 6
+            faces = self._faces_by_name[name] = tuple(key if key in self.texture_keys else self.default_texture for key in faces)
+        return faces
+
+    def icon_texture(self, name):
+        return ICON_TEXTURES.get(name, name)
+
+    @staticmethod
+    def _rotate_faces(name):
+        if name == "grass_block": return (False, False, True, False, False, False)
+        return (name in ROTATABLE_BLOCKS,) * 6
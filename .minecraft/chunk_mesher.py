@@ -0,0 +1,67 @@
+# 每個面的 (法線軸, 紋理 u 軸, 紋理 v 軸)，順序同 Game.get_block_face_vertices 的 face_index
+FACE_AXES = [(0, 2, 1), (0, 2, 1), (1, 0, 2), (1, 0, 2), (2, 0, 1), (2, 0, 1)]
+
+# 與 get_block_face_vertices 相同的單位方塊頂點與各面頂點順序
+_UNIT_CUBE = [(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0), (0, 0, 1), (1, 0, 1), (1, 1, 1), (0, 1, 1)]
+_FACE_VERTEX_INDICES = [(1, 5, 6, 2), (4, 0, 3, 7), (3, 2, 6, 7), (4, 5, 1, 0), (4, 5, 6, 7), (1, 0, 3, 2)]
+_RECT_CORNERS = [(0, 0), (1, 0), (1, 1), (0, 1)]
+
+
+def _face_table(face_index, rotation):
+    indices, tc_order = _FACE_VERTEX_INDICES[face_index], (0, 1, 2, 3)
+    if face_index < 4:
+        # 左右上下四個面反轉頂點順序，所有面從外面看都是逆時針
+        indices, tc_order = indices[:1] + indices[:0:-1], (0, 3, 2, 1)
+    return tuple(_UNIT_CUBE[vertex] + _RECT_CORNERS[(tc_order[corner] + rotation) % 4] for corner, vertex in enumerate(indices))
+
+
+# FACE_TABLES[面][旋轉] = 4 個角的 (dx, dy, dz, 材質 u 角, 材質 v 角)，各值為 0 或 1
+FACE_TABLES = [[_face_table(face_index, rotation) for rotation in range(4)] for face_index in range(6)]
+
+
+def _face_extents(face_index, size_u, size_v):
+    extents = [1, 1, 1]
+    _, u_axis, v_axis = FACE_AXES[face_index]
+    extents[u_axis] = size_u; extents[v_axis] = size_v
+    return extents
+
+
+# 緊湊頂點裡區塊內 x、z 與材質 u、v 跨度各佔一個 byte，合併面的邊長不能超過這個值
+MAX_PACKED_FACE_SPAN = 255
+
+
+def append_packed_face(out, x, y, z, face_index, size_u, size_v, rotation, layer, light):
+    """把一個 (可能已合併的) 面直接寫進 array('H')：每角 4 個 16 位元值，材質座標以方塊為單位。
+
+    y 以二補數存（著色器當 GL_SHORT 讀）；其餘三個值各裝兩個 byte：x | z << 8、u | v << 8、材質層 | 亮度 << 8，
+    light 為四個角的亮度 (0..255)。
+    """
+    ex, ey, ez = _face_extents(face_index, size_u, size_v)
+    # 旋轉 90/270 度時紋理的 u、v 跨度互換，才不會被拉伸
+    tu, tv = (size_v, size_u) if rotation & 1 else (size_u, size_v)
+    c0, c1, c2, c3 = FACE_TABLES[face_index][rotation]
+    l0, l1, l2, l3 = (value << 8 | layer for value in light)
+    out.extend(((y + c0[1] * ey) & 0xFFFF, (x + c0[0] * ex) | (z + c0[2] * ez) << 8, c0[3] * tu | c0[4] * tv << 8, l0,
+                (y + c1[1] * ey) & 0xFFFF, (x + c1[0] * ex) | (z + c1[2] * ez) << 8, c1[3] * tu | c1[4] * tv << 8, l1,
+                (y + c2[1] * ey) & 0xFFFF, (x + c2[0] * ex) | (z + c2[2] * ez) << 8, c2[3] * tu | c2[4] * tv << 8, l2,
+                (y + c3[1] * ey) & 0xFFFF, (x + c3[0] * ex) | (z + c3[2] * ez) << 8, c3[3] * tu | c3[4] * tv << 8, l3))
+
+
+def append_float_face(vertices, tex_coords, colors, x, y, z, face_index, size_u, size_v, rotation, light, uv_rect=None):
+    """固定管線用：頂點寫進 vertices、材質座標寫進 tex_coords（皆為 array('f')），四個角的亮度寫進 colors（array('B')，灰階 RGB）。
+
+    有 uv_rect 時材質座標落在圖集格子 (u0, v0, u1, v1) 內（只用於 1x1 的面），否則以方塊為單位給 GL_REPEAT 材質。
+    """
+    ex, ey, ez = _face_extents(face_index, size_u, size_v)
+    if uv_rect:
+        base_u, base_v, span_u, span_v = uv_rect[0], uv_rect[1], uv_rect[2] - uv_rect[0], uv_rect[3] - uv_rect[1]
+    else:
+        base_u = base_v = 0.0
+        span_u, span_v = (size_v, size_u) if rotation & 1 else (size_u, size_v)
+    c0, c1, c2, c3 = FACE_TABLES[face_index][rotation]
+    vertices.extend((x + c0[0] * ex, y + c0[1] * ey, z + c0[2] * ez, x + c1[0] * ex, y + c1[1] * ey, z + c1[2] * ez,
+                     x + c2[0] * ex, y + c2[1] * ey, z + c2[2] * ez, x + c3[0] * ex, y + c3[1] * ey, z + c3[2] * ez))
+    tex_coords.extend((base_u + c0[3] * span_u, base_v + c0[4] * span_v, base_u + c1[3] * span_u, base_v + c1[4] * span_v,
+                       base_u + c2[3] * span_u, base_v + c2[4] * span_v, base_u + c3[3] * span_u, base_v + c3[4] * span_v))
+    l0, l1, l2, l3 = light
+    colors.extend((l0, l0, l0, l1, l1, l1, l2, l2, l2, l3, l3, l3))
@@ -0,0 +1,220 @@
+import ctypes
+import logging
+from array import array
+
+import pyglet.gl as gl
+
+# 每個頂點 4 個 16 位元值，共 8 bytes：y（有號）、x | z << 8（區塊內座標）、u | v << 8（材質座標，以方塊為單位）、
+# 材質陣列層號 | 亮度 << 8（0..255，天空光與 ambient occlusion 預先烘焙）；著色器用算術拆開，與位元組順序無關
+VERTEX_COMPONENTS = 4
+VERTEX_STRIDE = VERTEX_COMPONENTS * ctypes.sizeof(gl.GLushort)
+ATTRIB_POSITION = 0
+ATTRIB_TEXCOORD = 1
+
+VERTEX_SHADER = """#version 130
+uniform vec3 u_chunk_origin;
+in float a_position;
+in vec3 a_texcoord;
+out vec3 v_texcoord;
+out float v_light;
+out float v_fog_depth;
+void main() {
+    vec3 high = floor(a_texcoord / 256.0);
+    vec3 low = a_texcoord - high * 256.0;
+    vec4 eye_position = gl_ModelViewMatrix * vec4(vec3(low.x, a_position, high.x) + u_chunk_origin, 1.0);
+    v_texcoord = vec3(low.y, high.y, low.z);
+    v_light = high.z / 255.0;
+    v_fog_depth = abs(eye_position.z);
+    gl_Position = gl_ProjectionMatrix * eye_position;
+}
+"""
+
+# 與固定管線相同的效果：GL_ALPHA_TEST (> 0.5)、頂點顏色調變材質與線性 GL_FOG
+FRAGMENT_SHADER = """#version 130
+uniform sampler2DArray u_textures;
+uniform vec4 u_fog_color;
+uniform vec2 u_fog_range;
+in vec3 v_texcoord;
+in float v_light;
+in float v_fog_depth;
+void main() {
+    vec4 color = texture(u_textures, v_texcoord);
+    if (color.a <= 0.5) discard;
+    color.rgb *= v_light;
+    float fog = clamp((u_fog_range.y - v_fog_depth) / (u_fog_range.y - u_fog_range.x), 0.0, 1.0);
+    gl_FragColor = vec4(mix(u_fog_color.rgb, color.rgb, fog), color.a);
+}
+"""
+
+
+def _compile_shader(shader_type, source):
+    shader = gl.glCreateShader(shader_type)
+    source_buffer = ctypes.create_string_buffer(source.encode("utf-8"))
+    source_pointer = ctypes.cast(ctypes.pointer(ctypes.pointer(source_buffer)), ctypes.POINTER(ctypes.POINTER(gl.GLchar)))
+    gl.glShaderSource(shader, 1, source_pointer, None)
+    gl.glCompileShader(shader)
+    status = gl.GLint(0)
+    gl.glGetShaderiv(shader, gl.GL_COMPILE_STATUS, ctypes.byref(status))
+    if not status.value:
+        log = ctypes.create_string_buffer(4096)
+        gl.glGetShaderInfoLog(shader, len(log), None, log)
+        gl.glDeleteShader(shader)
+        raise RuntimeError(f"著色器編譯失敗: {log.value.decode(errors='replace')}")
+    return shader
+
+
+def _link_program(vertex_source, fragment_source):
+    program = gl.glCreateProgram()
+    shaders = [_compile_shader(gl.GL_VERTEX_SHADER, vertex_source), _compile_shader(gl.GL_FRAGMENT_SHADER, fragment_source)]
+    for shader in shaders: gl.glAttachShader(program, shader)
+    gl.glBindAttribLocation(program, ATTRIB_POSITION, b"a_position")
+    gl.glBindAttribLocation(program, ATTRIB_TEXCOORD, b"a_texcoord")
+    gl.glLinkProgram(program)
+    for shader in shaders: gl.glDeleteShader(shader)
+    status = gl.GLint(0)
+    gl.glGetProgramiv(program, gl.GL_LINK_STATUS, ctypes.byref(status))
+    if not status.value:
+        log = ctypes.create_string_buffer(4096)
+        gl.glGetProgramInfoLog(program, len(log), None, log)
+        gl.glDeleteProgram(program)
+        raise RuntimeError(f"著色器連結失敗: {log.value.decode(errors='replace')}")
+    return program
+
+
+def _layer_pixels(image, size):
+    """取出 RGBA 像素；尺寸不同的材質以最近鄰縮放成 size x size，才能放進同一個材質陣列。"""
+    image_data = image.get_image_data()
+    width, height = image_data.width, image_data.height
+    pixels = image_data.get_data("RGBA", width * 4)
+    if width == size and height == size: return pixels
+    scaled = bytearray(size * size * 4)
+    for y in range(size):
+        source_row = (y * height // size) * width
+        for x in range(size):
+            source = (source_row + x * width // size) * 4
+            target = (y * size + x) * 4
+            scaled[target:target + 4] = pixels[source:source + 4]
+    return bytes(scaled)
+
+
+# 每個四邊形的兩個三角形（0, 1, 2）與（0, 2, 3）
+QUAD_TRIANGLE_CORNERS = (0, 1, 2, 0, 2, 3)
+
+
+class QuadIndexBuffer:
+    """所有區塊共用的索引 buffer：每個區塊的四邊形索引模式都相同，只在遇到更多四邊形的區塊時加大。
+
+    加大時沿用同一個 buffer 名稱重新配置，已經記住它的 VAO 不必更新。
+    """
+
+    index_type = gl.GL_UNSIGNED_INT
+    index_size = ctypes.sizeof(gl.GLuint)
+
+    def __init__(self, initial_quads=4096):
+        self.ibo = gl.GLuint(0); gl.glGenBuffers(1, ctypes.byref(self.ibo))
+        self.capacity = 0
+        self.ensure(initial_quads)
+
+    def ensure(self, quad_count):
+        """確保至少能畫 quad_count 個四邊形；呼叫時不可綁著區塊的 VAO，否則會改到那個 VAO 的索引綁定。"""
+        if quad_count <= self.capacity: return
+        capacity = max(quad_count, self.capacity * 2)
+        indices = array('I', (base + corner for base in range(0, capacity * 4, 4) for corner in QUAD_TRIANGLE_CORNERS))
+        gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+        gl.glBufferData(gl.GL_ELEMENT_ARRAY_BUFFER, len(indices) * indices.itemsize, (gl.GLuint * len(indices)).from_buffer(indices), gl.GL_STATIC_DRAW)
+        gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, 0)
+        self.capacity = capacity
+
+
+class ChunkVertexBuffer:
+    """一個區塊在 GPU 上的網格：自己的頂點 buffer 加上共用的索引 buffer，不透明面在前、透明面（樹葉）在後。"""
+
+    def __init__(self, origin, vertices, opaque_quads, transparent_quads, quad_indices):
+        self.origin = origin
+        self.opaque_quads = opaque_quads
+        self.transparent_quads = transparent_quads
+        self.vertex_count = len(vertices) // VERTEX_COMPONENTS
+        quad_indices.ensure(opaque_quads + transparent_quads)
+        self.index_type, self.index_size = quad_indices.index_type, quad_indices.index_size
+
+        self.vao = gl.GLuint(0); gl.glGenVertexArrays(1, ctypes.byref(self.vao))
+        self.vbo = gl.GLuint(0); gl.glGenBuffers(1, ctypes.byref(self.vbo))
+        gl.glBindVertexArray(self.vao)
+        vertex_data = (gl.GLushort * len(vertices)).from_buffer(vertices) if len(vertices) else None
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, self.vbo)
+        gl.glBufferData(gl.GL_ARRAY_BUFFER, len(vertices) * ctypes.sizeof(gl.GLushort), vertex_data, gl.GL_STATIC_DRAW)
+        gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, quad_indices.ibo)
+        gl.glEnableVertexAttribArray(ATTRIB_POSITION)
+        gl.glVertexAttribPointer(ATTRIB_POSITION, 1, gl.GL_SHORT, gl.GL_FALSE, VERTEX_STRIDE, 0)
+        gl.glEnableVertexAttribArray(ATTRIB_TEXCOORD)
+        gl.glVertexAttribPointer(ATTRIB_TEXCOORD, 3, gl.GL_UNSIGNED_SHORT, gl.GL_FALSE, VERTEX_STRIDE, ctypes.sizeof(gl.GLushort))
+        gl.glBindVertexArray(0)
+        gl.glBindBuffer(gl.GL_ARRAY_BUFFER, 0)
+        gl.glBindBuffer(gl.GL_ELEMENT_ARRAY_BUFFER, 0)
+
+    def delete(self):
+        if not self.vao: return
+        gl.glDeleteVertexArrays(1, ctypes.byref(self.vao))
+        gl.glDeleteBuffers(1, ctypes.byref(self.vbo))
+        self.vao = None
+
+
+class ShaderChunkRenderer:
+    """以著色器繪製區塊：材質放進 GL_TEXTURE_2D_ARRAY（每張材質一層、可 GL_REPEAT），每個區塊一次 glDrawElements。
+
+    需要 OpenGL 3.0；不支援或著色器編譯失敗時建構子會丟出例外，呼叫端改用原本的 Batch 繪製。
+    """
+
+    def __init__(self, block_images):
+        if not gl.gl_info.have_version(3, 0):
+            raise RuntimeError(f"需要 OpenGL 3.0，目前為 {gl.gl_info.get_version()}")
+        if not block_images:
+            raise RuntimeError("沒有可用的方塊材質")
+        self.program = _link_program(VERTEX_SHADER, FRAGMENT_SHADER)
+        self.uniform_chunk_origin = gl.glGetUniformLocation(self.program, b"u_chunk_origin")
+        self.uniform_fog_color = gl.glGetUniformLocation(self.program, b"u_fog_color")
+        self.uniform_fog_range = gl.glGetUniformLocation(self.program, b"u_fog_range")
+        gl.glUseProgram(self.program)
+        gl.glUniform1i(gl.glGetUniformLocation(self.program, b"u_textures"), 0)
+        gl.glUseProgram(0)
+        self.layers = {texture_key: layer for layer, texture_key in enumerate(block_images)}
+        self._build_texture_array(block_images)
+        self.quad_indices = QuadIndexBuffer()
+
+    def _build_texture_array(self, block_images):
+        size = max(max(image.width, image.height) for image in block_images.values())
+        self.texture = gl.GLuint(0); gl.glGenTextures(1, ctypes.byref(self.texture))
+        gl.glBindTexture(gl.GL_TEXTURE_2D_ARRAY, self.texture)
+        gl.glTexImage3D(gl.GL_TEXTURE_2D_ARRAY, 0, gl.GL_RGBA8, size, size, len(block_images), 0, gl.GL_RGBA, gl.GL_UNSIGNED_BYTE, None)
+        for texture_key, image in block_images.items():
+            pixels = _layer_pixels(image, size)
+            gl.glTexSubImage3D(gl.GL_TEXTURE_2D_ARRAY, 0, 0, 0, self.layers[texture_key], size, size, 1, gl.GL_RGBA, gl.GL_UNSIGNED_BYTE, pixels)
+        gl.glTexParameteri(gl.GL_TEXTURE_2D_ARRAY, gl.GL_TEXTURE_MIN_FILTER, gl.GL_NEAREST)
+        gl.glTexParameteri(gl.GL_TEXTURE_2D_ARRAY, gl.GL_TEXTURE_MAG_FILTER, gl.GL_NEAREST)
+        gl.glTexParameteri(gl.GL_TEXTURE_2D_ARRAY, gl.GL_TEXTURE_WRAP_S, gl.GL_REPEAT)
+        gl.glTexParameteri(gl.GL_TEXTURE_2D_ARRAY, gl.GL_TEXTURE_WRAP_T, gl.GL_REPEAT)
+        gl.glBindTexture(gl.GL_TEXTURE_2D_ARRAY, 0)
+        logging.info(f"材質陣列 {size}x{size}，共 {len(block_images)} 層。")
+
+    def upload(self, origin, vertices, opaque_quads, transparent_quads):
+        return ChunkVertexBuffer(origin, vertices, opaque_quads, transparent_quads, self.quad_indices)
+
+    def begin(self, fog_color, fog_range):
+        gl.glUseProgram(self.program)
+        gl.glActiveTexture(gl.GL_TEXTURE0)
+        gl.glBindTexture(gl.GL_TEXTURE_2D_ARRAY, self.texture)
+        gl.glUniform4f(self.uniform_fog_color, *fog_color)
+        gl.glUniform2f(self.uniform_fog_range, *fog_range)
+
+    def draw(self, mesh, transparent=False):
+        quad_count = mesh.transparent_quads if transparent else mesh.opaque_quads
+        if quad_count == 0: return
+        first_index = mesh.opaque_quads * 6 if transparent else 0
+        gl.glUniform3f(self.uniform_chunk_origin, *mesh.origin)
+        gl.glBindVertexArray(mesh.vao)
+        gl.glDrawElements(gl.GL_TRIANGLES, quad_count * 6, mesh.index_type, first_index * mesh.index_size)
+
+    def end(self):
+        gl.glBindVertexArray(0)
+        gl.glBindTexture(gl.GL_TEXTURE_2D_ARRAY, 0)
+        gl.glUseProgram(0)
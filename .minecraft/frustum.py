@@ -0,0 +1,50 @@
+import math
+
+
+def _perspective_matrix(fov_y, aspect, z_near, z_far):
+    # 與 game.gluPerspective 相同的 glFrustum 對稱投影矩陣（row-major，m[i][j] 為第 i 列第 j 行）
+    f = 1.0 / math.tan(math.radians(fov_y) / 2)
+    return [
+        [f / aspect, 0.0, 0.0, 0.0],
+        [0.0, f, 0.0, 0.0],
+        [0.0, 0.0, -(z_far + z_near) / (z_far - z_near), -2.0 * z_far * z_near / (z_far - z_near)],
+        [0.0, 0.0, -1.0, 0.0],
+    ]
+
+
+def _multiply(a, b):
+    return [[sum(a[i][k] * b[k][j] for k in range(4)) for j in range(4)] for i in range(4)]
+
+
+def _view_matrix(yaw, pitch, eye):
+    # 對應 setup_3d：glRotatef(-pitch, 1,0,0) -> glRotatef(-yaw, 0,1,0) -> glTranslatef(-eye)
+    cp, sp = math.cos(math.radians(-pitch)), math.sin(math.radians(-pitch))
+    cy, sy = math.cos(math.radians(-yaw)), math.sin(math.radians(-yaw))
+    rotate_x = [[1.0, 0.0, 0.0, 0.0], [0.0, cp, -sp, 0.0], [0.0, sp, cp, 0.0], [0.0, 0.0, 0.0, 1.0]]
+    rotate_y = [[cy, 0.0, sy, 0.0], [0.0, 1.0, 0.0, 0.0], [-sy, 0.0, cy, 0.0], [0.0, 0.0, 0.0, 1.0]]
+    translate = [[1.0, 0.0, 0.0, -eye[0]], [0.0, 1.0, 0.0, -eye[1]], [0.0, 0.0, 1.0, -eye[2]], [0.0, 0.0, 0.0, 1.0]]
+    return _multiply(_multiply(rotate_x, rotate_y), translate)
+
+
+def build_frustum_planes(fov_y, aspect, z_near, z_far, yaw, pitch, eye):
+    """由相機參數求出視錐的 6 個平面 (a, b, c, d)，點在平面內側時 a*x + b*y + c*z + d >= 0。"""
+    m = _multiply(_perspective_matrix(fov_y, aspect, z_near, z_far), _view_matrix(yaw, pitch, eye))
+    row_x, row_y, row_z, row_w = m
+    planes = []
+    for row, sign in ((row_x, 1), (row_x, -1), (row_y, 1), (row_y, -1), (row_z, 1), (row_z, -1)):
+        planes.append(tuple(row_w[i] + sign * row[i] for i in range(4)))
+    return planes
+
+
+def aabb_in_frustum(planes, min_corner, max_corner):
+    """軸對齊方塊只要有一部分可能在視錐內就回傳 True（保守判斷，不會誤刪可見區塊）。"""
+    min_x, min_y, min_z = min_corner
+    max_x, max_y, max_z = max_corner
+    for a, b, c, d in planes:
+        # 取在平面法向量方向上最遠的頂點，連它都在外側代表整個方塊都在外側
+        x = max_x if a >= 0 else min_x
+        y = max_y if b >= 0 else min_y
+        z = max_z if c >= 0 else min_z
+        if a * x + b * y + c * z + d < 0:
+            return False
+    return True
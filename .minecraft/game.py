@@ -5,11 +5,28 @@ import logging
 import random
 import time
 import sys
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 
 import pyglet
 import pyglet.gl as gl
 
 from pyglet.window import mouse, key
+
+from world_store import WorldStore, CHUNK_SIZE
+from region_file import RegionStorage, migrate_json_world
+import terrain
+from frustum import build_frustum_planes, aabb_in_frustum
+from greedy_mesh import merge_faces
+from chunk_renderer import ShaderChunkRenderer, ChunkVertexBuffer
+from chunk_mesher import FACE_AXES, MAX_PACKED_FACE_SPAN, append_packed_face, append_float_face
+from block_registry import BlockRegistry, NON_SOLID_BLOCKS
+from raycast import raycast_voxels
+from profiler import FrameProfiler
+from physics import SolidBlockLookup, aabb_overlaps_solid, sweep_aabb_axis
+from lighting import SkyHeightMap, ChunkLightSampler, light_merge_direction, MERGE_ANY, MERGE_ALONG_U
+from hud import RetainedHudLayer, TextCache, ChatLog, LineWidthGroup, add_shadowed_text, quad_vertices, outline_vertices, LAYOUT_ORDER, ITEM_ORDER, OUTLINE_ORDER, HIGHLIGHT_ORDER
 MAIN_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
 GAME_LOG_DIR = os.path.join(MAIN_SCRIPT_DIR, "log")
@@ -22,7 +39,7 @@ if __name__ == "__main__":
         level=logging.INFO,
         format='%(asctime)s - %(levelname)s - %(module)s.%(funcName)s:%(lineno)d - %(message)s',
         handlers=[
-            logging.FileHandler(game_log_file, mode='w', encoding='utf-8'),
+            logging.FileHandler(game_log_file, mode='w', encoding='utf-8', delay=True),
             logging.StreamHandler(sys.stdout) 
         ]
     )
@@ -31,7 +48,7 @@ else:
         level=logging.INFO,
         format='%(asctime)s - %(levelname)s - %(module)s.%(funcName)s:%(lineno)d - %(message)s',
         handlers=[
-            logging.FileHandler(game_log_file, mode='w', encoding='utf-8')
+            logging.FileHandler(game_log_file, mode='w', encoding='utf-8', delay=True)
         ]
     )
 # --------------------------------
@@ -41,11 +58,45 @@ def gluPerspective(fovY, aspect, zNear, zFar):
     fW = fH * aspect
     gl.glFrustum(-fW, fW, -fH, fH, zNear, zFar)
 
+
+# 物品格的容器名稱 -> Game 上的串列屬性（合成結果另外處理）
+SLOT_CONTAINER_ATTRS = {'hotbar': 'hotbar', 'main': 'main_inventory', 'craft_inv': 'inventory_crafting_grid', 'craft_table': 'crafting_table_grid'}
+
+class NoCullGroup(pyglet.graphics.Group):
+    """樹葉等半透明方塊可從孔隙看到背面，繪製時暫時關閉背面剔除。"""
+    def set_state(self):
+        gl.glDisable(gl.GL_CULL_FACE)
+
+    def unset_state(self):
+        gl.glEnable(gl.GL_CULL_FACE)
+
 class Game:
     def __init__(self, window):
         self.window = window
         logging.info("遊戲引擎初始化開始...")
-        self.world_batch = pyglet.graphics.Batch()
+        self.chunk_meshes = {}
+        self.chunk_mesh_bounds = {}
+        self.dirty_mesh_chunks = set()
+        self.render_distance_chunks = 2
+        # 投影參數同時用於 setup_3d 與視錐剔除
+        self.fov_y = 65
+        self.z_near = 0.1
+        self.z_far = 200
+        self.drawn_chunk_count = 0
+        self.chunk_mesh_vertex_counts = {}
+        # F3 除錯面板：各階段每影格耗時與 p50/p95/p99 影格時間，/trace 可另外寫出追蹤檔
+        self.profiler = FrameProfiler(("update", "manage_chunks", "rebuild_geometry", "draw_world", "draw_ui", "save_game", "save_write"))
+        self.show_debug_overlay = False
+        self.debug_overlay_refresh_time = 0.0
+        # greedy meshing：相鄰且材質相同的面（含只做 alpha test 的樹葉）合併成大四邊形（以 GL_REPEAT 材質平鋪），可用 /greedymesh 切換
+        self.greedy_meshing = True
+        self.repeat_texture_groups = {}
+        self.repeat_texture_no_cull_groups = {}
+        # 著色器繪製：區塊網格上傳成緊湊的索引三角形 VBO，霧與 alpha 測試在著色器裡做；不支援時用原本的 Batch，可用 /renderer 切換
+        self.use_shader_renderer = True
+        self.shader_renderer = None
+        self.sky_color = (0.5, 0.7, 0.95, 1.0)
+        self.fog_range = (20.0, 80.0)
         self.held_block_batch = pyglet.graphics.Batch()
         self.breaking_effect_batch = pyglet.graphics.Batch()
         self.pause_menu = False
@@ -80,14 +131,42 @@ class Game:
         if self.keys is None:
             logging.error("CRITICAL FAILURE in Game.__init__: self.keys IS STRICTLY NONE after initialization attempt!")
         
-        self.world = {}
+        self.world = WorldStore()
+        self.solid_lookup = SolidBlockLookup(self.world.palette, NON_SOLID_BLOCKS)  # 碰撞用的實心方塊表
         self.generated_chunks = set()
         self.chunk_load_distance = 4
-        self.chunk_size = 16
+        self.chunk_size = CHUNK_SIZE
+        # 區塊在背景執行緒生成，主執行緒每幀只在時間預算內併入完成的區塊
+        self.chunk_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="chunk_gen")
+        self.pending_chunks = {}
+        self.chunk_integrate_budget = 0.004
+        self.mesh_build_budget = 0.008
+        # 隨需載入：超出卸載半徑的區塊依 LRU 寫回磁碟並移出記憶體，最多暫留 max_cached_chunks 個
+        self.chunk_unload_distance = self.chunk_load_distance + 2
+        self.max_cached_chunks = 32
+        self.chunk_lru = OrderedDict()
+        self.saved_chunks = set()
+        self.world_seed = 0
+        self.save_deltas = True
+        self.evicted_unsaved = {}
+        self.pending_chunk_writes = []
+        self.last_managed_player_chunk = None
+        self.save_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chunk_save")
+        # 定期自動存檔：只寫入上次存檔後有變動的區塊，序列化與檔案 I/O 都在存檔執行緒完成
+        self.autosave_interval = 30.0
+        self.last_autosave_time = time.time()
+        self.autosave_future = None
+        self.last_autosave_stats = None
+        self.finished_save_writes = deque()     # 存檔執行緒寫完的耗時，由主執行緒交給 profiler（save_write）
 
-        self.texture_groups = {}
         self.textures = {}
         self.break_texture_groups = []
+        # 所有方塊與破壞階段材質打包成一張圖集，世界網格只需綁定一次材質
+        self.block_atlas = None
+        self.atlas_group = None
+        self.atlas_no_cull_group = None
+        self.atlas_uvs = {}
+        self.break_stage_uvs = []
         
         self.recipes = {}
         self.show_crafting_table_ui = False
@@ -101,6 +180,12 @@ class Game:
         self.rotation = [0.0, 0.0]
         self.velocity = [0.0, 0.0, 0.0]
         self.on_ground = False
+        # 固定步長模擬：物理每次前進 sim_step 秒，渲染在最後兩個物理狀態之間內插位置
+        self.sim_step = 1 / 60.0
+        self.max_sim_steps = 5
+        self.sim_accumulator = 0.0
+        self.previous_position = list(self.position)
+        self.render_alpha = 1.0
         self.mode = "survival"
         self.hp = 20; self.max_hp = 20
         self.hunger = 20; self.max_hunger = 20
@@ -127,6 +212,12 @@ class Game:
         self.double_click_threshold = 0.3
 
         self.game_hotbar_slot_size = 40; self.game_hotbar_padding = 5
+        # 快捷欄與容器畫面的保留式批次：視窗大小變了才重排版面，格子內容變了才重建物品圖示
+        self.hud_layers = {'hotbar': RetainedHudLayer(self._layout_hotbar, count_font_size=10),
+                           'inventory': RetainedHudLayer(self._layout_inventory, count_font_size=20),
+                           'crafting_table': RetainedHudLayer(self._layout_crafting_table, count_font_size=20)}
+        self.hud_icon_group = None
+        self.text_cache = TextCache()
 
         self.arm_display_offset = [0.35, -0.45, -0.6]; self.original_arm_offset_y = self.arm_display_offset[1]
         self.held_block_offset = [0.45, -0.35, -0.5]; self.held_block_scale = 0.2
@@ -157,13 +248,14 @@ class Game:
         self.tab_prefix = ""       
         # -------------------------
         
-        self.chat_feedback_messages = []
         self.chat_feedback_duration = 7.0
         self.chat_feedback_y_start = 40
         self.chat_feedback_spacing = 20
+        self.chat_log = ChatLog(self.chat_feedback_duration, self.chat_feedback_spacing)
 
         self.tooltip_label = None
         self.tooltip_bg_batch = None
+        self.tooltip_key = None
 
         self.texture_base_path = os.path.join(MAIN_SCRIPT_DIR, "assets", "minecraft", "textures", "block")
         
@@ -253,6 +345,8 @@ class Game:
         self.hp_label = pyglet.text.Label(f"HP: {self.hp}/{self.max_hp}", x=10, y=window.height - 30, color=(255,0,0,255))
         self.hunger_label = pyglet.text.Label(f"Hunger: {self.hunger}/{self.max_hunger}", x=10, y=window.height - 60, color=(255,165,0,255))
         self.pos_label = pyglet.text.Label("", x=10, y=10, color=(255,255,255,255), width=window.width - 20, multiline=False)
+        self.debug_overlay_label = pyglet.text.Label("", x=window.width - 10, y=window.height - 10, anchor_x='right', anchor_y='top', color=(255,255,255,255), width=420, multiline=True)
+        self.chunk_loading_label = pyglet.text.Label("正在生成地形...", font_name='Microsoft JhengHei', font_size=18, anchor_x='center', anchor_y='center', color=(255,255,255,255))
         
         self.load_keybindings()
         logging.info("遊戲引擎初始化完成。")
@@ -380,35 +474,13 @@ class Game:
                     self.conflicting_actions.add(action)
 
     def add_chat_feedback(self, message_text, color=(255, 255, 255, 255)):
-        label = pyglet.text.Label(
-            message_text,
-            font_name='Microsoft JhengHei',
-            x=10,
-            y=0,
-            font_size=14,
-            color=color
-        )
-        expiry_time = time.time() + self.chat_feedback_duration
-        self.chat_feedback_messages.append({'label': label, 'expiry': expiry_time})
-        if len(self.chat_feedback_messages) > 10:
-            self.chat_feedback_messages.pop(0)
+        self.chat_log.add(message_text, color, time.time())
 
     def draw_chat_feedback(self):
         current_y = self.chat_feedback_y_start
         if self.chat_active:
             current_y += 40
-
-        for message in reversed(self.chat_feedback_messages):
-            message['label'].y = current_y
-            time_left = message['expiry'] - time.time()
-            if time_left < 1.0:
-                opacity = int(max(0, time_left) * 255)
-                original_color = list(message['label'].color)
-                original_color[3] = opacity
-                message['label'].color = tuple(original_color)
-
-            message['label'].draw()
-            current_y += self.chat_feedback_spacing
+        self.chat_log.draw(current_y, time.time())
 
     def _update_mouse_exclusivity(self):
         should_be_exclusive = not self.show_inventory and not self.pause_menu and not self.chat_active and not self.show_crafting_table_ui and not self.show_keybinding_menu
@@ -512,8 +584,9 @@ class Game:
     def trigger_arm_swing_animation(self):
         if not self.arm_swing_active: self.arm_swing_active = True; self.arm_swing_start_time = time.time()
 
-    def get_block_face_vertices(self, world_x, world_y, world_z, face_index, scale=1.0, center_offset=(0.0,0.0,0.0), rotation=0):
+    def get_block_face_vertices(self, world_x, world_y, world_z, face_index, scale=1.0, center_offset=(0.0,0.0,0.0), rotation=0, uv_rect=(0.0, 0.0, 1.0, 1.0)):
         # rotation: 0, 1, 2, 3 (0, 90, 180, 270 degrees clockwise)
+        # uv_rect: 材質在圖集中的 (u0, v0, u1, v1)，旋轉只在這個格子內進行
         
         s = scale
         cx, cy, cz = center_offset[0]*s, center_offset[1]*s, center_offset[2]*s
@@ -526,7 +599,8 @@ class Game:
         p = [(vx+world_x, vy+world_y, vz+world_z) for vx, vy, vz in v]
         
         # 標準紋理座標 (BL, BR, TR, TL)
-        base_tc = [(0.0, 0.0), (1.0, 0.0), (1.0, 1.0), (0.0, 1.0)]
+        u0, v0, u1, v1 = uv_rect
+        base_tc = [(u0, v0), (u1, v0), (u1, v1), (u0, v1)]
         
         # 根據 rotation 旋轉紋理座標順序
         # 旋轉貼圖相當於循環移動這四個點
@@ -542,6 +616,10 @@ class Game:
         ]
         
         selected_face_v_coords = standard_faces_vertex_indices[face_index]
+        if face_index < 4:
+            # 左右上下四個面原本是順時針，反轉頂點順序（紋理座標一起反轉）讓所有面從外面看都是逆時針，才能開啟背面剔除
+            selected_face_v_coords = selected_face_v_coords[:1] + selected_face_v_coords[:0:-1]
+            tc_quad = tc_quad[:1] + tc_quad[:0:-1]
         final_vertices = []
         for vc in selected_face_v_coords:
             final_vertices.extend(vc)
@@ -555,22 +633,15 @@ class Game:
     def rebuild_held_block_geometry(self):
         self.held_block_batch = pyglet.graphics.Batch();
         if not self.selected_block: return
-        block_type_id = self.selected_block; default_texture_key = "stone"; texture_keys_for_faces = [default_texture_key] * 6
-        if block_type_id == "grass_block": texture_keys_for_faces = ["grass_block_side","grass_block_side","grass_block_top","grass_block_bottom","grass_block_side","grass_block_side"]
-        elif block_type_id == "oak_log": texture_keys_for_faces = ["oak_log_side","oak_log_side","oak_log_top","oak_log_top","oak_log_side","oak_log_side"]
-        elif block_type_id == "birch_log": texture_keys_for_faces = ["birch_log_side","birch_log_side","birch_log_top","birch_log_top","birch_log_side","birch_log_side"]
-        elif block_type_id == "crafting_table": texture_keys_for_faces = ["crafting_table_side", "crafting_table_side", "crafting_table_top", "oak_planks", "crafting_table_front", "crafting_table_side"]
-        elif block_type_id == "oak_leaves" or block_type_id == "birch_leaves": texture_keys_for_faces = [block_type_id] * 6
-        elif block_type_id in self.texture_map: texture_keys_for_faces = [block_type_id] * 6
-        elif block_type_id in self.texture_groups: texture_keys_for_faces = [block_type_id] * 6 
-        vertex_texture_groups = [];
-        for tex_key in texture_keys_for_faces: tex_group = self.texture_groups.get(tex_key, self.texture_groups.get(default_texture_key)); vertex_texture_groups.append(tex_group)
+        default_texture_key = "stone"
+        texture_keys_for_faces = self.block_registry.block_faces(self.selected_block)
+        face_uvs = [self.atlas_uvs.get(tex_key, self.atlas_uvs.get(default_texture_key)) for tex_key in texture_keys_for_faces]
         scale = self.held_block_scale
         for face_idx in range(6):
-            if vertex_texture_groups[face_idx]:
+            if face_uvs[face_idx]:
                 # 手持物品不需要隨機旋轉，傳入 0
-                v, tc = self.get_block_face_vertices(0,0,0,face_idx,scale=scale,center_offset=(0.5,0.5,0.5), rotation=0)
-                self.held_block_batch.add(4,gl.GL_QUADS,vertex_texture_groups[face_idx],('v3f/static',v),('t2f/static',tc))
+                v, tc = self.get_block_face_vertices(0,0,0,face_idx,scale=scale,center_offset=(0.5,0.5,0.5), rotation=0, uv_rect=face_uvs[face_idx])
+                self.held_block_batch.add(4,gl.GL_QUADS,self.atlas_group,('v3f/static',v),('t2f/static',tc))
 
     def draw_held_block(self):
         if self.show_inventory or self.pause_menu or not self.selected_block: return
@@ -599,7 +670,7 @@ class Game:
         player_head_y_int = math.floor(self.position[1] + self.player_height - 0.01) 
         
         stuck_in_block = False
-        non_solid_blocks = {"oak_leaves", "birch_leaves"}
+        non_solid_blocks = NON_SOLID_BLOCKS
         if (player_x_block, player_foot_y_int, player_z_block) in self.world and \
            self.world.get((player_x_block, player_foot_y_int, player_z_block)) not in non_solid_blocks:
             stuck_in_block = True
@@ -652,15 +723,13 @@ class Game:
 
 
     def load_textures_and_groups(self):
+        block_images = {}
         for texture_key_mapped, texture_filename_mapped in self.texture_map.items():
             full_path = os.path.join(self.texture_base_path, f"{texture_filename_mapped}.png"); texture_key_to_store = texture_key_mapped
             if os.path.exists(full_path):
                 try:
-                    image = pyglet.image.load(full_path); texture = image.get_texture(); gl.glBindTexture(texture.target, texture.id)
-                    gl.glTexParameteri(texture.target,gl.GL_TEXTURE_MIN_FILTER,gl.GL_NEAREST); gl.glTexParameteri(texture.target,gl.GL_TEXTURE_MAG_FILTER,gl.GL_NEAREST)
-                    if "leaves" in texture_filename_mapped: gl.glTexParameteri(texture.target,gl.GL_TEXTURE_WRAP_S,gl.GL_CLAMP_TO_EDGE); gl.glTexParameteri(texture.target,gl.GL_TEXTURE_WRAP_T,gl.GL_CLAMP_TO_EDGE)
-                    gl.glBindTexture(texture.target,0); self.textures[texture_key_to_store]=texture; self.texture_groups[texture_key_to_store]=pyglet.graphics.TextureGroup(texture)
-                except Exception as e: logging.error(f"載入材質 {full_path} 或建立 TextureGroup for '{texture_key_to_store}' 失敗: {e}", exc_info=True)
+                    block_images[texture_key_to_store] = pyglet.image.load(full_path)
+                except Exception as e: logging.error(f"載入材質 {full_path} for '{texture_key_to_store}' 失敗: {e}", exc_info=True)
             else:
                 logging.warning(f"材質檔案 {full_path} for key '{texture_key_to_store}' (mapped from '{texture_filename_mapped}') 不存在. Creating dummy texture.")
                 try:
@@ -708,259 +777,519 @@ class Game:
                         draw.rectangle([(2,8),(6,12)], fill=(130,90,50,255))
                     
                     os.makedirs(os.path.dirname(full_path),exist_ok=True); img_pil.save(full_path)
-                    image=pyglet.image.load(full_path); texture=image.get_texture(); gl.glBindTexture(texture.target,texture.id)
-                    gl.glTexParameteri(texture.target,gl.GL_TEXTURE_MIN_FILTER,gl.GL_NEAREST); gl.glTexParameteri(texture.target,gl.GL_TEXTURE_MAG_FILTER,gl.GL_NEAREST)
-                    if "leaves" in texture_filename_mapped: gl.glTexParameteri(texture.target,gl.GL_TEXTURE_WRAP_S,gl.GL_CLAMP_TO_EDGE); gl.glTexParameteri(texture.target,gl.GL_TEXTURE_WRAP_T,gl.GL_CLAMP_TO_EDGE)
-                    gl.glBindTexture(texture.target,0); self.textures[texture_key_to_store]=texture; self.texture_groups[texture_key_to_store]=pyglet.graphics.TextureGroup(texture)
+                    block_images[texture_key_to_store] = pyglet.image.load(full_path)
                 except ImportError: logging.warning(f"Pillow (PIL) not installed. Cannot create dummy texture for {full_path}.")
                 except Exception as e_dummy: logging.error(f"Error creating dummy texture {full_path}: {e_dummy}", exc_info=True)
-        self.break_texture_groups = []
+        break_stage_keys = []
         for i in range(10):
             fp = os.path.join(self.texture_base_path, f"destroy_stage_{i}.png")
             if os.path.exists(fp):
                 try:
-                    img=pyglet.image.load(fp); tex=img.get_texture(); gl.glBindTexture(tex.target,tex.id)
-                    gl.glTexParameteri(tex.target,gl.GL_TEXTURE_MIN_FILTER,gl.GL_NEAREST); gl.glTexParameteri(tex.target,gl.GL_TEXTURE_MAG_FILTER,gl.GL_NEAREST)
-                    gl.glTexParameteri(tex.target,gl.GL_TEXTURE_WRAP_S,gl.GL_CLAMP_TO_EDGE); gl.glTexParameteri(tex.target,gl.GL_TEXTURE_WRAP_T,gl.GL_CLAMP_TO_EDGE)
-                    gl.glBindTexture(tex.target,0); self.break_texture_groups.append(pyglet.graphics.TextureGroup(tex))
-                except Exception as e_break: logging.error(f"Error loading break texture {fp}: {e_break}", exc_info=True); self.break_texture_groups.append(None)
-            else: logging.warning(f"Break texture {fp} not found."); self.break_texture_groups.append(None)
+                    block_images[f"destroy_stage_{i}"] = pyglet.image.load(fp); break_stage_keys.append(f"destroy_stage_{i}")
+                except Exception as e_break: logging.error(f"Error loading break texture {fp}: {e_break}", exc_info=True); break_stage_keys.append(None)
+            else: logging.warning(f"Break texture {fp} not found."); break_stage_keys.append(None)
+        self._build_texture_atlas(block_images)
+        for texture_key in self.texture_map:
+            if texture_key not in block_images: continue
+            # greedy meshing 的合併面需要 GL_REPEAT，圖集做不到，另外保留一份獨立材質
+            texture = block_images[texture_key].get_texture(); gl.glBindTexture(texture.target, texture.id)
+            gl.glTexParameteri(texture.target,gl.GL_TEXTURE_MIN_FILTER,gl.GL_NEAREST); gl.glTexParameteri(texture.target,gl.GL_TEXTURE_MAG_FILTER,gl.GL_NEAREST)
+            gl.glTexParameteri(texture.target,gl.GL_TEXTURE_WRAP_S,gl.GL_REPEAT); gl.glTexParameteri(texture.target,gl.GL_TEXTURE_WRAP_T,gl.GL_REPEAT)
+            gl.glBindTexture(texture.target, 0); self.repeat_texture_groups[texture_key] = pyglet.graphics.TextureGroup(texture)
+            self.repeat_texture_no_cull_groups[texture_key] = pyglet.graphics.TextureGroup(texture, parent=NoCullGroup())
+        self.break_stage_uvs = [self.atlas_uvs.get(stage_key) if stage_key else None for stage_key in break_stage_keys]
+        self.block_registry = BlockRegistry(self.world.palette, self.atlas_uvs)
+        self.sky_height_map = SkyHeightMap(self.block_registry)
+        self.break_texture_groups = [self.atlas_group if stage_uv else None for stage_uv in self.break_stage_uvs]
+        try:
+            self.shader_renderer = ShaderChunkRenderer({texture_key: block_images[texture_key] for texture_key in self.texture_map if texture_key in block_images})
+            logging.info(f"著色器繪製已啟用 (OpenGL {gl.gl_info.get_version()})。")
+        except Exception as e:
+            self.shader_renderer = None
+            logging.warning(f"無法使用著色器繪製，改用固定管線: {e}")
+
+    def _build_texture_atlas(self, block_images):
+        # 由小到大嘗試 2 的次方尺寸，直到全部材質都放得下
+        atlas_size = 256
+        max_texture_size = pyglet.image.get_max_texture_size()
+        padded_images = {texture_key: self._wrap_pad_image(image) for texture_key, image in block_images.items()}
+        while True:
+            atlas = pyglet.image.atlas.TextureAtlas(atlas_size, atlas_size)
+            try:
+                padded_regions = {texture_key: atlas.add(image) for texture_key, image in padded_images.items()}
+                break
+            except pyglet.image.atlas.AllocatorException:
+                if atlas_size >= max_texture_size: raise
+                atlas_size *= 2
+        texture = atlas.texture
+        gl.glBindTexture(texture.target, texture.id)
+        gl.glTexParameteri(texture.target,gl.GL_TEXTURE_MIN_FILTER,gl.GL_NEAREST); gl.glTexParameteri(texture.target,gl.GL_TEXTURE_MAG_FILTER,gl.GL_NEAREST)
+        gl.glBindTexture(texture.target, 0)
+
+        self.block_atlas = atlas
+        self.atlas_group = pyglet.graphics.TextureGroup(texture)
+        self.atlas_no_cull_group = pyglet.graphics.TextureGroup(texture, parent=NoCullGroup())
+        self.hud_icon_group = pyglet.graphics.TextureGroup(texture, parent=pyglet.graphics.OrderedGroup(ITEM_ORDER))
+        regions = {}
+        for texture_key, padded in padded_regions.items():
+            width, height = padded.width // 3, padded.height // 3
+            region = regions[texture_key] = texture.get_region(padded.x + width, padded.y + height, width, height)
+            tex_coords = region.tex_coords
+            self.atlas_uvs[texture_key] = (tex_coords[0], tex_coords[1], tex_coords[6], tex_coords[7])
+            self.textures[texture_key] = region
+        logging.info(f"材質圖集 {atlas_size}x{atlas_size}，共 {len(regions)} 張材質。")
+
+    def _wrap_pad_image(self, image):
+        # 以 3x3 平鋪的方式在四周補上一整圈同一張材質：MSAA 邊緣像素會外插出格子外的 UV，
+        # 取到的仍是與 GL_REPEAT 相同的顏色，不會混入圖集裡隔壁材質
+        width, height = image.width, image.height
+        pixels = image.get_image_data().get_data("RGBA", width * 4)
+        rows = [pixels[row * width * 4:(row + 1) * width * 4] * 3 for row in range(height)]
+        return pyglet.image.ImageData(width * 3, height * 3, "RGBA", b"".join(rows * 3))
+
+    def _mark_block_dirty(self, pos):
+        # 方塊變動只需重建所屬區塊，位於區塊邊界時連帶重建相鄰區塊；
+        # 頂點光照會取樣到隔壁一格，在區塊角落時對角的區塊也要重建
+        x, _, z = pos
+        cx, cz = math.floor(x / self.chunk_size), math.floor(z / self.chunk_size)
+        local_x, local_z = x - cx * self.chunk_size, z - cz * self.chunk_size
+        chunk = self.world.get_chunk(cx, cz)
+        if chunk is not None: self.sky_height_map.update_column(chunk, local_x, local_z)
+        step_x = -1 if local_x == 0 else 1 if local_x == self.chunk_size - 1 else 0
+        step_z = -1 if local_z == 0 else 1 if local_z == self.chunk_size - 1 else 0
+        self.dirty_mesh_chunks.add((cx, cz))
+        if step_x: self.dirty_mesh_chunks.add((cx + step_x, cz))
+        if step_z: self.dirty_mesh_chunks.add((cx, cz + step_z))
+        if step_x and step_z: self.dirty_mesh_chunks.add((cx + step_x, cz + step_z))
+        self.chunk_dirty = True
+
+    def _mark_chunk_dirty(self, cx, cz):
+        # 新區塊會遮住相鄰區塊邊界上原本外露的面；頂點光照在角落會取樣到對角區塊，四個對角區塊也要重建
+        for dx in (-1, 0, 1):
+            for dz in (-1, 0, 1):
+                self.dirty_mesh_chunks.add((cx + dx, cz + dz))
+        self.chunk_dirty = True
 
     def rebuild_world_geometry(self):
         if not self.chunk_dirty: return
-        if not self.world: self.chunk_dirty = False; return
-        self.world_batch = pyglet.graphics.Batch(); render_distance_blocks = 32 
-        px_floor,py_floor,pz_floor = map(math.floor, self.position)
-        non_solid_blocks = {"oak_leaves", "birch_leaves"}
-        
-        # 定義需要隨機旋轉材質的方塊類型
-        rotatable_blocks = {
-            "grass_block", "dirt", "sand", "stone", "oak_leaves", "birch_leaves", 
-            "gravel", "coal_ore", "iron_ore", "gold_ore", "diamond_ore", "lapis_ore"
-        }
-
-        for (x,y,z), block_type_in_world in self.world.items():
-            if not (abs(x-px_floor)<render_distance_blocks and \
-                    abs(y-py_floor)<render_distance_blocks+20 and \
-                    abs(z-pz_floor)<render_distance_blocks): 
-                continue
-            
-            is_transparent_block = (block_type_in_world in non_solid_blocks) 
-
-            for face_index_standard, (dx_normal,dy_normal,dz_normal) in enumerate([(1,0,0),(-1,0,0),(0,1,0),(0,-1,0),(0,0,1),(0,0,-1)]):
-                neighbor_x,neighbor_y,neighbor_z = x+dx_normal,y+dy_normal,z+dz_normal
-                neighbor_block_type = self.world.get((neighbor_x,neighbor_y,neighbor_z))
-                
-                should_draw_face = False
-                if not neighbor_block_type: 
-                    should_draw_face = True
-                elif is_transparent_block and (neighbor_block_type != block_type_in_world and neighbor_block_type is not None):
-                    should_draw_face = True
-                elif not is_transparent_block and (neighbor_block_type in non_solid_blocks): 
-                    should_draw_face = True
-
-                if should_draw_face:
-                    texture_key_for_face = None
-                    if block_type_in_world=="grass_block":
-                        if face_index_standard==2: texture_key_for_face="grass_block_top"      
-                        elif face_index_standard==3: texture_key_for_face="grass_block_bottom"  
-                        else: texture_key_for_face="grass_block_side"                         
-                    elif block_type_in_world=="oak_log":
-                        if face_index_standard==2 or face_index_standard==3: texture_key_for_face="oak_log_top"
-                        else: texture_key_for_face="oak_log_side"
-                    elif block_type_in_world=="birch_log":
-                        if face_index_standard==2 or face_index_standard==3: texture_key_for_face="birch_log_top"
-                        else: texture_key_for_face="birch_log_side"
-                    elif block_type_in_world == "crafting_table":
-                        if face_index_standard == 2: texture_key_for_face = "crafting_table_top"
-                        elif face_index_standard == 3: texture_key_for_face = "oak_planks"
-                        elif face_index_standard == 4: texture_key_for_face = "crafting_table_front"
-                        else: texture_key_for_face = "crafting_table_side"
-                    elif block_type_in_world in non_solid_blocks: 
-                        texture_key_for_face=block_type_in_world
-                    elif block_type_in_world in self.texture_map: 
-                        texture_key_for_face=block_type_in_world
-                    else: 
-                        texture_key_for_face="stone" 
-                    
-                    texture_group_for_face = self.texture_groups.get(texture_key_for_face, self.texture_groups.get("stone"))
-                    
-                    # 計算隨機旋轉
-                    rotation = 0
-                    should_rotate = False
-                    
-                    # 草地只有頂部會旋轉，樹葉和其他自然方塊全旋轉
-                    if block_type_in_world == "grass_block":
-                        if face_index_standard == 2: # Top face
-                            should_rotate = True
-                    elif block_type_in_world in rotatable_blocks:
-                        should_rotate = True
-                    
-                    if should_rotate:
-                        # 根據座標計算一個固定的隨機數 (Hash)
-                        # 使用位元運算可以加快速度
-                        # (x * 質數1 + y * 質數2 + z * 質數3)
-                        # 這樣同一個位置的方塊旋轉角度永遠固定
-                        h = int(x * 521 + y * 97 + z * 643)
-                        rotation = h % 4
-
-                    if texture_group_for_face:
-                        v,tc = self.get_block_face_vertices(x,y,z,face_index_standard,scale=1.0,center_offset=(0,0,0), rotation=rotation)
-                        self.world_batch.add(4,gl.GL_QUADS,texture_group_for_face,('v3f/static',v),('t2f/static',tc))
-        self.chunk_dirty = False
+        player_chunk_x = math.floor(self.position[0] / self.chunk_size)
+        player_chunk_z = math.floor(self.position[2] / self.chunk_size)
+        r = self.render_distance_chunks
+        visible_chunks = {(cx, cz) for cx in range(player_chunk_x - r, player_chunk_x + r + 1)
+                          for cz in range(player_chunk_z - r, player_chunk_z + r + 1)
+                          if self.world.get_chunk(cx, cz) is not None}
+
+        # 離開可見範圍的區塊直接丟棄網格，進入範圍或有變動的區塊才重建
+        for chunk_key in list(self.chunk_meshes):
+            if chunk_key not in visible_chunks:
+                self._release_chunk_mesh(self.chunk_meshes.pop(chunk_key))
+                self.chunk_mesh_bounds.pop(chunk_key, None)
+                self.chunk_mesh_vertex_counts.pop(chunk_key, None)
+        chunks_to_build = sorted((chunk_key for chunk_key in visible_chunks
+                                  if chunk_key not in self.chunk_meshes or chunk_key in self.dirty_mesh_chunks),
+                                 key=lambda chunk_key: (chunk_key[0] - player_chunk_x) ** 2 + (chunk_key[1] - player_chunk_z) ** 2)
+        # 由近到遠重建，超過每幀預算的留到下一幀（至少建一個，避免永遠輪不到）
+        deadline = time.perf_counter() + self.mesh_build_budget
+        built_count = 0
+        for chunk_key in chunks_to_build:
+            if built_count > 0 and time.perf_counter() >= deadline: break
+            if chunk_key in self.chunk_meshes: self._release_chunk_mesh(self.chunk_meshes[chunk_key])
+            self.chunk_meshes[chunk_key] = self._build_chunk_mesh(*chunk_key)
+            self.chunk_mesh_bounds[chunk_key] = self._chunk_bounds(*chunk_key)
+            built_count += 1
+        self.dirty_mesh_chunks = set(chunks_to_build[built_count:])
+        self.chunk_dirty = bool(self.dirty_mesh_chunks)
+
+    def _active_shader_renderer(self):
+        return self.shader_renderer if self.use_shader_renderer else None
+
+    def _release_chunk_mesh(self, mesh):
+        # Batch 交給 pyglet 回收；自己上傳的 VBO 要明確刪除
+        if isinstance(mesh, ChunkVertexBuffer): mesh.delete()
+
+    def _build_chunk_mesh(self, cx, cz):
+        renderer = self._active_shader_renderer()
+        if renderer:
+            vertices, opaque_quads, transparent_quads = self._packed_chunk_vertices(renderer.layers, cx, cz)
+            mesh = renderer.upload((cx * self.chunk_size, 0, cz * self.chunk_size), vertices, opaque_quads, transparent_quads)
+            self.chunk_mesh_vertex_counts[(cx, cz)] = mesh.vertex_count
+            return mesh
+        batch = pyglet.graphics.Batch()
+        vertex_count = 0
+        # 每個材質群組整塊區塊只上傳一次
+        for group, (vertices, tex_coords, colors) in self._chunk_group_arrays(cx, cz).items():
+            batch.add(len(vertices) // 3,gl.GL_QUADS,group,('v3f/static',vertices),('t2f/static',tex_coords),('c3B/static',colors))
+            vertex_count += len(vertices) // 3
+        self.chunk_mesh_vertex_counts[(cx, cz)] = vertex_count
+        return batch
+
+    def _packed_chunk_vertices(self, layers, cx, cz):
+        """著色器用的緊湊頂點：直接寫進 array('H')，座標為區塊內整數；回傳 (頂點, 不透明面數, 透明面數)，透明面接在後面。"""
+        origin_x, origin_z = cx * self.chunk_size, cz * self.chunk_size
+        fallback_layer = layers.get("stone")
+        opaque_vertices, transparent_vertices = array('H'), array('H')
+        for texture_key, face_index, x, y, z, size_u, size_v, rotation, is_transparent, light in self._chunk_faces(cx, cz, self.greedy_meshing):
+            layer = layers.get(texture_key, fallback_layer)
+            if layer is None: continue
+            append_packed_face(transparent_vertices if is_transparent else opaque_vertices, x - origin_x, y, z - origin_z, face_index, size_u, size_v, rotation, layer, light)
+        opaque_quads = len(opaque_vertices) // 16
+        opaque_vertices.extend(transparent_vertices)
+        return opaque_vertices, opaque_quads, len(transparent_vertices) // 16
+
+    def _chunk_group_arrays(self, cx, cz):
+        """固定管線用：依材質群組收集 {group: (頂點 array('f'), 材質座標 array('f'), 頂點顏色 array('B'))}；不呼叫 GL，效能測試可直接使用。"""
+        group_arrays = {}
+        for texture_key, face_index, x, y, z, size_u, size_v, rotation, is_transparent, light in self._chunk_faces(cx, cz, self.greedy_meshing):
+            if self.greedy_meshing:
+                repeat_groups = self.repeat_texture_no_cull_groups if is_transparent else self.repeat_texture_groups
+                group = repeat_groups.get(texture_key, repeat_groups.get("stone"))
+                uv_rect = None
+            else:
+                group = self.atlas_no_cull_group if is_transparent else self.atlas_group
+                uv_rect = self.atlas_uvs.get(texture_key, self.atlas_uvs.get("stone"))
+                if not uv_rect: continue
+            if not group: continue
+            if group not in group_arrays: group_arrays[group] = (array('f'), array('f'), array('B'))
+            append_float_face(*group_arrays[group], x, y, z, face_index, size_u, size_v, rotation, light, uv_rect)
+        return group_arrays
+
+    def _chunk_faces(self, cx, cz, greedy):
+        """逐一產生區塊要畫的面 (材質, 面, x, y, z, u 跨度, v 跨度, 旋轉, 是否透明, 四角亮度)；greedy 時先把面做 greedy 合併（樹葉只做 alpha test、不混色，也一起合併）。
+
+        四角亮度是預先烘焙的天空光與 ambient occlusion；四角亮度相同的面往兩個方向合併，只沿一軸不變的面只沿那一軸合併，合併後每個角的亮度仍然正確。
+        """
+        chunk = self.world.get_chunk(cx, cz)
+        if chunk is None: return
+        size = self.chunk_size
+        base_x, base_z = cx * size, cz * size
+        # 材質、旋轉與透光全部查 block_registry 預先編好的表，鄰格直接比較方塊 ID
+        registry = self.block_registry
+        registry.ensure(len(self.world.palette.names) - 1)
+        face_textures, rotate_faces, transparent = registry.face_textures, registry.rotate_faces, registry.transparent
+        neighbor_chunks = {(dx, dz): self.world.get_chunk(cx + dx, cz + dz) for dx, dz in ((1, 0), (-1, 0), (0, 1), (0, -1))}
+        light_sampler = ChunkLightSampler(self.world, self.sky_height_map, cx, cz, size)
+
+        # greedy 模式下的面先依 (面, 所在層) 收集成平面格子，最後再合併
+        greedy_planes = {}
+
+        for local_x, y, local_z, block_id in chunk.iter_blocks():
+            x, z = base_x + local_x, base_z + local_z
+            is_transparent_block = transparent[block_id]
+            block_face_textures, block_rotate_faces = face_textures[block_id], rotate_faces[block_id]
+
+            for face_index_standard, (dx_normal,dy_normal,dz_normal) in enumerate(((1,0,0),(-1,0,0),(0,1,0),(0,-1,0),(0,0,1),(0,0,-1))):
+                neighbor_x, neighbor_z = local_x + dx_normal, local_z + dz_normal
+                if 0 <= neighbor_x < size and 0 <= neighbor_z < size:
+                    neighbor_id = chunk.get_id(neighbor_x, y + dy_normal, neighbor_z)
+                else:
+                    neighbor_chunk = neighbor_chunks[(dx_normal, dz_normal)]
+                    neighbor_id = neighbor_chunk.get_id(neighbor_x % size, y, neighbor_z % size) if neighbor_chunk else 0
+
+                # 旁邊是空氣一定畫；透光方塊旁邊不是同種方塊就畫；不透光方塊只有旁邊透光才畫
+                if neighbor_id:
+                    if is_transparent_block:
+                        if neighbor_id == block_id: continue
+                    elif not transparent[neighbor_id]: continue
+
+                texture_key_for_face = block_face_textures[face_index_standard]
+                should_rotate = block_rotate_faces[face_index_standard]
+                # 根據座標計算固定的旋轉角度，同一個位置的方塊旋轉永遠相同
+                rotation = int(x * 521 + y * 97 + z * 643) % 4 if should_rotate else 0
+
+                light = light_sampler.face_light(x, y, z, face_index_standard)
+                merge_direction = light_merge_direction(face_index_standard, light) if greedy else None
+                if merge_direction is not None:
+                    normal_axis, u_axis, v_axis = FACE_AXES[face_index_standard]
+                    block_pos = (x, y, z)
+                    a, b = block_pos[u_axis], block_pos[v_axis]
+                    # 亮度只沿一軸不變的面把另一軸的座標放進 key，merge_faces 就只會沿不變的那一軸合併
+                    line = None if merge_direction == MERGE_ANY else b if merge_direction == MERGE_ALONG_U else a
+                    greedy_planes.setdefault((face_index_standard, block_pos[normal_axis]), {})[(a, b)] = (texture_key_for_face, should_rotate, bool(is_transparent_block), light, merge_direction, line)
+                else:
+                    yield texture_key_for_face, face_index_standard, x, y, z, 1, 1, rotation, bool(is_transparent_block), light
+
+        for (face_index, layer), cells in greedy_planes.items():
+            normal_axis, u_axis, v_axis = FACE_AXES[face_index]
+            for a, b, size_u, size_v, (texture_key, should_rotate, is_transparent, light, _, _) in merge_faces(cells, MAX_PACKED_FACE_SPAN):
+                block_pos = [0, 0, 0]; block_pos[normal_axis] = layer; block_pos[u_axis] = a; block_pos[v_axis] = b
+                x, y, z = block_pos
+                # 合併面整塊沿用起點方塊的旋轉；1x1 的面與逐格模式完全相同
+                rotation = int(x * 521 + y * 97 + z * 643) % 4 if should_rotate else 0
+                yield texture_key, face_index, x, y, z, size_u, size_v, rotation, is_transparent, light
+
+    def _chunk_bounds(self, cx, cz):
+        # 區塊的軸對齊包圍盒，高度只涵蓋實際有方塊的分段
+        chunk = self.world.get_chunk(cx, cz)
+        section_ys = chunk.sections.keys() if chunk is not None else ()
+        min_y = min(section_ys) * 16 if section_ys else 0
+        max_y = (max(section_ys) + 1) * 16 if section_ys else 0
+        base_x, base_z = cx * self.chunk_size, cz * self.chunk_size
+        return (base_x, min_y, base_z), (base_x + self.chunk_size, max_y, base_z + self.chunk_size)
+
+    def draw_world(self):
+        w, h = self.window.get_size()
+        eye = self.get_camera_position(interpolated=True)
+        planes = build_frustum_planes(self.fov_y, w / h if h > 0 else 1, self.z_near, self.z_far, self.rotation[0], self.rotation[1], eye)
+        # 距離剔除：水平距離超過渲染半徑的區塊（方形範圍的四個角）不送出
+        max_distance_sq = (self.render_distance_chunks * self.chunk_size + self.chunk_size / 2) ** 2
+        visible_meshes = []
+        for chunk_key, mesh in self.chunk_meshes.items():
+            min_corner, max_corner = self.chunk_mesh_bounds[chunk_key]
+            dx = max(min_corner[0] - eye[0], 0, eye[0] - max_corner[0])
+            dz = max(min_corner[2] - eye[2], 0, eye[2] - max_corner[2])
+            if dx * dx + dz * dz > max_distance_sq: continue
+            if not aabb_in_frustum(planes, min_corner, max_corner): continue
+            visible_meshes.append(mesh)
+        renderer = self._active_shader_renderer()
+        gl.glEnable(gl.GL_CULL_FACE)
+        if renderer:
+            # 先畫所有不透明面（背面剔除），再關掉剔除畫樹葉
+            renderer.begin(self.sky_color, self.fog_range)
+            for mesh in visible_meshes: renderer.draw(mesh)
+            gl.glDisable(gl.GL_CULL_FACE)
+            for mesh in visible_meshes: renderer.draw(mesh, transparent=True)
+            renderer.end()
+        else:
+            for batch in visible_meshes: batch.draw()
+            # 頂點顏色陣列畫完後目前顏色未定義，之後的手持方塊等立即模式繪製要從白色開始
+            gl.glColor4f(1, 1, 1, 1)
+        gl.glDisable(gl.GL_CULL_FACE)
+        self.drawn_chunk_count = len(visible_meshes)
 
     def generate_tree(self, xt, ys, zt, tree_type="oak"):
-        non_solid_blocks = {"oak_leaves", "birch_leaves"}
-        log_type = f"{tree_type}_log"
-        leaves_type = f"{tree_type}_leaves"
-        
-        can_grow=True
-        for i in range(-1,2): 
-            for j in range(-1,2):
-                if i==0 and j==0: continue 
-                check_pos_ground=(xt+i,ys-1,zt+j)
-                block_on_ground=self.world.get(check_pos_ground)
-                if block_on_ground and block_on_ground not in ["grass_block", "dirt"] and block_on_ground not in non_solid_blocks:
-                    can_grow=False; break
-                for k_up in range(5): 
-                    check_pos_air=(xt+i,ys+k_up,zt+j)
-                    block_in_air=self.world.get(check_pos_air)
-                    if block_in_air and block_in_air not in non_solid_blocks: 
-                        can_grow=False; break
-                if not can_grow: break
-            if not can_grow: break
-        
-        if not (self.world.get((xt,ys-1,zt)) in ["grass_block","dirt"]): 
-            can_grow=False
-        
-        if not can_grow: return False
-
-        trunk_height=random.randint(4,6); placed_logs=[]
-        for i in range(trunk_height):
-            log_pos=(xt,ys+i,zt)
-            if self.world.get(log_pos) and self.world.get(log_pos) not in [None] and self.world.get(log_pos) not in non_solid_blocks:
-                for plog_pos in placed_logs: self.world.pop(plog_pos,None) 
-                return False
-            self.world[log_pos]=log_type; placed_logs.append(log_pos)
-
-        leaf_y_base=ys+trunk_height-2 
-        leaf_height_layers=random.randint(3,4) 
-        for leaf_y_offset in range(leaf_height_layers):
-            current_y=leaf_y_base+leaf_y_offset
-            radius=1 if (leaf_y_offset==leaf_height_layers-1 and leaf_height_layers>1) else 2 
-            if leaf_height_layers==1: radius=1 
-
-            for leaf_x_offset in range(-radius,radius+1):
-                for leaf_z_offset in range(-radius,radius+1):
-                    if leaf_x_offset==0 and leaf_z_offset==0 and current_y < ys + trunk_height: continue
-                    if radius==2 and abs(leaf_x_offset)==2 and abs(leaf_z_offset)==2 and random.random()<0.5: continue
-                    if radius==2 and (abs(leaf_x_offset)==2 or abs(leaf_z_offset)==2) and \
-                       (abs(leaf_x_offset)!=abs(leaf_z_offset)) and random.random()<0.2: continue
-
-                    leaf_pos=(xt+leaf_x_offset,current_y,zt+leaf_z_offset)
-                    existing_block_at_leaf_pos=self.world.get(leaf_pos)
-                    if not existing_block_at_leaf_pos or existing_block_at_leaf_pos in non_solid_blocks:
-                        self.world[leaf_pos]=leaves_type
-        return True
+        return terrain.generate_tree(self.world, xt, ys, zt, tree_type=tree_type)
 
     def generate_chunk(self, chunk_x, chunk_z):
-        base_y_level = 8
-        ores_to_generate = [
-            ("coal_ore", 0, base_y_level - 1, 80), ("iron_ore", 2, base_y_level - 3, 50),
-            ("gold_ore", 4, base_y_level - 5, 15), ("lapis_ore", 4, base_y_level - 5, 10),
-            ("diamond_ore", 5, base_y_level - 6, 5)
-        ]
-        
-        start_x, start_z = chunk_x * self.chunk_size, chunk_z * self.chunk_size
-        
-        for dx in range(self.chunk_size):
-            for dz in range(self.chunk_size):
-                x_coord, z_coord = start_x + dx, start_z + dz
-                self.world[(x_coord, 0, z_coord)] = "stone"
-                for y_offset in range(1, base_y_level - 4): self.world[(x_coord, y_offset, z_coord)] = "stone"
-                for y_offset in range(base_y_level - 4, base_y_level): self.world[(x_coord, y_offset, z_coord)] = "dirt"
-                self.world[(x_coord, base_y_level, z_coord)] = "grass_block"
-
-                for y_ore_check in range(1, base_y_level - 1):
-                    if self.world.get((x_coord, y_ore_check, z_coord)) == "stone":
-                        for ore_type, min_d, max_d, rarity in ores_to_generate:
-                            if min_d <= y_ore_check <= max_d and random.randint(1, 1000) <= rarity:
-                                self.world[(x_coord, y_ore_check, z_coord)] = ore_type
-                                break
-        
-        if random.random() < 0.15: 
-            for _ in range(random.randint(1, 3)):
-                x_tree, z_tree = start_x + random.randint(2, self.chunk_size-3), start_z + random.randint(2, self.chunk_size-3)
-                if self.world.get((x_tree, base_y_level, z_tree)) == "grass_block":
-                    tree_type = "birch" if random.random() < 0.3 else "oak" 
-                    self.generate_tree(x_tree, base_y_level + 1, z_tree, tree_type=tree_type)
-
-        logging.info(f"Generated chunk at ({chunk_x}, {chunk_z})")
+        terrain.generate_chunk(self.world, chunk_x, chunk_z, self.chunk_size, rng=terrain.chunk_rng(self.world_seed, chunk_x, chunk_z), seed=self.world_seed)
 
     def _manage_world_chunks(self):
         player_chunk_x = math.floor(self.position[0] / self.chunk_size)
         player_chunk_z = math.floor(self.position[2] / self.chunk_size)
+        chunk_distance_sq = lambda chunk_key: (chunk_key[0] - player_chunk_x) ** 2 + (chunk_key[1] - player_chunk_z) ** 2
+        self._collect_finished_chunk_writes()
         
-        new_chunks_generated = False
+        missing_chunks = []
         for cx in range(player_chunk_x - self.chunk_load_distance, player_chunk_x + self.chunk_load_distance + 1):
             for cz in range(player_chunk_z - self.chunk_load_distance, player_chunk_z + self.chunk_load_distance + 1):
-                if (cx, cz) not in self.generated_chunks:
-                    self.generate_chunk(cx, cz)
-                    self.generated_chunks.add((cx, cz))
-                    new_chunks_generated = True
-        
-        if new_chunks_generated:
-            self.chunk_dirty = True
+                if (cx, cz) not in self.generated_chunks and (cx, cz) not in self.pending_chunks:
+                    missing_chunks.append((cx, cz))
+        # 由近到遠送出，執行緒池依序處理，玩家附近的區塊最先完成；存過檔的（玩家改過的）從磁碟讀取，其餘依種子生成
+        for cx, cz in sorted(missing_chunks, key=chunk_distance_sq):
+            if (cx, cz) in self.evicted_unsaved:
+                # 剛被卸載、還在排隊寫回磁碟的區塊直接取回副本
+                self._integrate_chunk(self.evicted_unsaved[(cx, cz)].copy(), dirty=False)
+            elif (cx, cz) in self.saved_chunks:
+                self.pending_chunks[(cx, cz)] = self.chunk_executor.submit(self.region_storage.load_chunk, cx, cz)
+            else:
+                self.pending_chunks[(cx, cz)] = self.chunk_executor.submit(terrain.generate_chunk_payload, cx, cz, self.chunk_size, self.world_seed)
+
+        # 傳送或快速移動後已超出範圍、尚未開始的工作直接取消
+        for chunk_key, future in list(self.pending_chunks.items()):
+            if max(abs(chunk_key[0] - player_chunk_x), abs(chunk_key[1] - player_chunk_z)) > self.chunk_load_distance and future.cancel():
+                del self.pending_chunks[chunk_key]
+
+        finished_chunks = sorted((chunk_key for chunk_key, future in self.pending_chunks.items() if future.done()), key=chunk_distance_sq)
+        deadline = time.perf_counter() + self.chunk_integrate_budget
+        for chunk_key in finished_chunks:
+            future = self.pending_chunks.pop(chunk_key)
+            try:
+                chunk = future.result()
+            except Exception as e:
+                logging.error(f"背景載入/生成區塊 {chunk_key} 失敗: {e}", exc_info=True)
+                continue
+            if chunk is None:
+                logging.warning(f"區塊 {chunk_key} 不在區域檔中，改為重新生成。")
+                self.saved_chunks.discard(chunk_key)
+                continue
+            # 生成的區塊可由種子重現，玩家沒改過就不寫入磁碟
+            self._integrate_chunk(chunk, dirty=False)
+            if time.perf_counter() >= deadline: break
+
+        if self.last_managed_player_chunk != (player_chunk_x, player_chunk_z):
+            self.last_managed_player_chunk = (player_chunk_x, player_chunk_z)
+            self._evict_far_chunks(player_chunk_x, player_chunk_z)
+
+    def _integrate_chunk(self, chunk, dirty):
+        chunk_key = (chunk.cx, chunk.cz)
+        self.world.put_chunk(chunk, dirty=dirty)
+        self.generated_chunks.add(chunk_key)
+        self.chunk_lru[chunk_key] = None
+        self._mark_chunk_dirty(*chunk_key)
+
+    def _evict_far_chunks(self, player_chunk_x, player_chunk_z):
+        is_far = lambda chunk_key: max(abs(chunk_key[0] - player_chunk_x), abs(chunk_key[1] - player_chunk_z)) > self.chunk_unload_distance
+        for chunk_key in list(self.chunk_lru):
+            if not is_far(chunk_key): self.chunk_lru.move_to_end(chunk_key)
+        far_chunks = [chunk_key for chunk_key in self.chunk_lru if is_far(chunk_key)]
+        chunks_to_write = []
+        for chunk_key in far_chunks[:max(0, len(far_chunks) - self.max_cached_chunks)]:
+            del self.chunk_lru[chunk_key]
+            self.generated_chunks.discard(chunk_key)
+            chunk, was_dirty = self.world.remove_chunk(*chunk_key)
+            self.sky_height_map.discard(*chunk_key)
+            if chunk is not None and was_dirty:
+                chunks_to_write.append(chunk)
+        if chunks_to_write:
+            self._queue_chunk_write(chunks_to_write, evicted=True)
+
+    def _write_chunks_timed(self, chunks):
+        start_time = time.perf_counter()
+        bytes_written = self.region_storage.save_chunks(chunks)
+        return bytes_written, time.perf_counter() - start_time
+
+    def _queue_chunk_write(self, chunks, evicted=False):
+        # 所有寫入都排進同一條單執行緒佇列，保證同一區塊的新舊版本依序落地；結果為 (bytes, 秒數)
+        future = self.save_executor.submit(self._write_chunks_timed, chunks)
+        for chunk in chunks:
+            self.saved_chunks.add((chunk.cx, chunk.cz))
+            if evicted: self.evicted_unsaved[(chunk.cx, chunk.cz)] = chunk
+        self.pending_chunk_writes.append((future, chunks))
+        return future
+
+    def _collect_finished_chunk_writes(self):
+        for write in [w for w in self.pending_chunk_writes if w[0].done()]:
+            self.pending_chunk_writes.remove(write)
+            future, chunks = write
+            error = future.exception()
+            for chunk in chunks:
+                chunk_key = (chunk.cx, chunk.cz)
+                if error is not None and self.evicted_unsaved.get(chunk_key) is chunk:
+                    # 寫入失敗就把區塊放回記憶體，保持未存檔狀態等下次再寫
+                    del self.evicted_unsaved[chunk_key]
+                    if chunk_key not in self.world.chunks: self._integrate_chunk(chunk, dirty=True)
+                elif self.evicted_unsaved.get(chunk_key) is chunk:
+                    del self.evicted_unsaved[chunk_key]
+                elif error is not None:
+                    # 自動存檔的快照寫入失敗：區塊還在記憶體就重新標記為未存檔，已被卸載則放回記憶體
+                    if chunk_key in self.world.chunks: self.world.dirty_chunks.add(chunk_key)
+                    elif chunk_key not in self.evicted_unsaved: self._integrate_chunk(chunk, dirty=True)
+            if error is not None:
+                logging.error(f"寫入 {len(chunks)} 個區塊到區域檔失敗: {error}")
+
+    def autosave(self):
+        """在主執行緒複製變動區塊的快照後交給存檔執行緒寫入，不阻塞畫面。"""
+        self.last_autosave_time = time.time()
+        if self.autosave_future is not None and not self.autosave_future.done():
+            return
+        dirty_keys = [chunk_key for chunk_key in self.world.dirty_chunks if chunk_key in self.world.chunks]
+        chunk_snapshots = [self.world.chunks[chunk_key].copy() for chunk_key in dirty_keys]
+        self.world.dirty_chunks.difference_update(dirty_keys)
+        if chunk_snapshots:
+            self.autosave_future = self._queue_chunk_write(chunk_snapshots)
+            self.autosave_future.add_done_callback(lambda future, count=len(chunk_snapshots): self._record_autosave(future, count))
+        player_text = json.dumps(self._player_save_data(), indent=2, ensure_ascii=False)
+        self.save_executor.submit(self._write_player_file, player_text)
+
+    def _record_autosave(self, future, chunk_count):
+        # 在存檔執行緒回呼，只更新統計數字供除錯資訊顯示
+        if future.cancelled() or future.exception() is not None: return
+        bytes_written, elapsed = future.result()
+        self.last_autosave_stats = (elapsed, bytes_written, chunk_count)
+        self.finished_save_writes.append(elapsed)
+        logging.info(f"自動存檔完成: {chunk_count} 個區塊, {bytes_written} bytes, {elapsed * 1000:.1f} ms")
+
+    def _player_save_data(self):
+        return {
+            "player_id": self.player_id,
+            "mode": self.mode,
+            "position": [round(p, 2) for p in self.position],
+            "rotation": [round(r, 2) for r in self.rotation],
+            "hotbar": self.hotbar,
+            "main_inventory": self.main_inventory,
+            "inventory_crafting_grid": self.inventory_crafting_grid,
+            "crafting_table_grid": self.crafting_table_grid,
+            "current_hotbar_index": self.current_hotbar_index
+        }
+
+    def _write_player_file(self, player_text):
+        player_data_file_path = os.path.join(MAIN_SCRIPT_DIR, "playerdata", "player.json")
+        os.makedirs(os.path.dirname(player_data_file_path), exist_ok=True)
+        temp_path = player_data_file_path + ".tmp"
+        with open(temp_path, "w", encoding='utf-8') as f:
+            f.write(player_text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, player_data_file_path)
+        return player_data_file_path
+
+    def is_player_chunk_pending(self):
+        player_chunk = (math.floor(self.position[0] / self.chunk_size), math.floor(self.position[2] / self.chunk_size))
+        return player_chunk not in self.generated_chunks
+
+    def shutdown_workers(self):
+        self.chunk_executor.shutdown(wait=False, cancel_futures=True)
+        # 存檔佇列必須寫完，否則被卸載的區塊會遺失
+        self.save_executor.shutdown(wait=True)
+        self.profiler.stop_trace()
 
 
     def load_world(self):
         self.init_world_file()
-        world_file_path = os.path.join(MAIN_SCRIPT_DIR, "worlds", "world.json")
         try:
-            with open(world_file_path, "r", encoding='utf-8') as f: content = f.read()
-            data = json.loads(content) if content.strip() else {}
-            
-            if isinstance(data, dict):
-                self.world = {tuple(map(int, k.split(','))): v for k, v in data.items()}
-                if self.world:
-                    for x, y, z in self.world.keys():
-                        self.generated_chunks.add((math.floor(x / self.chunk_size), math.floor(z / self.chunk_size)))
-                    logging.info(f"World data loaded. {len(self.world)} blocks, {len(self.generated_chunks)} chunks.")
-            else: logging.warning(f"World data format error. Starting fresh.")
-        except (json.JSONDecodeError, FileNotFoundError, Exception) as e:
-            logging.error(f"Error reading world file {world_file_path}: {e}. Starting fresh.", exc_info=True)
+            self.world = WorldStore()
+            self.generated_chunks.clear(); self.chunk_lru.clear()
+            # 只讀取區域檔的位移表；啟動時僅載入玩家附近的區塊，其餘交給 _manage_world_chunks 隨需讀取
+            self.saved_chunks = self.region_storage.chunk_keys()
+            player_chunk_x = math.floor(self.position[0] / self.chunk_size)
+            player_chunk_z = math.floor(self.position[2] / self.chunk_size)
+            for cx in range(player_chunk_x - self.chunk_load_distance, player_chunk_x + self.chunk_load_distance + 1):
+                for cz in range(player_chunk_z - self.chunk_load_distance, player_chunk_z + self.chunk_load_distance + 1):
+                    if (cx, cz) in self.saved_chunks:
+                        chunk = self.region_storage.load_chunk(cx, cz)
+                        if chunk is not None: self._integrate_chunk(chunk, dirty=False)
+            if self.saved_chunks:
+                logging.info(f"World data loaded. {len(self.world)} blocks in {len(self.generated_chunks)} nearby chunks ({len(self.saved_chunks)} chunks on disk).")
+        except Exception as e:
+            logging.error(f"Error reading region files in {self.region_storage.region_dir}: {e}. Starting fresh.", exc_info=True)
+            self.world = WorldStore(); self.generated_chunks.clear(); self.chunk_lru.clear(); self.saved_chunks = set()
         self.chunk_dirty = True
 
     def init_world_file(self):
-        path=os.path.join(MAIN_SCRIPT_DIR,"worlds","world.json"); os.makedirs(os.path.dirname(path),exist_ok=True)
-        if not os.path.exists(path) or os.path.getsize(path)==0:
+        world_dir = os.path.join(MAIN_SCRIPT_DIR, "worlds"); os.makedirs(world_dir, exist_ok=True)
+        self.world_seed = self._load_or_create_world_seed(os.path.join(world_dir, "level.json"), os.path.join(world_dir, "region"))
+        # 差異存檔：只記錄玩家改動過的格子，讀取時依種子重新生成地形再套用
+        base_chunk = (lambda cx, cz: terrain.generate_chunk_payload(cx, cz, self.chunk_size, self.world_seed)) if self.save_deltas else None
+        self.region_storage = RegionStorage(os.path.join(world_dir, "region"), base_chunk=base_chunk)
+        # 舊版 world.json 只在第一次啟動時轉換成區域檔
+        legacy_path = os.path.join(world_dir, "world.json")
+        if os.path.exists(legacy_path) and not self.region_storage.region_keys():
             try:
-                with open(path,"w",encoding='utf-8') as f: json.dump({},f); logging.info(f"Initialized empty world file at {path}")
-            except IOError as e: logging.error(f"Error initializing world file {path}: {e}", exc_info=True)
+                migrate_json_world(legacy_path, self.region_storage)
+            except Exception as e: logging.error(f"轉換舊版世界檔 {legacy_path} 失敗: {e}", exc_info=True)
+
+    def _load_or_create_world_seed(self, level_path, region_dir):
+        # 區域檔裡的差異紀錄是對這個種子的地形記下的，換種子會把所有存檔區塊套到別的地形上；
+        # 只有完全沒有世界（沒有 level.json 也沒有區域檔）時才建立新種子，其餘情況拒絕載入、保留原檔
+        if os.path.exists(level_path):
+            try:
+                with open(level_path, "r", encoding="utf-8") as f: return int(json.load(f)["seed"])
+            except Exception as e:
+                raise RuntimeError(f"讀取世界種子 {level_path} 失敗: {e}；為避免區域檔套用到錯誤的地形，拒絕載入，請修復或移除整個世界資料夾") from e
+        if RegionStorage(region_dir).region_keys():
+            raise RuntimeError(f"找不到世界種子 {level_path}，但 {region_dir} 已有區域檔；為避免區域檔套用到錯誤的地形，拒絕建立新種子")
+        world_seed = random.getrandbits(63)
+        temp_path = level_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f: json.dump({"seed": world_seed}, f, indent=2)
+        os.replace(temp_path, level_path)
+        logging.info(f"建立新的世界種子 {world_seed} ({level_path})")
+        return world_seed
 
     def save_game(self):
-        world_file_path=os.path.join(MAIN_SCRIPT_DIR,"worlds","world.json"); player_data_file_path=os.path.join(MAIN_SCRIPT_DIR,"playerdata","player.json")
-        os.makedirs(os.path.dirname(world_file_path),exist_ok=True); os.makedirs(os.path.dirname(player_data_file_path),exist_ok=True)
+        save_started = time.perf_counter()
         try:
-            world_serializable={f"{k[0]},{k[1]},{k[2]}":v for k,v in self.world.items()}
-            with open(world_file_path,"w",encoding='utf-8') as f: json.dump(world_serializable,f,indent=2,ensure_ascii=False)
+            dirty_chunks = [self.world.chunks[chunk_key] for chunk_key in self.world.dirty_chunks if chunk_key in self.world.chunks]
+            # 排在卸載寫入與自動存檔之後並等待完成，關閉前所有區塊都已落地
+            world_bytes_written, _ = self._queue_chunk_write(dirty_chunks).result()
+            self.world.dirty_chunks.clear()
+            self._collect_finished_chunk_writes()
             
             self._return_held_and_crafting_items()
 
-            player_data={
-                "player_id": self.player_id,
-                "mode": self.mode, 
-                "position": [round(p, 2) for p in self.position],
-                "rotation": [round(r, 2) for r in self.rotation],
-                "hotbar": self.hotbar,
-                "main_inventory": self.main_inventory,
-                "inventory_crafting_grid": self.inventory_crafting_grid,
-                "crafting_table_grid": self.crafting_table_grid,
-                "current_hotbar_index": self.current_hotbar_index
-            }
-            with open(player_data_file_path,"w",encoding='utf-8') as f: json.dump(player_data,f,indent=2,ensure_ascii=False)
-            logging.info(f"Game saved. World ({len(world_serializable)} blocks) to {world_file_path}. Player data to {player_data_file_path}")
+            player_text = json.dumps(self._player_save_data(), indent=2, ensure_ascii=False)
+            player_data_file_path = self.save_executor.submit(self._write_player_file, player_text).result()
+            logging.info(f"Game saved. World ({len(dirty_chunks)} modified chunks, {world_bytes_written} bytes) to {self.region_storage.region_dir}. Player data to {player_data_file_path}")
         except Exception as e: logging.error(f"儲存遊戲失敗:{e}", exc_info=True)
+        self.profiler.record("save_game", time.perf_counter() - save_started)
 
 
     def rebuild_breaking_effect(self):
@@ -969,8 +1298,9 @@ class Game:
             texture_group=self.break_texture_groups[self.breaking_block_stage]
             if texture_group:
                 x,y,z = self.breaking_block_pos
+                stage_uv = self.break_stage_uvs[self.breaking_block_stage]
                 for face_idx in range(6): 
-                    v,tc=self.get_block_face_vertices(x-0.001,y-0.001,z-0.001,face_idx,scale=1.002, rotation=0) 
+                    v,tc=self.get_block_face_vertices(x-0.001,y-0.001,z-0.001,face_idx,scale=1.002, rotation=0, uv_rect=stage_uv) 
                     self.breaking_effect_batch.add(4,gl.GL_QUADS,texture_group,('v3f/static',v),('t2f/static',tc))
 
     def draw_breaking_effect(self):
@@ -979,65 +1309,41 @@ class Game:
             self.breaking_effect_batch.draw()
             gl.glDisable(gl.GL_BLEND)
 
+    def _is_solid_block(self, x, y, z): return self.solid_lookup.is_solid(self.world, x, y, z)
+
+    def _player_aabb(self, pos_x, pos_y, pos_z):
+        half_width = 0.3
+        return (pos_x - half_width, pos_y, pos_z - half_width), (pos_x + half_width, pos_y + self.player_height, pos_z + half_width)
+
     def check_collision_bbox(self, pos_x, pos_y, pos_z):
-        player_width, non_solid_blocks = 0.6, {"oak_leaves", "birch_leaves"}
-        min_x,max_x = pos_x - player_width/2, pos_x + player_width/2
-        min_y,max_y = pos_y, pos_y + self.player_height 
-        min_z,max_z = pos_z - player_width/2, pos_z + player_width/2
-
-        for ix in range(math.floor(min_x),math.ceil(max_x)):
-            for iy in range(math.floor(min_y),math.ceil(max_y)):
-                for iz in range(math.floor(min_z),math.ceil(max_z)):
-                    block_type=self.world.get((ix,iy,iz))
-                    if block_type and block_type not in non_solid_blocks:
-                        block_min_x,block_max_x=ix,ix+1
-                        block_min_y,block_max_y=iy,iy+1
-                        block_min_z,block_max_z=iz,iz+1
-                        if (min_x<block_max_x and max_x>block_min_x and \
-                            min_y<block_max_y and max_y>block_min_y and \
-                            min_z<block_max_z and max_z>block_min_z):
-                            return True 
-        return False 
+        box_min, box_max = self._player_aabb(pos_x, pos_y, pos_z)
+        return aabb_overlaps_solid(box_min, box_max, self._is_solid_block)
+
+    def move_player_axis(self, axis, delta):
+        """沿單一軸做 swept AABB 移動，停在接觸面上；回傳接觸面法線（0 表示沒有碰撞）。"""
+        box_min, box_max = self._player_aabb(*self.position)
+        moved, normal = sweep_aabb_axis(box_min, box_max, axis, delta, self._is_solid_block)
+        self.position[axis] += moved
+        return normal
 
     def get_selected_block_type(self): return self.selected_block
 
-    def get_target_block(self, max_distance=8):
-        eye_y_offset=self.player_height*0.85 
-        if self.is_sneaking and self.mode=="survival": 
-            eye_y_offset-=self.sneak_camera_offset_y
-        
-        eye_x,eye_y,eye_z = self.position[0], self.position[1]+eye_y_offset, self.position[2]
-        
+    def get_target_block(self, max_distance=8, block_filter=None):
+        """回傳準星指到的 (方塊座標, 進入面法線)；block_filter(方塊類型) 為 False 的方塊會被射線穿過。"""
         yaw,pitch = self.rotation[0], self.rotation[1]
         rad_yaw,rad_pitch = math.radians(yaw), math.radians(pitch)
         
         dx_view, dy_view, dz_view = math.cos(rad_pitch) * -math.sin(rad_yaw), math.sin(rad_pitch), math.cos(rad_pitch) * -math.cos(rad_yaw)
 
-        step_size, last_air_block_coord = 0.05, None
+        world_get = self.world.get
+        def is_hit(pos):
+            block_type = world_get(pos)
+            return block_type is not None and (block_filter is None or block_filter(block_type))
 
-        for i in range(int(max_distance/step_size)+1): 
-            current_x, current_y, current_z = eye_x + dx_view*i*step_size, eye_y + dy_view*i*step_size, eye_z + dz_view*i*step_size
-            block_pos_tuple=(math.floor(current_x),math.floor(current_y),math.floor(current_z))
-
-            if block_pos_tuple in self.world: 
-                face_hit=[0,0,0] 
-                if last_air_block_coord:
-                    diff_x, diff_y, diff_z = last_air_block_coord[0]-block_pos_tuple[0], last_air_block_coord[1]-block_pos_tuple[1], last_air_block_coord[2]-block_pos_tuple[2]
-                    if abs(diff_x) > abs(diff_y) and abs(diff_x) > abs(diff_z): face_hit[0]=int(math.copysign(1, diff_x))
-                    elif abs(diff_y) > abs(diff_z): face_hit[1]=int(math.copysign(1, diff_y))
-                    else: face_hit[2]=int(math.copysign(1, diff_z))
-                else: 
-                    frac_x, frac_y, frac_z = current_x - block_pos_tuple[0] - 0.5, current_y - block_pos_tuple[1] - 0.5, current_z - block_pos_tuple[2] - 0.5
-                    abs_fx,abs_fy,abs_fz=abs(frac_x),abs(frac_y),abs(frac_z)
-                    if abs_fx>abs_fy and abs_fx>abs_fz: face_hit[0]=1 if frac_x<0 else -1
-                    elif abs_fy>abs_fz: face_hit[1]=1 if frac_y<0 else -1
-                    else: face_hit[2]=1 if frac_z<0 else -1
-                
-                if face_hit==[0,0,0]: face_hit=[0,1,0] 
-                return block_pos_tuple,tuple(face_hit)
-            
-            last_air_block_coord=block_pos_tuple 
-        return None 
+        hit = raycast_voxels(self.get_camera_position(), (dx_view, dy_view, dz_view), max_distance, is_hit)
+        if hit is None: return None
+        block_pos_tuple, face_hit, _ = hit
+        return block_pos_tuple, face_hit
 
     def sort_main_inventory(self):
         if not self.show_inventory: return
@@ -1185,6 +1491,44 @@ class Game:
             else:
                 self.add_chat_feedback(f"無效的目標選擇器 '{args[0]}'", color=error_color)
 
+        elif cmd == "/seed":
+            self.add_chat_feedback(f"種子: [{self.world_seed}]")
+
+        elif cmd == "/trace":
+            if len(args) == 2 and args[0] == "start" and args[1] in ("csv", "json"):
+                profile_dir = os.path.join(MAIN_SCRIPT_DIR, "profiles")
+                os.makedirs(profile_dir, exist_ok=True)
+                trace_path = os.path.join(profile_dir, time.strftime("trace_%Y%m%d_%H%M%S") + (".csv" if args[1] == "csv" else ".jsonl"))
+                self.profiler.start_trace(trace_path)
+                self.add_chat_feedback(f"效能追蹤寫入 {trace_path}")
+            elif args == ["stop"]:
+                self.profiler.stop_trace()
+                self.add_chat_feedback("效能追蹤已停止。")
+            else:
+                self.add_chat_feedback("用法: /trace start <csv|json> 或 /trace stop", color=error_color)
+
+        elif cmd == "/renderer":
+            if len(args) == 1 and args[0] in ("shader", "legacy"):
+                if args[0] == "shader" and not self.shader_renderer:
+                    self.add_chat_feedback("此顯示卡不支援著色器繪製。", color=error_color)
+                else:
+                    self.use_shader_renderer = args[0] == "shader"
+                    # 兩種網格格式不同，全部丟掉重建
+                    for mesh in self.chunk_meshes.values(): self._release_chunk_mesh(mesh)
+                    self.chunk_meshes.clear(); self.chunk_mesh_bounds.clear(); self.chunk_mesh_vertex_counts.clear()
+                    self.chunk_dirty = True
+                    self.add_chat_feedback(f"區塊繪製方式: {'著色器' if self.use_shader_renderer else '固定管線'}。")
+            else:
+                self.add_chat_feedback("用法: /renderer <shader|legacy>", color=error_color)
+
+        elif cmd == "/greedymesh":
+            if len(args) == 1 and args[0] in ("on", "off"):
+                self.greedy_meshing = args[0] == "on"
+                self.dirty_mesh_chunks.update(self.chunk_meshes); self.chunk_dirty = True
+                self.add_chat_feedback(f"Greedy meshing 已{'開啟' if self.greedy_meshing else '關閉'}。")
+            else:
+                self.add_chat_feedback("用法: /greedymesh <on|off>", color=error_color)
+
         else:
             self.add_chat_feedback(f"未知或無效的指令: '{command_text.split()[0]}'", color=error_color)
 
@@ -1319,6 +1663,10 @@ class Game:
         current_time = time.time()
         ui_interaction_key_pressed = False 
 
+        if symbol == pyglet.window.key.F3:
+            self.show_debug_overlay = not self.show_debug_overlay
+            return pyglet.event.EVENT_HANDLED
+
         if symbol == pyglet.window.key.F11:
             self.window.set_fullscreen(not self.window.fullscreen)
             logging.info(f"Fullscreen toggled to: {self.window.fullscreen}")
@@ -1448,22 +1796,46 @@ class Game:
         if button == self.keybindings.get('sprint'):
             self.is_sprinting = False
 
+    def tick(self, dt):
+        """每個渲染影格呼叫一次：累積經過時間，以固定步長 sim_step 推進 update，一格最多補 max_sim_steps 步。"""
+        self.sim_accumulator += dt
+        steps = 0
+        while self.sim_accumulator >= self.sim_step and steps < self.max_sim_steps:
+            self.previous_position = list(self.position)
+            with self.profiler.section("update"): self.update(self.sim_step)
+            self.sim_accumulator -= self.sim_step; steps += 1
+        if self.sim_accumulator >= self.sim_step:
+            # 落後太多就放掉補不完的時間，避免慢影格越補越慢
+            logging.debug(f"模擬落後，捨棄 {self.sim_accumulator * 1000:.0f}ms")
+            self.sim_accumulator = 0.0
+        self.render_alpha = self.sim_accumulator / self.sim_step
+
+    def get_render_position(self):
+        # 傳送、重生這類瞬間移動不做內插，直接畫在新位置
+        if any(abs(current - previous) > 4.0 for current, previous in zip(self.position, self.previous_position)):
+            return tuple(self.position)
+        alpha = self.render_alpha
+        return tuple(previous + (current - previous) * alpha for current, previous in zip(self.position, self.previous_position))
+
     def update(self, dt):
-        if self.chat_feedback_messages:
-            current_time = time.time()
-            self.chat_feedback_messages = [msg for msg in self.chat_feedback_messages if msg['expiry'] > current_time]
+        self.chat_log.expire(time.time())
+
+        if time.time() - self.last_autosave_time >= self.autosave_interval:
+            with self.profiler.section("save_game"): self.autosave()
+        while self.finished_save_writes: self.profiler.record("save_write", self.finished_save_writes.popleft())
 
         if self.pause_menu or self.show_keybinding_menu: return 
         if dt > 0.1: dt = 0.1
 
         self._update_tooltip()
         
-        self._manage_world_chunks()
+        with self.profiler.section("manage_chunks"): self._manage_world_chunks()
 
         old_player_chunk_x = math.floor(self.position[0] / self.chunk_size)
         old_player_chunk_z = math.floor(self.position[2] / self.chunk_size)
 
-        if not self.chat_active and not self.show_inventory and not self.show_crafting_table_ui:
+        # 腳下區塊還在背景生成時先凍結玩家，避免掉出世界
+        if not self.chat_active and not self.show_inventory and not self.show_crafting_table_ui and not self.is_player_chunk_pending():
             dx_input, dz_input = 0.0, 0.0
             dy_input_creative_fly = 0.0
             current_speed = self.normal_move_speed
@@ -1516,10 +1888,8 @@ class Game:
                 block_below_x_pos = (math.floor(check_x), math.floor(self.position[1] - 0.1), math.floor(self.position[2]))
                 if block_below_x_pos not in self.world:
                     dx_input = 0
-                    next_pos_x = self.position[0]
             
-            if not self.check_collision_bbox(next_pos_x, self.position[1], self.position[2]):
-                self.position[0] = next_pos_x
+            self.move_player_axis(0, dx_input)
             
             next_pos_z = self.position[2] + dz_input
             if self.is_sneaking and self.on_ground:
@@ -1527,44 +1897,25 @@ class Game:
                 block_below_z_pos = (math.floor(self.position[0]), math.floor(self.position[1] - 0.1), math.floor(check_z))
                 if block_below_z_pos not in self.world:
                     dz_input = 0
-                    next_pos_z = self.position[2]
 
-            if not self.check_collision_bbox(self.position[0], self.position[1], next_pos_z):
-                self.position[2] = next_pos_z
+            self.move_player_axis(2, dz_input)
 
 
             if self.mode == "creative" and self.is_flying_creative:
                 self.on_ground = False 
                 self.velocity[1] = 0   
                 
-                next_pos_y_fly = self.position[1] + dy_input_creative_fly
-                if not self.check_collision_bbox(self.position[0], next_pos_y_fly, self.position[2]):
-                    self.position[1] = next_pos_y_fly
-                else: 
-                    if dy_input_creative_fly < 0: 
-                        self.position[1] = math.floor(next_pos_y_fly) + 1.0 
-                        if self.check_collision_bbox(self.position[0], self.position[1] - 0.01, self.position[2]):
-                            self.is_flying_creative = False 
-                            self.on_ground = True
-                    elif dy_input_creative_fly > 0: 
-                        self.position[1] = math.floor(next_pos_y_fly + self.player_height) - self.player_height - 0.01 
+                if self.move_player_axis(1, dy_input_creative_fly) == 1:  # 往下飛碰到地面就落地
+                    self.is_flying_creative = False
+                    self.on_ground = True
             else: 
                 self.velocity[1] += self.gravity * dt
                 self.velocity[1] = max(self.velocity[1], -50.0) 
                 
-                next_pos_y_normal = self.position[1] + self.velocity[1] * dt
-                self.on_ground = False 
-
-                if not self.check_collision_bbox(self.position[0], next_pos_y_normal, self.position[2]):
-                    self.position[1] = next_pos_y_normal
-                else: 
-                    if self.velocity[1] <= 0: 
-                        self.position[1] = math.floor(next_pos_y_normal) + 1.0 
-                        self.on_ground = True
-                        self.velocity[1] = 0 
-                    elif self.velocity[1] > 0: 
-                        self.position[1] = math.floor(next_pos_y_normal + self.player_height) - self.player_height - 0.01
-                        self.velocity[1] = 0 
+                # 掃過整段位移的每一層方塊，-50 m/s 配合 dt 上限 0.1 也不會穿過地面
+                normal_y = self.move_player_axis(1, self.velocity[1] * dt)
+                self.on_ground = normal_y == 1
+                if normal_y != 0: self.velocity[1] = 0
 
         if self.breaking_block_pos and not self.show_inventory and not self.pause_menu and not self.show_crafting_table_ui:
             block_type_at_breaking_pos = self.world.get(self.breaking_block_pos)
@@ -1580,11 +1931,11 @@ class Game:
                     self.breaking_block_pos = None; self.breaking_block_stage = 0; self.rebuild_breaking_effect() 
                 elif elapsed_time >= required_time: 
                     self.world.pop(self.breaking_block_pos)
+                    self._mark_block_dirty(self.breaking_block_pos)
                     self.trigger_arm_swing_animation()
                     if self.mode == "survival": 
                         self.add_item_to_inventory(block_type_at_breaking_pos, 1)
                         logging.info(f"Broke {block_type_at_breaking_pos}, added to inventory.")
-                    self.chunk_dirty = True
                     self.breaking_block_pos = None; self.breaking_block_stage = 0; self.rebuild_breaking_effect() 
                     self.update_selected_block_from_hotbar() 
                 else: 
@@ -1610,32 +1961,37 @@ class Game:
         sneak_status = " Sneaking" if self.is_sneaking else ""
         sprint_status = " Sprinting" if self.is_sprinting else ""
         fly_status = " Flying" if self.mode=="creative" and self.is_flying_creative else ""
-        self.pos_label.text = (f"Pos:({self.position[0]:.1f},{self.position[1]:.1f},{self.position[2]:.1f}) R:({self.rotation[0]:.0f},{self.rotation[1]:.0f}) Ground:{self.on_ground} Mode:{self.mode}{sneak_status}{sprint_status}{fly_status} V_Y:{self.velocity[1]:.1f}")
+        autosave_status = ""
+        if self.last_autosave_stats:
+            autosave_elapsed, autosave_bytes, _ = self.last_autosave_stats
+            autosave_status = f" Autosave:{autosave_elapsed * 1000:.0f}ms/{autosave_bytes / 1024:.1f}KB"
+        self.pos_label.text = (f"Pos:({self.position[0]:.1f},{self.position[1]:.1f},{self.position[2]:.1f}) R:({self.rotation[0]:.0f},{self.rotation[1]:.0f}) Ground:{self.on_ground} Mode:{self.mode}{sneak_status}{sprint_status}{fly_status} V_Y:{self.velocity[1]:.1f} Chunks:{self.drawn_chunk_count}/{len(self.chunk_meshes)}{autosave_status}")
         if self.mode == "survival": 
             self.hp_label.text = f"HP:{self.hp}/{self.max_hp}"
             self.hunger_label.text = f"Hunger:{self.hunger}/{self.max_hunger}"
 
-    def get_camera_position(self):
+    def get_camera_position(self, interpolated=False):
         eye_y_offset = self.player_height * 0.85
         if self.is_sneaking and self.mode == "survival":
             eye_y_offset -= self.sneak_camera_offset_y
         
-        player_eye_x = self.position[0]
-        player_eye_y = self.position[1] + eye_y_offset
-        player_eye_z = self.position[2]
+        base_x, base_y, base_z = self.get_render_position() if interpolated else self.position
+        player_eye_x = base_x
+        player_eye_y = base_y + eye_y_offset
+        player_eye_z = base_z
         
         return (player_eye_x, player_eye_y, player_eye_z)
 
     def setup_3d(self):
         w,h=self.window.get_size()
-        sky_color=(0.5,0.7,0.95,1.0)
+        sky_color=self.sky_color
         gl.glClearColor(*sky_color)
         gl.glEnable(gl.GL_TEXTURE_2D)
         gl.glEnable(gl.GL_FOG)
         gl.glFogi(gl.GL_FOG_MODE,gl.GL_LINEAR)
         gl.glFogfv(gl.GL_FOG_COLOR,(gl.GLfloat*4)(*sky_color))
-        gl.glFogf(gl.GL_FOG_START,20.0)
-        gl.glFogf(gl.GL_FOG_END,80.0)
+        gl.glFogf(gl.GL_FOG_START,self.fog_range[0])
+        gl.glFogf(gl.GL_FOG_END,self.fog_range[1])
         gl.glEnable(gl.GL_DEPTH_TEST)
         gl.glDisable(gl.GL_CULL_FACE)
         gl.glEnable(gl.GL_ALPHA_TEST)
@@ -1643,14 +1999,14 @@ class Game:
         gl.glViewport(0,0,w,h)
         gl.glMatrixMode(gl.GL_PROJECTION)
         gl.glLoadIdentity()
-        gluPerspective(65,w/h if h>0 else 1,0.1,200)
+        gluPerspective(self.fov_y,w/h if h>0 else 1,self.z_near,self.z_far)
         gl.glMatrixMode(gl.GL_MODELVIEW)
         gl.glLoadIdentity()
 
         gl.glRotatef(-self.rotation[1],1.0,0.0,0.0)
         gl.glRotatef(-self.rotation[0],0.0,1.0,0.0)
 
-        cam_x, cam_y, cam_z = self.get_camera_position()
+        cam_x, cam_y, cam_z = self.get_camera_position(interpolated=True)
         gl.glTranslatef(-cam_x, -cam_y, -cam_z)
 
     def setup_2d(self):
@@ -1659,25 +2015,29 @@ class Game:
         gl.glMatrixMode(gl.GL_PROJECTION); gl.glLoadIdentity(); gl.gluOrtho2D(0,w,0,h)
         gl.glMatrixMode(gl.GL_MODELVIEW); gl.glLoadIdentity()
 
+    def draw_debug_overlay(self):
+        if not self.show_debug_overlay: return
+        # 多行 Label 重新排版很貴，每 0.25 秒才更新一次文字
+        now = time.perf_counter()
+        if now >= self.debug_overlay_refresh_time:
+            self.debug_overlay_refresh_time = now + 0.25
+            w, h = self.window.get_size()
+            self.debug_overlay_label.x, self.debug_overlay_label.y = w - 10, h - 10
+            self.debug_overlay_label.text = "\n".join(self.profiler.overlay_lines())
+        self.debug_overlay_label.draw()
+
     def _draw_text_with_shadow(self, text, x, y, font_size, color=(255,255,255,255), shadow_color=(60,60,60,255), anchor_x='right', anchor_y='bottom', bold=True):
         # Draw shadow
-        pyglet.text.Label(text, font_size=font_size, x=x+1, y=y-1, anchor_x=anchor_x, anchor_y=anchor_y, color=shadow_color, bold=bold).draw()
+        self.text_cache.draw(text, x+1, y-1, font_size=font_size, anchor_x=anchor_x, anchor_y=anchor_y, color=shadow_color, bold=bold)
         # Draw main text
-        pyglet.text.Label(text, font_size=font_size, x=x, y=y, anchor_x=anchor_x, anchor_y=anchor_y, color=color, bold=bold).draw()
+        self.text_cache.draw(text, x, y, font_size=font_size, anchor_x=anchor_x, anchor_y=anchor_y, color=color, bold=bold)
 
     def _draw_item_texture_in_slot(self, item_id, x, y, size):
         if not item_id: return
         
-        texture_key = item_id
-        if item_id == "grass_block": texture_key = "grass_block_top"
-        elif item_id == "oak_log": texture_key = "oak_log_side"
-        elif item_id == "birch_log": texture_key = "birch_log_side"
-        elif item_id == "crafting_table": texture_key = "crafting_table_top"
-        
-        texture_group = self.texture_groups.get(texture_key)
-        if not texture_group: return
+        texture = self.textures.get(self.block_registry.icon_texture(item_id))
+        if not texture: return
 
-        texture = texture_group.texture
         gl.glEnable(texture.target)
         gl.glBindTexture(texture.target, texture.id)
         
@@ -1686,8 +2046,38 @@ class Game:
         
         gl.glDisable(texture.target)
 
+    def _slot_contents(self, container, index):
+        # 格子內容統一成 (物品, 數量)，合成結果本來就是這個格式
+        if container == 'craft_inv_res': return self.inventory_crafting_result or None
+        if container == 'craft_table_res': return self.crafting_table_result or None
+        item_slot = getattr(self, SLOT_CONTAINER_ATTRS[container])[index]
+        return (item_slot['id'], item_slot['count']) if item_slot else None
+
+    def _build_slot_items(self, layer, contents):
+        # 物品圖示都在方塊圖集裡，全部畫成同一個 TextureGroup 的四邊形；數量文字也放進同一個批次
+        batch = layer.item_batch
+        for (_, _, x, y, size), content in zip(layer.slots, contents):
+            if not content or content[1] <= 0: continue
+            item_id, count = content
+            texture = self.textures.get(self.block_registry.icon_texture(item_id))
+            if texture:
+                inset = size * 0.1
+                batch.add(4, gl.GL_QUADS, self.hud_icon_group, ('v2f', quad_vertices(x + inset, y + inset, size - 2 * inset, size - 2 * inset)),
+                          ('t3f', texture.tex_coords), ('c4B', (255,) * 16))
+            if count > 1: layer.item_labels.extend(add_shadowed_text(batch, str(count), x + size - 2, y + 2, layer.count_font_size))
+
+    def _draw_hud_layer(self, name, layout_key):
+        layer = self.hud_layers[name]
+        layer.update(layout_key, self._slot_contents, self._build_slot_items)
+        if name == 'hotbar': layer.move_highlight(self.current_hotbar_index)
+        layer.draw()
+
     def draw_inventory(self):
-        batch = pyglet.graphics.Batch()
+        self._draw_hud_layer('inventory', self.window.get_size())
+
+    def _layout_inventory(self, layer):
+        batch = layer.layout_batch
+        background = pyglet.graphics.OrderedGroup(LAYOUT_ORDER)
         scale = 2.0
         base_w, base_h = 176, 166
         total_width, total_height = base_w * scale, base_h * scale
@@ -1695,7 +2085,7 @@ class Game:
         y_start = (self.window.height - total_height) / 2
 
         bg_color = (198, 198, 198, 255)
-        batch.add(4, gl.GL_QUADS, None, ('v2f', (x_start, y_start, x_start + total_width, y_start, x_start + total_width, y_start + total_height, x_start, y_start + total_height)), ('c4B', bg_color * 4))
+        batch.add(4, gl.GL_QUADS, background, ('v2f', (x_start, y_start, x_start + total_width, y_start, x_start + total_width, y_start + total_height, x_start, y_start + total_height)), ('c4B', bg_color * 4))
         slot_size = 18 * scale
         inv_base_x = x_start + (8 * scale)
         hotbar_y = y_start + (8 * scale)
@@ -1703,20 +2093,22 @@ class Game:
 
         for i in range(self.hotbar_size):
             x = inv_base_x + i * slot_size
-            self._draw_slot(batch, x, hotbar_y, slot_size)
+            self._draw_slot(batch, x, hotbar_y, slot_size, background)
+            layer.slots.append(('hotbar', i, x, hotbar_y, slot_size))
         
         for row in range(self.inventory_rows):
             for col in range(self.inventory_cols):
                 x = inv_base_x + col * slot_size
                 y = main_inv_y_start + (2 - row) * slot_size
-                self._draw_slot(batch, x, y, slot_size)
+                self._draw_slot(batch, x, y, slot_size, background)
+                layer.slots.append(('main', row * self.inventory_cols + col, x, y, slot_size))
             
         # 裝備欄（頭、身、褲、鞋）
         armor_x = inv_base_x
         armor_y_start = y_start + total_height - (26 * scale)
         for i in range(4):
             y = armor_y_start - i * slot_size
-            self._draw_slot(batch, armor_x, y, slot_size)
+            self._draw_slot(batch, armor_x, y, slot_size, background)
 
         # 合成格（2x2）
         craft_base_x = x_start + 88 * scale
@@ -1725,7 +2117,8 @@ class Game:
             row, col = divmod(i, 2)
             x = craft_base_x + col * slot_size
             y = craft_base_y + (1-row) * slot_size
-            self._draw_slot(batch, x, y, slot_size)
+            self._draw_slot(batch, x, y, slot_size, background)
+            layer.slots.append(('craft_inv', i, x, y, slot_size))
 
         # 合成結果格與箭頭（保留箭頭與結果格，移除副手與綠色書）
         arrow_y_center = craft_base_y + slot_size / 2
@@ -1734,51 +2127,25 @@ class Game:
         shaft_h = 7 * scale; shaft_w = 15 * scale
         arrow_color_tuple = (139, 139, 139, 255) * 4
         shaft_y = arrow_y_center - shaft_h / 2
-        batch.add(4, gl.GL_QUADS, None, ('v2f', (arrow_x, shaft_y, arrow_x + shaft_w, shaft_y, arrow_x + shaft_w, shaft_y + shaft_h, arrow_x, shaft_y + shaft_h)), ('c4B', arrow_color_tuple))
-        batch.add(3, gl.GL_TRIANGLES, None, ('v2f', (arrow_x + shaft_w, arrow_y_center - arrow_h/2, arrow_x + shaft_w, arrow_y_center + arrow_h/2, arrow_x + arrow_w, arrow_y_center)), ('c4B', arrow_color_tuple[:3*4]))
+        batch.add(4, gl.GL_QUADS, background, ('v2f', (arrow_x, shaft_y, arrow_x + shaft_w, shaft_y, arrow_x + shaft_w, shaft_y + shaft_h, arrow_x, shaft_y + shaft_h)), ('c4B', arrow_color_tuple))
+        batch.add(3, gl.GL_TRIANGLES, background, ('v2f', (arrow_x + shaft_w, arrow_y_center - arrow_h/2, arrow_x + shaft_w, arrow_y_center + arrow_h/2, arrow_x + arrow_w, arrow_y_center)), ('c4B', arrow_color_tuple[:3*4]))
 
         result_x = arrow_x + arrow_w + (6 * scale)
         result_y = arrow_y_center - (slot_size / 2)
-        self._draw_slot(batch, result_x, result_y, slot_size)
-        
-        batch.draw()
-
-        for i, item_slot in enumerate(self.hotbar):
-            if item_slot:
-                x = inv_base_x + i * slot_size
-                self._draw_item_texture_in_slot(item_slot['id'], x, hotbar_y, slot_size)
-                if item_slot['count'] > 1:
-                    self._draw_text_with_shadow(str(item_slot['count']), font_size=10*scale, x=x+slot_size-2, y=hotbar_y+2)
-        
-        for i, item_slot in enumerate(self.main_inventory):
-            if item_slot:
-                row, col = divmod(i, self.inventory_cols)
-                x = inv_base_x + col * slot_size
-                y = main_inv_y_start + (2-row) * slot_size
-                self._draw_item_texture_in_slot(item_slot['id'], x, y, slot_size)
-                if item_slot['count'] > 1:
-                    self._draw_text_with_shadow(str(item_slot['count']), font_size=10*scale, x=x+slot_size-2, y=y+2)
-
-        for i, item_slot in enumerate(self.inventory_crafting_grid):
-            if item_slot:
-                row, col = divmod(i, 2)
-                x = craft_base_x + col * slot_size
-                y = craft_base_y + (1-row) * slot_size
-                self._draw_item_texture_in_slot(item_slot['id'], x, y, slot_size)
-                if item_slot['count'] > 1:
-                    self._draw_text_with_shadow(str(item_slot['count']), font_size=10*scale, x=x+slot_size-2, y=y+2)
-
-        res_item, res_count = self.inventory_crafting_result if self.inventory_crafting_result else (None, 0)
-        if res_item:
-            self._draw_item_texture_in_slot(res_item, result_x, result_y, slot_size)
-            if res_count > 1:
-                self._draw_text_with_shadow(str(res_count), font_size=10*scale, x=result_x+slot_size-2, y=result_y+2)
+        self._draw_slot(batch, result_x, result_y, slot_size, background)
+        layer.slots.append(('craft_inv_res', 0, result_x, result_y, slot_size))
 
         title_color = (64, 64, 64, 255)
-        pyglet.text.Label("合成", font_name='Microsoft JhengHei', font_size=10*scale, x=craft_base_x, y=y_start + total_height - 28*scale, color=title_color).draw()
+        layer.labels.append(pyglet.text.Label("合成", font_name='Microsoft JhengHei', font_size=10*scale, x=craft_base_x, y=y_start + total_height - 28*scale, color=title_color,
+                                              batch=batch, group=pyglet.graphics.OrderedGroup(OUTLINE_ORDER)))
 
     def draw_crafting_table_ui(self, is_crafting_table_ui=True):
-        batch = pyglet.graphics.Batch()
+        self._draw_hud_layer('crafting_table', self.window.get_size() + (is_crafting_table_ui,))
+
+    def _layout_crafting_table(self, layer):
+        batch = layer.layout_batch
+        background = pyglet.graphics.OrderedGroup(LAYOUT_ORDER)
+        is_crafting_table_ui = layer.layout_key[2]
         
         scale = 2.0
         base_w, base_h = 176, 166
@@ -1787,7 +2154,7 @@ class Game:
         y_start = (self.window.height - total_height) / 2
 
         bg_color = (198, 198, 198, 255)
-        batch.add(4, gl.GL_QUADS, None, ('v2f', (x_start, y_start, x_start + total_width, y_start, x_start + total_width, y_start + total_height, x_start, y_start + total_height)), ('c4B', bg_color * 4))
+        batch.add(4, gl.GL_QUADS, background, ('v2f', (x_start, y_start, x_start + total_width, y_start, x_start + total_width, y_start + total_height, x_start, y_start + total_height)), ('c4B', bg_color * 4))
         
         slot_size = 18 * scale
         
@@ -1797,13 +2164,15 @@ class Game:
             row, col = divmod(i, self.inventory_cols)
             x = inv_base_x + col * slot_size
             y = inv_base_y_main + (2-row) * slot_size 
-            self._draw_slot(batch, x, y, slot_size)
+            self._draw_slot(batch, x, y, slot_size, background)
+            layer.slots.append(('main', i, x, y, slot_size))
 
         inv_base_y_hotbar = y_start + 8 * scale
         for i in range(len(self.hotbar)):
             x = inv_base_x + i * slot_size
             y = inv_base_y_hotbar
-            self._draw_slot(batch, x, y, slot_size)
+            self._draw_slot(batch, x, y, slot_size, background)
+            layer.slots.append(('hotbar', i, x, y, slot_size))
 
         craft_base_x = x_start + 30 * scale
         craft_base_y = y_start + total_height - 70 * scale
@@ -1811,7 +2180,8 @@ class Game:
             row, col = divmod(i, 3)
             x = craft_base_x + col * slot_size
             y = craft_base_y + (2-row) * slot_size
-            self._draw_slot(batch, x, y, slot_size)
+            self._draw_slot(batch, x, y, slot_size, background)
+            if is_crafting_table_ui: layer.slots.append(('craft_table', i, x, y, slot_size))
 
         arrow_y_center = craft_base_y + slot_size
         arrow_x, _ = x_start + 90 * scale, y_start + total_height - 52 * scale
@@ -1819,95 +2189,45 @@ class Game:
         shaft_h = 7 * scale; shaft_w = 15 * scale
         arrow_color_tuple = (139, 139, 139, 255) * 4
         shaft_y = arrow_y_center - shaft_h / 2
-        batch.add(4, gl.GL_QUADS, None, ('v2f', (arrow_x, shaft_y, arrow_x + shaft_w, shaft_y, arrow_x + shaft_w, shaft_y + shaft_h, arrow_x, shaft_y + shaft_h)), ('c4B', arrow_color_tuple))
-        batch.add(3, gl.GL_TRIANGLES, None, ('v2f', (arrow_x + shaft_w, arrow_y_center - arrow_h/2, arrow_x + shaft_w, arrow_y_center + arrow_h/2, arrow_x + arrow_w, arrow_y_center)), ('c4B', arrow_color_tuple[:3*4]))
+        batch.add(4, gl.GL_QUADS, background, ('v2f', (arrow_x, shaft_y, arrow_x + shaft_w, shaft_y, arrow_x + shaft_w, shaft_y + shaft_h, arrow_x, shaft_y + shaft_h)), ('c4B', arrow_color_tuple))
+        batch.add(3, gl.GL_TRIANGLES, background, ('v2f', (arrow_x + shaft_w, arrow_y_center - arrow_h/2, arrow_x + shaft_w, arrow_y_center + arrow_h/2, arrow_x + arrow_w, arrow_y_center)), ('c4B', arrow_color_tuple[:3*4]))
 
         result_x, result_y = x_start + 124 * scale, y_start + total_height - 58 * scale
-        self._draw_slot(batch, result_x, result_y, slot_size)
-        
-        batch.draw()
-
-        for i in range(len(self.main_inventory)):
-            item_slot = self.main_inventory[i]
-            if item_slot:
-                row, col = divmod(i, self.inventory_cols)
-                x = inv_base_x + col * slot_size
-                y = inv_base_y_main + (2-row) * slot_size 
-                self._draw_item_texture_in_slot(item_slot['id'], x, y, slot_size)
-                if item_slot['count'] > 1:
-                    self._draw_text_with_shadow(str(item_slot['count']), font_size=10*scale, x=x+slot_size-2, y=y+2)
-
-        for i in range(len(self.hotbar)):
-            item_slot = self.hotbar[i]
-            if item_slot:
-                x = inv_base_x + i * slot_size
-                y = inv_base_y_hotbar
-                self._draw_item_texture_in_slot(item_slot['id'], x, y, slot_size)
-                if item_slot['count'] > 1:
-                    self._draw_text_with_shadow(str(item_slot['count']), font_size=10*scale, x=x+slot_size-2, y=y+2)
-
-        if is_crafting_table_ui:
-            craft_base_x = x_start + 30 * scale
-            craft_base_y = y_start + total_height - 70 * scale
-            for i in range(9):
-                item_slot = self.crafting_table_grid[i]
-                if item_slot:
-                    row, col = divmod(i, 3)
-                    x = craft_base_x + col * slot_size
-                    y = craft_base_y + (2-row) * slot_size
-                    self._draw_item_texture_in_slot(item_slot['id'], x, y, slot_size)
-                    if item_slot['count'] > 1:
-                        self._draw_text_with_shadow(str(item_slot['count']), font_size=10*scale, x=x+slot_size-2, y=y+2)
-
-            res_item, res_count = self.crafting_table_result if self.crafting_table_result else (None, 0)
-            if res_item:
-                result_x, result_y = x_start + 124 * scale, y_start + total_height - 58 * scale
-                self._draw_item_texture_in_slot(res_item, result_x, result_y, slot_size)
-                if res_count > 1:
-                    self._draw_text_with_shadow(str(res_count), font_size=10*scale, x=result_x+slot_size-2, y=result_y+2)
+        self._draw_slot(batch, result_x, result_y, slot_size, background)
+        if is_crafting_table_ui: layer.slots.append(('craft_table_res', 0, result_x, result_y, slot_size))
         
         title_color = (64, 64, 64, 255)
+        title_group = pyglet.graphics.OrderedGroup(OUTLINE_ORDER)
         if is_crafting_table_ui:
-            pyglet.text.Label("製作", font_name='Microsoft JhengHei', font_size=10*scale, x=x_start + 28*scale, y=y_start + base_h*scale - 18, color=title_color).draw()
+            layer.labels.append(pyglet.text.Label("製作", font_name='Microsoft JhengHei', font_size=10*scale, x=x_start + 28*scale, y=y_start + base_h*scale - 18, color=title_color, batch=batch, group=title_group))
         
-        pyglet.text.Label("物品欄", font_name='Microsoft JhengHei', font_size=10*scale, x=x_start + 8*scale, y=y_start + 84*scale - 14, color=title_color).draw()
+        layer.labels.append(pyglet.text.Label("物品欄", font_name='Microsoft JhengHei', font_size=10*scale, x=x_start + 8*scale, y=y_start + 84*scale - 14, color=title_color, batch=batch, group=title_group))
 
     def draw_hotbar(self):
+        self._draw_hud_layer('hotbar', self.window.get_size())
+
+    def _layout_hotbar(self, layer):
+        batch = layer.layout_batch
         slot_sz,padding,num_slots=self.game_hotbar_slot_size,self.game_hotbar_padding,self.hotbar_size
         total_width=(slot_sz*num_slots)+(padding*(num_slots-1))
         start_x,start_y=(self.window.width-total_width)//2,padding+5 
+        background, outline = pyglet.graphics.OrderedGroup(LAYOUT_ORDER), LineWidthGroup(OUTLINE_ORDER, 1.5)
         
         for i in range(num_slots):
             slot_x=start_x+i*(slot_sz+padding)
-            item_slot = self.hotbar[i]
+            batch.add(4, gl.GL_QUADS, background, ('v2f', quad_vertices(slot_x, start_y, slot_sz, slot_sz)), ('c4B', (10,10,10,100) * 4))
+            batch.add(8, gl.GL_LINES, outline, ('v2f', outline_vertices(slot_x-1, start_y-1, slot_sz+2, slot_sz+2)), ('c4B', (90,90,90,255) * 8))
+            layer.slots.append(('hotbar', i, slot_x, start_y, slot_sz))
+        # 選取框蓋在灰色外框上，切換快捷欄時只改這 8 個頂點
+        layer.highlight = batch.add(8, gl.GL_LINES, LineWidthGroup(HIGHLIGHT_ORDER, 2.5), ('v2f', (0,) * 16), ('c4B', (240,240,240,255) * 8))
             
-            is_selected=(i==self.current_hotbar_index)
-            
-            bg_color=(10,10,10,100)
-            gl.glPushAttrib(gl.GL_CURRENT_BIT); gl.glColor4ub(*bg_color)
-            pyglet.graphics.draw(4,gl.GL_QUADS,('v2f',(slot_x,start_y,slot_x+slot_sz,start_y,
-                                                      slot_x+slot_sz,start_y+slot_sz,slot_x,start_y+slot_sz)))
-            gl.glPopAttrib()
+    def draw_chunk_loading_status(self):
+        if not self.is_player_chunk_pending(): return
+        self.chunk_loading_label.x = self.window.width // 2
+        self.chunk_loading_label.y = self.window.height // 2 + 40
+        self.chunk_loading_label.text = f"正在生成地形... (剩餘 {len(self.pending_chunks)} 個區塊)"
+        self.chunk_loading_label.draw()
 
-            if item_slot:
-                item_id = item_slot['id']
-                count = item_slot['count']
-                if count > 0:
-                    self._draw_item_texture_in_slot(item_id, slot_x, start_y, slot_sz)
-                    if count > 1:
-                        self._draw_text_with_shadow(str(count),x=slot_x+slot_sz-2,y=start_y+2, font_size=10)
-            
-            gl.glPushAttrib(gl.GL_LINE_BIT|gl.GL_CURRENT_BIT)
-            if is_selected:
-                gl.glLineWidth(2.5) 
-                gl.glColor3ub(240,240,240)
-            else:
-                gl.glLineWidth(1.5)
-                gl.glColor3ub(90,90,90) 
-            pyglet.graphics.draw(4,gl.GL_LINE_LOOP,('v2f',(slot_x-1,start_y-1,slot_x+slot_sz+1,start_y-1,
-                                                         slot_x+slot_sz+1,start_y+slot_sz+1,slot_x-1,start_y+slot_sz+1)))
-            gl.glPopAttrib()
-            
     def draw_chat_input(self):
         w, h = self.window.get_size()
         chat_height = 40
@@ -1938,20 +2258,20 @@ class Game:
         pyglet.graphics.draw(4,gl.GL_QUADS,('v2f',(exit_x,exit_y, exit_x+button_width,exit_y, exit_x+button_width,exit_y+button_height, exit_x,exit_y+button_height)))
         gl.glPopAttrib()
         
-        pyglet.text.Label("繼續遊玩",x=w//2,y=continue_y+button_height//2, anchor_x='center',anchor_y='center', font_name='Microsoft JhengHei',font_size=20,color=(255,255,255,255)).draw()
-        pyglet.text.Label("修改按鍵",x=w//2,y=keys_y+button_height//2, anchor_x='center',anchor_y='center', font_name='Microsoft JhengHei',font_size=20,color=(255,255,255,255)).draw()
-        pyglet.text.Label("儲存並退出",x=w//2,y=exit_y+button_height//2, anchor_x='center',anchor_y='center', font_name='Microsoft JhengHei',font_size=20,color=(255,255,255,255)).draw()
+        self.text_cache.draw("繼續遊玩", w//2, continue_y+button_height//2, anchor_x='center',anchor_y='center', font_name='Microsoft JhengHei',font_size=20,color=(255,255,255,255))
+        self.text_cache.draw("修改按鍵", w//2, keys_y+button_height//2, anchor_x='center',anchor_y='center', font_name='Microsoft JhengHei',font_size=20,color=(255,255,255,255))
+        self.text_cache.draw("儲存並退出", w//2, exit_y+button_height//2, anchor_x='center',anchor_y='center', font_name='Microsoft JhengHei',font_size=20,color=(255,255,255,255))
 
     def draw_keybinding_menu(self):
         w, h = self.window.get_size()
         gl.glPushAttrib(gl.GL_CURRENT_BIT); gl.glColor4ub(0, 0, 0, 180)
         pyglet.graphics.draw(4, gl.GL_QUADS, ('v2f', (0, 0, w, 0, w, h, 0, h))); gl.glPopAttrib()
         
-        pyglet.text.Label("修改按鍵", x=w//2, y=h - 60, anchor_x='center', font_name='Microsoft JhengHei', font_size=24, color=(255, 255, 255, 255)).draw()
+        self.text_cache.draw("修改按鍵", w//2, h - 60, anchor_x='center', font_name='Microsoft JhengHei', font_size=24, color=(255, 255, 255, 255))
         if self.key_to_rebind:
-            pyglet.text.Label("請按下鍵盤按鍵或滑鼠按鍵以設定，按 ESC 取消", x=w//2, y=h - 100, anchor_x='center', font_name='Microsoft JhengHei', font_size=16, color=(255, 255, 100, 255)).draw()
+            self.text_cache.draw("請按下鍵盤按鍵或滑鼠按鍵以設定，按 ESC 取消", w//2, h - 100, anchor_x='center', font_name='Microsoft JhengHei', font_size=16, color=(255, 255, 100, 255))
         else:
-            pyglet.text.Label("點擊按鍵名稱以修改，按 ESC 返回", x=w//2, y=h - 100, anchor_x='center', font_name='Microsoft JhengHei', font_size=16, color=(200, 200, 200, 255)).draw()
+            self.text_cache.draw("點擊按鍵名稱以修改，按 ESC 返回", w//2, h - 100, anchor_x='center', font_name='Microsoft JhengHei', font_size=16, color=(200, 200, 200, 255))
 
         action_map_zh = {
             "forward": "前進", "backward": "後退", "left": "向左", "right": "向右",
@@ -1975,7 +2295,7 @@ class Game:
         for i, action in enumerate(action_order):
             if action not in self.keybindings: continue
             y = start_y - i * spacing
-            pyglet.text.Label(action_map_zh.get(action, action), x=w//2 - 250, y=y, anchor_x='left', font_name='Microsoft JhengHei', font_size=18, color=(255, 255, 255, 255)).draw()
+            self.text_cache.draw(action_map_zh.get(action, action), w//2 - 250, y, anchor_x='left', font_name='Microsoft JhengHei', font_size=18, color=(255, 255, 255, 255))
             
             key_code = self.keybindings[action]
             key_name = self._get_binding_name(key_code)
@@ -1993,12 +2313,12 @@ class Game:
                 key_text = key_name
                 color = (255, 255, 255, 255)
 
-            key_label = pyglet.text.Label(key_text, x=w//2 + 200, y=y, anchor_x='center', font_name='Consolas', font_size=18, color=color, bold=True)
-            key_label.draw()
+            key_x = w//2 + 200
+            key_label = self.text_cache.draw(key_text, key_x, y, anchor_x='center', font_name='Consolas', font_size=18, color=color, bold=True)
             
             label_width = key_label.content_width + 40
             label_height = key_label.content_height + 10
-            self.keybinding_labels[action] = (key_label.x - label_width / 2, y - label_height / 2, label_width, label_height)
+            self.keybinding_labels[action] = (key_x - label_width / 2, y - label_height / 2, label_width, label_height)
 
     def on_mouse_press(self, x_click, y_click, button, modifiers):
         # 支援滑鼠按鍵切換人稱
@@ -2190,7 +2510,7 @@ class Game:
                     block_type=self.world.get(block_pos)
                     if not (block_type=="stone" and block_pos[1]==0):
                         if self.mode=="creative": 
-                            self.world.pop(block_pos); self.chunk_dirty=True; self.trigger_arm_swing_animation(); action_taken=True
+                            self.world.pop(block_pos); self._mark_block_dirty(block_pos); self.trigger_arm_swing_animation(); action_taken=True
                         else: 
                             if self.breaking_block_pos!=block_pos: 
                                 self.breaking_block_pos=block_pos
@@ -2239,6 +2559,7 @@ class Game:
 
                     if place_pos not in self.world and not intersects_player:
                         self.world[place_pos]=selected_type_id
+                        self._mark_block_dirty(place_pos)
                         action_taken=True
                         self.trigger_arm_swing_animation()
                         if self.mode=="survival": 
@@ -2286,191 +2607,74 @@ class Game:
         else:
             self.crafting_table_result = result
     
-    def _draw_slot(self, batch, x, y, size):
+    def _draw_slot(self, batch, x, y, size, group=None):
         border_color = (80, 80, 80, 255)
         bg_color = (139, 139, 139, 255)
         
-        batch.add(4, gl.GL_QUADS, None, ('v2f', (x, y, x + size, y, x + size, y + size, x, y + size)), ('c4B', border_color * 4))
+        batch.add(4, gl.GL_QUADS, group, ('v2f', (x, y, x + size, y, x + size, y + size, x, y + size)), ('c4B', border_color * 4))
         inset = 2
-        batch.add(4, gl.GL_QUADS, None, ('v2f', (x + inset, y + inset, x + size - inset, y + inset, x + size - inset, y + size - inset, x + inset, y + size - inset)), ('c4B', bg_color * 4))
-
-    def _get_inventory_slot_regions(self):
-        if not self.show_inventory and not self.show_crafting_table_ui:
-            return []
-            
-        scale = 2.0
-        base_w, base_h = 176, 166
-        total_width, total_height = base_w * scale, base_h * scale
-        x_start = (self.window.width - total_width) / 2
-        y_start = (self.window.height - total_height) / 2
-        slot_size = 18 * scale
-        
-        slot_regions = []
-        
-        if self.show_crafting_table_ui:
-            inv_base_x = x_start + 8 * scale
-            inv_base_y_main = y_start + 8 * scale + 1 * slot_size
-            for i in range(len(self.main_inventory)):
-                row, col = divmod(i, self.inventory_cols)
-                x = inv_base_x + col * slot_size
-                y = inv_base_y_main + (2 - row) * slot_size
-                slot_regions.append({'rect': (x, y, slot_size, slot_size), 'type': 'main', 'index': i, 'item': self.main_inventory[i]})
-
-            inv_base_y_hotbar = y_start + 8 * scale
-            for i in range(len(self.hotbar)):
-                x = inv_base_x + i * slot_size
-                y = inv_base_y_hotbar
-                slot_regions.append({'rect': (x, y, slot_size, slot_size), 'type': 'hotbar', 'index': i, 'item': self.hotbar[i]})
-            
-            craft_base_x = x_start + 30 * scale
-            craft_base_y = y_start + total_height - 70 * scale
-            for i in range(9):
-                row, col = divmod(i, 3)
-                x = craft_base_x + col * slot_size
-                y = craft_base_y + (2-row) * slot_size
-                slot_regions.append({'rect': (x, y, slot_size, slot_size), 'type': 'craft_table', 'index': i, 'item': self.crafting_table_grid[i]})
-        
-        else: # Personal Inventory
-            inv_base_x = x_start + (8 * scale)
-            hotbar_y = y_start + (8 * scale)
-            main_inv_y_start = hotbar_y + slot_size + (4 * scale)
-            craft_base_x = x_start + 88 * scale
-            craft_base_y = y_start + total_height - (70 * scale)
-
-            for i in range(len(self.hotbar)):
-                x = inv_base_x + i * slot_size
-                slot_regions.append({'rect': (x, hotbar_y, slot_size, slot_size), 'type': 'hotbar', 'index': i, 'item': self.hotbar[i]})
-            
-            for i in range(len(self.main_inventory)):
-                row, col = divmod(i, self.inventory_cols)
-                x = inv_base_x + col * slot_size
-                y = main_inv_y_start + (2-row) * slot_size
-                slot_regions.append({'rect': (x, y, slot_size, slot_size), 'type': 'main', 'index': i, 'item': self.main_inventory[i]})
+        batch.add(4, gl.GL_QUADS, group, ('v2f', (x + inset, y + inset, x + size - inset, y + inset, x + size - inset, y + size - inset, x + inset, y + size - inset)), ('c4B', bg_color * 4))
 
-            for i in range(4):
-                row, col = divmod(i, 2)
-                x = craft_base_x + col * slot_size
-                y = craft_base_y + (1-row) * slot_size
-                slot_regions.append({'rect': (x, y, slot_size, slot_size), 'type': 'craft_inv', 'index': i, 'item': self.inventory_crafting_grid[i]})
-
-        return slot_regions
+    def _container_layer(self, ui_type):
+        # 點擊與提示框共用畫面上的版面；視窗縮放後第一次用到時才重排
+        layer = self.hud_layers[ui_type]
+        w, h = self.window.get_size()
+        layer.ensure_layout((w, h, True) if ui_type == 'crafting_table' else (w, h))
+        return layer
 
     def _update_tooltip(self):
-        if not self.show_inventory and not self.show_crafting_table_ui:
-            self.tooltip_label = None
-            return
-            
-        if self.inventory_selected_item_info: 
-            self.tooltip_label = None
-            return
-
-        slot_regions = self._get_inventory_slot_regions()
+        hovered = None
+        if (self.show_inventory or self.show_crafting_table_ui) and not self.inventory_selected_item_info:
+            layer = self._container_layer('crafting_table' if self.show_crafting_table_ui else 'inventory')
+            slot_number = layer.hit_index.slot_at(self.mouse_x, self.mouse_y)
+            if slot_number is not None:
+                container, index = layer.slots[slot_number][:2]
+                content = None if 'res' in container else self._slot_contents(container, index)
+                if content: hovered = (layer.layout_key, slot_number, content[0])
+
+        # 滑鼠停在同一格且物品沒變就沿用原本的提示框，跟著滑鼠移動只在繪製時平移
+        if hovered == self.tooltip_key: return
+        self.tooltip_key = hovered
+        self.tooltip_label = self.tooltip_bg_batch = None
+        if not hovered: return
+
+        self.tooltip_label = pyglet.text.Label(
+            f"minecraft:{hovered[2]}",
+            x=15, y=0,
+            font_name='Consolas', font_size=12,
+            color=(220, 220, 220, 255),
+            anchor_x='left', anchor_y='top'
+        )
         
-        self.tooltip_label = None
-        self.tooltip_bg_batch = None
-        for region in slot_regions:
-            rx, ry, rw, rh = region['rect']
-            item = region.get('item')
-            if item and (rx <= self.mouse_x < rx + rw and ry <= self.mouse_y < ry + rh):
-                item_id_text = f"minecraft:{item['id']}"
-                self.tooltip_label = pyglet.text.Label(
-                    item_id_text,
-                    x=self.mouse_x + 15, y=self.mouse_y,
-                    font_name='Consolas', font_size=12,
-                    color=(220, 220, 220, 255),
-                    anchor_x='left', anchor_y='top'
-                )
-                
-                content_width = self.tooltip_label.content_width
-                content_height = self.tooltip_label.content_height
-                padding = 4
-                
-                self.tooltip_bg_batch = pyglet.graphics.Batch()
-                self.tooltip_bg_batch.add(4, gl.GL_QUADS, None, ('v2f', (
-                    self.mouse_x + 10, self.mouse_y + padding,
-                    self.mouse_x + 10 + content_width + padding*2, self.mouse_y + padding,
-                    self.mouse_x + 10 + content_width + padding*2, self.mouse_y - content_height,
-                    self.mouse_x + 10, self.mouse_y - content_height
-                )), ('c4B', (18, 18, 58, 200) * 4))
-                break
+        content_width = self.tooltip_label.content_width
+        content_height = self.tooltip_label.content_height
+        padding = 4
+        
+        self.tooltip_bg_batch = pyglet.graphics.Batch()
+        self.tooltip_bg_batch.add(4, gl.GL_QUADS, None, ('v2f', (
+            10, padding,
+            10 + content_width + padding*2, padding,
+            10 + content_width + padding*2, -content_height,
+            10, -content_height
+        )), ('c4B', (18, 18, 58, 200) * 4))
+
+    def draw_tooltip(self):
+        if not self.tooltip_label: return
+        # 2D 正交投影的 z 範圍只有 [-1, 1]，原本的 z=2 會被裁掉；2D 不做深度測試，最後畫就在最上層
+        gl.glPushMatrix()
+        gl.glTranslatef(self.mouse_x, self.mouse_y, 0)
+        self.tooltip_bg_batch.draw()
+        self.tooltip_label.draw()
+        gl.glPopMatrix()
 
     def _handle_inventory_click(self, click_x, click_y, ui_type, button):
-        scale = 2.0
-        base_w, base_h = 176, 166
-        total_width, total_height = base_w * scale, base_h * scale
-        x_start = (self.window.width - total_width) // 2
-        y_start = (self.window.height - total_height) // 2
-        slot_size = 18 * scale
-        
-        slot_regions = []
-        
-        if ui_type == 'crafting_table':
-            inv_base_x = x_start + 8 * scale
-            inv_base_y_main = y_start + 8 * scale + 1 * (slot_size + 0)
-            for i in range(len(self.main_inventory)):
-                row, col = divmod(i, self.inventory_cols)
-                x = inv_base_x + col * slot_size
-                y = inv_base_y_main + (2 - row) * slot_size
-                slot_regions.append({'rect': (x, y, slot_size, slot_size), 'type': 'main', 'index': i})
-
-            inv_base_y_hotbar = y_start + 8 * scale
-            for i in range(len(self.hotbar)):
-                x = inv_base_x + i * slot_size
-                y = inv_base_y_hotbar
-                slot_regions.append({'rect': (x, y, slot_size, slot_size), 'type': 'hotbar', 'index': i})
-
-            craft_base_x = x_start + 30 * scale
-            craft_base_y = y_start + total_height - 70 * scale
-            for i in range(9):
-                row, col = divmod(i, 3)
-                x = craft_base_x + col * slot_size
-                y = craft_base_y + (2-row) * slot_size
-                slot_regions.append({'rect': (x, y, slot_size, slot_size), 'type': 'craft_table', 'index': i})
-
-            result_x = x_start + 124 * scale
-            result_y = y_start + total_height - 58 * scale
-            slot_regions.append({'rect': (result_x, result_y, slot_size, slot_size), 'type': 'craft_table_res', 'index': 0})
-        else: # Personal inventory
-            inv_base_x = x_start + (8 * scale)
-            hotbar_y = y_start + (8 * scale)
-            main_inv_y_start = hotbar_y + slot_size + (4 * scale)
-            craft_base_x = x_start + 88 * scale
-            craft_base_y = y_start + total_height - (70 * scale)
-
-            for i in range(len(self.hotbar)):
-                x = inv_base_x + i * slot_size
-                slot_regions.append({'rect': (x, hotbar_y, slot_size, slot_size), 'type': 'hotbar', 'index': i})
-            
-            for i in range(len(self.main_inventory)):
-                row, col = divmod(i, self.inventory_cols)
-                x = inv_base_x + col * slot_size
-                y = main_inv_y_start + (2-row) * slot_size
-                slot_regions.append({'rect': (x, y, slot_size, slot_size), 'type': 'main', 'index': i})
-
-            for i in range(4):
-                row, col = divmod(i, 2)
-                x = craft_base_x + col * slot_size
-                y = craft_base_y + (1-row) * slot_size
-                slot_regions.append({'rect': (x, y, slot_size, slot_size), 'type': 'craft_inv', 'index': i})
-
-            arrow_y_center = craft_base_y + slot_size / 2
-            arrow_x = craft_base_x + (2 * slot_size) + (6 * scale)
-            arrow_w = 22 * scale
-            result_x = arrow_x + arrow_w + (6 * scale)
-            result_y = arrow_y_center - (slot_size / 2)
-            slot_regions.append({'rect': (result_x, result_y, slot_size, slot_size), 'type': 'craft_inv_res', 'index': 0})
-        
-        self.process_slot_click(click_x, click_y, slot_regions, button)
+        self.process_slot_click(click_x, click_y, self._container_layer(ui_type), button)
     
-    def process_slot_click(self, x, y, regions, button):
+    def process_slot_click(self, x, y, layer, button):
         held_item = self.inventory_selected_item_info
         
-        clicked_region = None
-        for region in regions:
-            rx, ry, rw, rh = region['rect']
-            if rx <= x < rx + rw and ry <= y < ry + rh:
-                clicked_region = region
-                break
+        slot_number = layer.hit_index.slot_at(x, y)
+        clicked_region = layer.slots[slot_number] if slot_number is not None else None
         
         if not clicked_region:
             if held_item:
@@ -2478,8 +2682,7 @@ class Game:
                 self.inventory_selected_item_info = None
             return
 
-        slot_type = clicked_region['type']
-        index = clicked_region['index']
+        slot_type, index = clicked_region[:2]
         current_time = time.time()
 
         target_list = None
@@ -2632,21 +2835,24 @@ def run_game():
         if window and not window.has_exit: window.close()
         return
 
-    pyglet.clock.schedule_interval(game_instance.update, 1 / 60.0) 
+    # 每個影格都呼叫 tick（不限 FPS，交給垂直同步），物理則在 tick 內以固定步長推進
+    pyglet.clock.schedule(game_instance.tick)
 
     @window.event
     def on_draw():
         window.clear()
         game_instance.setup_3d()
-        if game_instance.chunk_dirty: game_instance.rebuild_world_geometry()
+        if game_instance.chunk_dirty:
+            with game_instance.profiler.section("rebuild_geometry"): game_instance.rebuild_world_geometry()
             
-        game_instance.world_batch.draw()
+        with game_instance.profiler.section("draw_world"): game_instance.draw_world()
         
         if not game_instance.show_inventory and not game_instance.pause_menu and not game_instance.show_crafting_table_ui and not game_instance.show_keybinding_menu:
             game_instance.draw_breaking_effect()
         if game_instance.selected_block: game_instance.draw_held_block()
         else: game_instance.draw_first_person_arm()
         
+        ui_started = time.perf_counter()
         game_instance.setup_2d() 
         
         if game_instance.show_crafting_table_ui:
@@ -2663,6 +2869,7 @@ def run_game():
                 game_instance.hunger_label.draw()
             game_instance.draw_hotbar()
             game_instance.draw_crosshair()
+            game_instance.draw_chunk_loading_status()
 
         if (game_instance.show_inventory or game_instance.show_crafting_table_ui) and game_instance.inventory_selected_item_info:
             held_item = game_instance.inventory_selected_item_info
@@ -2682,13 +2889,7 @@ def run_game():
                 game_instance._draw_text_with_shadow(str(count_on_cursor), font_size=10*2.0, x=draw_x + item_draw_size - 2, y=draw_y + 2)
             gl.glPopMatrix()
             
-        if game_instance.tooltip_label:
-            gl.glPushMatrix()
-            gl.glTranslatef(0, 0, 2)
-            if game_instance.tooltip_bg_batch:
-                game_instance.tooltip_bg_batch.draw()
-            game_instance.tooltip_label.draw()
-            gl.glPopMatrix()
+        game_instance.draw_tooltip()
 
         game_instance.draw_chat_feedback()
 
@@ -2696,6 +2897,10 @@ def run_game():
             game_instance.draw_chat_input()
 
         game_instance.pos_label.draw() 
+        game_instance.draw_debug_overlay()
+        game_instance.profiler.record("draw_ui", time.perf_counter() - ui_started)
+        game_instance.profiler.end_frame(vertices=sum(game_instance.chunk_mesh_vertex_counts.values()),
+                                         chunks_loaded=len(game_instance.world.chunks), blocks=len(game_instance.world))
 
     @window.event
     def on_close():
@@ -2705,6 +2910,7 @@ def run_game():
     logging.info("開始 Pyglet 應用程式主循環...")
     pyglet.app.run()
     logging.info("Pyglet 應用程式主循環已結束。")
+    if game_instance: game_instance.shutdown_workers()
 
     if window and not window.has_exit: 
         window.close()
@@ -0,0 +1,20 @@
+def merge_faces(cells, max_size=None):
+    """cells 為 {(a, b): key} 的平面格子；相同 key 的相鄰格子合併成矩形，產生 (a, b, width, height, key)。
+
+    max_size 限制矩形的邊長（None 為不限）。
+    """
+    remaining = dict(cells)
+    for a, b in sorted(cells, key=lambda cell: (cell[1], cell[0])):
+        if (a, b) not in remaining: continue
+        key = remaining[(a, b)]
+        # 先沿 a 方向盡量延伸，再逐列往 b 方向延伸（整列都相同才併入）
+        width = 1
+        while (max_size is None or width < max_size) and remaining.get((a + width, b)) == key:
+            width += 1
+        height = 1
+        while (max_size is None or height < max_size) and all(remaining.get((a + i, b + height)) == key for i in range(width)):
+            height += 1
+        for j in range(height):
+            for i in range(width):
+                del remaining[(a + i, b + j)]
+        yield a, b, width, height, key
@@ -0,0 +1,203 @@
+import math
+from collections import OrderedDict, deque
+
+import pyglet
+import pyglet.gl as gl
+
+# 同一個批次內的繪製順序：底板與格子 → 物品圖示 → 外框、標題 → 數量文字的陰影 → 數量文字
+LAYOUT_ORDER, ITEM_ORDER, OUTLINE_ORDER, HIGHLIGHT_ORDER, TEXT_SHADOW_ORDER, TEXT_ORDER = 0, 1, 2, 3, 4, 5
+
+
+class LineWidthGroup(pyglet.graphics.OrderedGroup):
+    """批次中的線段以固定線寬繪製；OrderedGroup 以 order 判斷相等，不同線寬要用不同 order。"""
+
+    def __init__(self, order, width, parent=None):
+        super().__init__(order, parent)
+        self.width = width
+
+    def set_state(self):
+        gl.glPushAttrib(gl.GL_LINE_BIT)
+        gl.glLineWidth(self.width)
+
+    def unset_state(self):
+        gl.glPopAttrib()
+
+
+def quad_vertices(x, y, width, height):
+    return (x, y, x + width, y, x + width, y + height, x, y + height)
+
+
+def outline_vertices(x, y, width, height):
+    """矩形外框的 4 條線段（GL_LINES，8 個頂點），才能與其他外框放進同一個批次。"""
+    x1, y1 = x + width, y + height
+    return (x, y, x1, y, x1, y, x1, y1, x1, y1, x, y1, x, y1, x, y)
+
+
+def add_shadowed_text(batch, text, x, y, font_size, color=(255,255,255,255), shadow_color=(60,60,60,255), anchor_x='right', anchor_y='bottom', bold=True):
+    """與 Game._draw_text_with_shadow 相同的陰影文字，改成加進批次；回傳兩個 Label，呼叫端要留著參考。"""
+    shadow = pyglet.text.Label(text, font_size=font_size, x=x+1, y=y-1, anchor_x=anchor_x, anchor_y=anchor_y, color=shadow_color, bold=bold,
+                               batch=batch, group=pyglet.graphics.OrderedGroup(TEXT_SHADOW_ORDER))
+    label = pyglet.text.Label(text, font_size=font_size, x=x, y=y, anchor_x=anchor_x, anchor_y=anchor_y, color=color, bold=bold,
+                              batch=batch, group=pyglet.graphics.OrderedGroup(TEXT_ORDER))
+    return shadow, label
+
+
+class TextCache:
+    """以 (文字, 樣式) 快取在原點排版好的 Label，繪製時用 glTranslatef 移到目標位置。
+
+    重複出現的數量與選單文字不必每個影格重建 Label；超過 max_entries 時丟掉最久沒用到的。
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.labels = OrderedDict()
+
+    def label(self, text, font_size=None, color=(255,255,255,255), bold=False, anchor_x='left', anchor_y='baseline', font_name=None):
+        key = (text, font_size, color, bold, anchor_x, anchor_y, font_name)
+        label = self.labels.get(key)
+        if label is None:
+            label = self.labels[key] = pyglet.text.Label(text, font_name=font_name, font_size=font_size, color=color, bold=bold, anchor_x=anchor_x, anchor_y=anchor_y)
+            if len(self.labels) > self.max_entries: self.labels.popitem(last=False)
+        else:
+            self.labels.move_to_end(key)
+        return label
+
+    def draw(self, text, x, y, **style):
+        label = self.label(text, **style)
+        gl.glPushMatrix()
+        gl.glTranslatef(x, y, 0)
+        label.draw()
+        gl.glPopMatrix()
+        return label
+
+
+class SlotHitIndex:
+    """格子矩形的均勻網格索引：每個桶記下與它重疊的格子，滑鼠位置只需檢查所在的桶，不必掃過所有格子。"""
+
+    def __init__(self, slots, cell_size):
+        self.slots = slots
+        self.cell_size = cell_size
+        self.buckets = {}
+        for slot_number, (_, _, x, y, size) in enumerate(slots):
+            for cell_x in range(math.floor(x / cell_size), math.floor((x + size) / cell_size) + 1):
+                for cell_y in range(math.floor(y / cell_size), math.floor((y + size) / cell_size) + 1):
+                    self.buckets.setdefault((cell_x, cell_y), []).append(slot_number)
+
+    def slot_at(self, x, y):
+        for slot_number in self.buckets.get((math.floor(x / self.cell_size), math.floor(y / self.cell_size)), ()):
+            _, _, slot_x, slot_y, size = self.slots[slot_number]
+            if slot_x <= x < slot_x + size and slot_y <= y < slot_y + size: return slot_number
+        return None
+
+
+class RetainedHudLayer:
+    """保留式 2D 畫面：版面批次（底板、格子、標題）只在 layout_key（視窗大小等）改變時重建，
+    物品批次只在格子內容改變時重建；內容沒變的影格只有兩次 batch.draw()。
+
+    build_layout(layer) 依 layer.layout_key 把版面加進 layer.layout_batch，並把格子填進 layer.slots = [(容器, 索引, x, y, 大小), ...]；
+    build_items(layer, contents) 把圖示與數量加進 layer.item_batch。
+    """
+
+    def __init__(self, build_layout, count_font_size):
+        self.build_layout = build_layout
+        self.count_font_size = count_font_size
+        self.layout_key = None
+        self.layout_batch = None
+        self.labels = []            # 版面上的固定文字，留著參考避免被回收
+        self.slots = []
+        self.hit_index = None       # 滑鼠點擊與提示框用的 SlotHitIndex，跟版面一起重建
+        self.highlight = None       # 可移動的選取框 vertex list（快捷欄用）
+        self.highlight_slot = None
+        self.contents = None
+        self.item_batch = None
+        self.item_labels = []       # 物品數量文字，留著參考避免被回收
+
+    def ensure_layout(self, layout_key):
+        if layout_key == self.layout_key: return
+        self.layout_batch = pyglet.graphics.Batch()
+        self.labels, self.slots = [], []; self.highlight = self.highlight_slot = None
+        self.layout_key, self.contents = layout_key, None
+        self.build_layout(self)
+        self.hit_index = SlotHitIndex(self.slots, max((size for *_, size in self.slots), default=1))
+
+    def update(self, layout_key, slot_contents, build_items):
+        self.ensure_layout(layout_key)
+        contents = tuple(slot_contents(container, index) for container, index, _, _, _ in self.slots)
+        if contents != self.contents:
+            self.item_batch = pyglet.graphics.Batch()
+            self.item_labels = []
+            build_items(self, contents)
+            self.contents = contents
+
+    def move_highlight(self, slot_number):
+        if self.highlight is None or slot_number == self.highlight_slot: return
+        _, _, x, y, size = self.slots[slot_number]
+        self.highlight.vertices[:] = outline_vertices(x - 1, y - 1, size + 2, size + 2)
+        self.highlight_slot = slot_number
+
+    def draw(self):
+        # 3D 手持方塊等繪製後 GL_TEXTURE_2D 可能還開著，底板與外框要以純色繪製
+        gl.glDisable(gl.GL_TEXTURE_2D)
+        self.layout_batch.draw()
+        self.item_batch.draw()
+
+
+class ChatLogGroup(pyglet.graphics.Group):
+    """整個聊天紀錄共用的平移，有新訊息時只改 offset_y，不必搬動每一行。"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.offset_y = 0
+
+    def set_state(self):
+        gl.glPushMatrix()
+        gl.glTranslatef(0, self.offset_y, 0)
+
+    def unset_state(self):
+        gl.glPopMatrix()
+
+
+class ChatLog:
+    """聊天訊息：每則只排版一次放進共用批次，第 n 則固定在 y = -n * spacing，捲動只平移 ChatLogGroup。
+
+    淡出時只在 alpha 真的改變才設定 Label.color（pyglet 1.5 只改頂點顏色，不會重新排版）。
+    """
+
+    def __init__(self, duration, spacing, max_messages=10, font_name='Microsoft JhengHei', font_size=14):
+        self.duration = duration
+        self.spacing = spacing
+        self.max_messages = max_messages
+        self.font_name = font_name
+        self.font_size = font_size
+        self.batch = pyglet.graphics.Batch()
+        self.group = ChatLogGroup()
+        self.messages = deque()     # [label, 到期時間, 目前 alpha]，依到期時間排序
+        self.serial = 0
+
+    def __len__(self):
+        return len(self.messages)
+
+    def add(self, text, color, now):
+        if not self.messages: self.serial = 0  # 紀錄清空時從頭編號，座標不會一直變大
+        label = pyglet.text.Label(text, font_name=self.font_name, font_size=self.font_size, x=10, y=-self.serial * self.spacing, color=color,
+                                  batch=self.batch, group=self.group)
+        self.serial += 1
+        self.messages.append([label, now + self.duration, color[3]])
+        while len(self.messages) > self.max_messages: self.messages.popleft()[0].delete()
+
+    def expire(self, now):
+        while self.messages and self.messages[0][1] <= now: self.messages.popleft()[0].delete()
+
+    def draw(self, bottom_y, now):
+        if not self.messages: return
+        for message in self.messages:
+            label, expiry, alpha = message
+            time_left = expiry - now
+            if time_left >= 1.0: break
+            faded = int(max(0, time_left) * 255)
+            if faded != alpha:
+                label.color = label.color[:3] + (faded,)
+                message[2] = faded
+        # 最新一則（編號 serial - 1）落在 bottom_y，較舊的往上排
+        self.group.offset_y = bottom_y + (self.serial - 1) * self.spacing
+        self.batch.draw()
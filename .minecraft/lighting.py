@@ -0,0 +1,227 @@
+from array import array
+
+from chunk_mesher import FACE_AXES, FACE_TABLES
+
+# 天空光等級 0..15：頭上沒有不透光方塊為 15，被遮住的格子依埋在欄頂下多深逐漸變暗
+SKY_LIGHT_MAX = 15
+SKY_LIGHT_MIN = 4
+COVERED_SKY_LIGHT = 11
+COVER_FALLOFF = 3            # 每往下 3 格暗一級
+
+# 頂點角落被 0/1/2/3 個方塊遮住時的 ambient occlusion 亮度（索引為 3 - 遮擋數）
+AO_BRIGHTNESS = (0.55, 0.7, 0.85, 1.0)
+
+FACE_NORMALS = ((1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0, 0, -1))
+
+
+def _face_neighborhood(face_index):
+    """面外側那一層、以鄰格為中心的 3x3 格子偏移（相對於方塊），依 (u, v) 由 -1 到 1 排列，中心為索引 4。"""
+    normal_axis, u_axis, v_axis = FACE_AXES[face_index]
+    offsets = []
+    for du in (-1, 0, 1):
+        for dv in (-1, 0, 1):
+            offset = list(FACE_NORMALS[face_index])
+            offset[u_axis] += du; offset[v_axis] += dv
+            offsets.append(tuple(offset))
+    return tuple(offsets)
+
+
+def _corner_samples(face_index):
+    """面的四個頂點（順序同 FACE_TABLES）各自取樣的 (u 側格, v 側格, 對角格) 在 3x3 中的索引。"""
+    _, u_axis, v_axis = FACE_AXES[face_index]
+    samples = []
+    for corner in FACE_TABLES[face_index][0]:
+        du = 1 if corner[u_axis] else -1
+        dv = 1 if corner[v_axis] else -1
+        samples.append(((du + 1) * 3 + 1, 4 + dv, (du + 1) * 3 + dv + 1))
+    return tuple(samples)
+
+
+def _corner_pairs(face_index, axis):
+    """四個頂點中只差在 axis（紋理 u 或 v 軸）上的兩組頂點索引。"""
+    corners = [corner[:3] for corner in FACE_TABLES[face_index][0]]
+    pairs = []
+    for i, corner in enumerate(corners):
+        other = list(corner); other[axis] = 1 - other[axis]
+        j = corners.index(tuple(other))
+        if i < j: pairs.append((i, j))
+    return tuple(pairs)
+
+
+FACE_NEIGHBORHOODS = [_face_neighborhood(face_index) for face_index in range(6)]
+FACE_CORNER_SAMPLES = [_corner_samples(face_index) for face_index in range(6)]
+# FACE_CORNER_PAIRS[面] = (沿 u 軸相鄰的兩組頂點, 沿 v 軸相鄰的兩組頂點)
+FACE_CORNER_PAIRS = [(_corner_pairs(face_index, FACE_AXES[face_index][1]), _corner_pairs(face_index, FACE_AXES[face_index][2])) for face_index in range(6)]
+
+# greedy 合併時亮度允許延伸的方向
+MERGE_ANY, MERGE_ALONG_U, MERGE_ALONG_V = 0, 1, 2
+
+
+def light_merge_direction(face_index, light):
+    """四角亮度相同可往兩個方向合併（MERGE_ANY）；只沿 u 不變時只能沿 u 合併，反之亦然；都不是回傳 None。
+
+    亮度只沿另一軸變化的面並排合併後，四個角的亮度與原本每一格的角完全相同，內插結果不變。
+    """
+    if light[0] == light[1] == light[2] == light[3]: return MERGE_ANY
+    u_pairs, v_pairs = FACE_CORNER_PAIRS[face_index]
+    along_u = all(light[i] == light[j] for i, j in u_pairs)
+    along_v = all(light[i] == light[j] for i, j in v_pairs)
+    if along_u and along_v: return MERGE_ANY
+    if along_u: return MERGE_ALONG_U
+    if along_v: return MERGE_ALONG_V
+    return None
+
+
+def _light_byte(level_sum, count, ao):
+    # 總和超過 count * 15 的組合不會出現，仍要限制在範圍內才能放進 bytes
+    level = min(level_sum / count, SKY_LIGHT_MAX) if count else 0
+    return round(255 * (0.3 + 0.7 * level / SKY_LIGHT_MAX) * AO_BRIGHTNESS[ao])
+
+
+# 頂點亮度查表：索引 (天空光總和 * 5 + 取樣格數) * 4 + ao，取樣最多 4 格、每格最高 15
+LIGHT_BYTES = bytes(_light_byte(level_sum, count, ao) for level_sum in range(SKY_LIGHT_MAX * 4 + 1) for count in range(5) for ao in range(4))
+# 周圍 9 格都透光且天空光相同時四角亮度一樣（地表大部分的面），依等級直接查
+UNIFORM_LIGHT = [(LIGHT_BYTES[(level * 4 * 5 + 4) * 4 + 3],) * 4 for level in range(SKY_LIGHT_MAX + 1)]
+
+
+class SkyHeightMap:
+    """各區塊每一欄最高的不透光方塊 y（整欄沒有則為 -1），用來算天空光。
+
+    快取以區塊物件本身驗證：區塊重新載入或換了世界就重算；放置或破壞方塊時只更新那一欄。
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        self._heights = {}
+
+    def heights(self, chunk):
+        cached = self._heights.get((chunk.cx, chunk.cz))
+        if cached is not None and cached[0] is chunk: return cached[1]
+        heights = self._compute(chunk)
+        self._heights[(chunk.cx, chunk.cz)] = (chunk, heights)
+        return heights
+
+    def update_column(self, chunk, lx, lz):
+        cached = self._heights.get((chunk.cx, chunk.cz))
+        if cached is None or cached[0] is not chunk: return
+        cached[1][(lz << 4) | lx] = self._column_top(chunk, lx, lz)
+
+    def discard(self, cx, cz):
+        self._heights.pop((cx, cz), None)
+
+    def _opaque_table(self):
+        opaque = self.registry.opaque
+        return bytes(opaque) + bytes(256 - len(opaque))
+
+    def _compute(self, chunk):
+        heights = array('h', [-1]) * 256
+        unresolved = set(range(256))
+        table = self._opaque_table()
+        # 分段由上往下、每段逐層往下找；整層都不是不透光方塊就直接跳過
+        for section_y in sorted(chunk.sections, reverse=True):
+            mask = chunk.sections[section_y].translate(table)
+            for ly in range(15, -1, -1):
+                layer = mask[ly << 8:(ly + 1) << 8]
+                if not layer.count(1): continue
+                found = [column for column in unresolved if layer[column]]
+                y = section_y * 16 + ly
+                for column in found: heights[column] = y
+                unresolved.difference_update(found)
+                if not unresolved: return heights
+        return heights
+
+    def _column_top(self, chunk, lx, lz):
+        self.registry.ensure(len(self.registry.palette.names) - 1)
+        opaque = self.registry.opaque
+        column = (lz << 4) | lx
+        for section_y in sorted(chunk.sections, reverse=True):
+            section = chunk.sections[section_y]
+            for ly in range(15, -1, -1):
+                if opaque[section[(ly << 8) | column]]: return section_y * 16 + ly
+        return -1
+
+
+# 取樣格子的特殊值：不透光方塊、尚未計算
+OPAQUE_CELL = SKY_LIGHT_MAX + 1
+UNKNOWN_CELL = 255
+
+
+class ChunkLightSampler:
+    """一次區塊網格建置用的光照取樣：把本區塊外加一圈邊界的格子攤平成 bytearray，
+    每格第一次被取樣時才算天空光等級（不透光為 OPAQUE_CELL），相鄰的面共用結果。
+
+    範圍涵蓋本區塊與周圍 8 個區塊（面的角落會取樣到對角區塊）；未載入的區塊當作空曠的天空。
+    """
+
+    def __init__(self, world, height_map, cx, cz, size):
+        self.opaque = height_map.registry.opaque
+        self.chunks = {(dx, dz): world.get_chunk(cx + dx, cz + dz) for dx in (-1, 0, 1) for dz in (-1, 0, 1)}
+        chunk = self.chunks[(0, 0)]
+        section_ys = chunk.sections.keys() if chunk is not None and chunk.sections else (0,)
+        # 格子索引 ((y - origin_y) * side + (z - origin_z)) * side + (x - origin_x)，x、z 各多一格邊界
+        self.side = size + 2
+        self.origin_x, self.origin_z = cx * size - 1, cz * size - 1
+        self.origin_y = min(section_ys) * 16 - 1
+        height = (max(section_ys) + 1) * 16 + 1 - self.origin_y
+        self.grid = bytearray([UNKNOWN_CELL]) * (self.side * self.side * height)
+        layer = self.side * self.side
+        self.offsets = [tuple(dy * layer + dz * self.side + dx for dx, dy, dz in FACE_NEIGHBORHOODS[face_index]) for face_index in range(6)]
+        # 每一欄先查好 (分段, 欄索引, 欄頂, 最低分段的底)，取樣時只剩一次分段查詢；未載入的區塊為 None
+        self.columns = []
+        for grid_z in range(self.side):
+            chunk_dz, lz = divmod(grid_z - 1, size)
+            for grid_x in range(self.side):
+                chunk_dx, lx = divmod(grid_x - 1, size)
+                neighbor = self.chunks[(chunk_dx, chunk_dz)]
+                column = (lz << 4) | lx
+                if neighbor is None:
+                    self.columns.append(None)
+                else:
+                    bottom = min(neighbor.sections) * 16 if neighbor.sections else 0
+                    self.columns.append((neighbor.sections, column, height_map.heights(neighbor)[column], bottom))
+
+    def _fill(self, index):
+        grid_y, column_index = divmod(index, self.side * self.side)
+        entry = self.columns[column_index]
+        if entry is None:
+            value = SKY_LIGHT_MAX
+        else:
+            sections, column, top, bottom = entry
+            y = self.origin_y + grid_y
+            section = sections.get(y >> 4)
+            if section is not None and self.opaque[section[((y & 15) << 8) | column]]: value = OPAQUE_CELL
+            elif y > top: value = SKY_LIGHT_MAX
+            # 區塊最低分段以下是世界底下的虛空，一律最暗；不依上方地形深度變化，底面才合併得起來
+            elif y < bottom: value = SKY_LIGHT_MIN
+            else: value = max(SKY_LIGHT_MIN, COVERED_SKY_LIGHT - (top - y) // COVER_FALLOFF)
+        self.grid[index] = value
+        return value
+
+    def face_light(self, x, y, z, face_index):
+        """面四個頂點的亮度 (0..255)，順序同 FACE_TABLES；天空光取角落周圍未被遮住的格子平均（smooth lighting）。"""
+        base = ((y - self.origin_y) * self.side + (z - self.origin_z)) * self.side + (x - self.origin_x)
+        grid, offsets = self.grid, self.offsets[face_index]
+        samples = [grid[base + offset] for offset in offsets]
+        while UNKNOWN_CELL in samples:
+            i = samples.index(UNKNOWN_CELL)
+            samples[i] = self._fill(base + offsets[i])
+        center = samples[4]
+        if center != OPAQUE_CELL and samples.count(center) == 9: return UNIFORM_LIGHT[center]
+        # 透光方塊貼著不透光方塊的面看不到，隨便給個亮度即可
+        base_sum, base_count = (center, 1) if center != OPAQUE_CELL else (0, 0)
+        light = []
+        for side_u, side_v, diagonal in FACE_CORNER_SAMPLES[face_index]:
+            level_sum, count, occluders = base_sum, base_count, 0
+            for sample in (samples[side_u], samples[side_v]):
+                if sample == OPAQUE_CELL: occluders += 1
+                else: level_sum += sample; count += 1
+            if occluders == 2:
+                # 兩側都被擋住時對角格看不到，角落直接最暗
+                ao = 0
+            else:
+                sample = samples[diagonal]
+                if sample == OPAQUE_CELL: occluders += 1
+                else: level_sum += sample; count += 1
+                ao = 3 - occluders
+            light.append(LIGHT_BYTES[(level_sum * 5 + count) * 4 + ao])
+        return tuple(light)
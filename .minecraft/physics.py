@@ -0,0 +1,70 @@
+import math
+
+# 接觸面的容許誤差：剛好貼齊（或因浮點誤差重疊極少量）不算卡進方塊
+EPSILON = 1e-6
+
+
+class SolidBlockLookup:
+    """依方塊調色盤預先算好「是否為實心」的表，碰撞查詢只需讀一次區塊分段並索引 bytearray。"""
+
+    def __init__(self, palette, non_solid_names):
+        self.palette = palette
+        self.non_solid_names = frozenset(non_solid_names)
+        self.table = bytearray()
+        self.refresh()
+
+    def refresh(self):
+        self.table = bytearray(0 if name is None or name in self.non_solid_names else 1 for name in self.palette.names)
+
+    def is_solid(self, world, x, y, z):
+        chunk = world.chunks.get((x >> 4, z >> 4))
+        if chunk is None: return False
+        section = chunk.sections.get(y >> 4)
+        if section is None: return False
+        block_id = section[((y & 15) << 8) | ((z & 15) << 4) | (x & 15)]
+        if block_id >= len(self.table): self.refresh()  # 調色盤登錄了新方塊
+        return self.table[block_id] == 1
+
+
+def _cell_range(low, high):
+    return range(math.floor(low + EPSILON), math.ceil(high - EPSILON))
+
+
+def aabb_overlaps_solid(box_min, box_max, is_solid):
+    for ix in _cell_range(box_min[0], box_max[0]):
+        for iy in _cell_range(box_min[1], box_max[1]):
+            for iz in _cell_range(box_min[2], box_max[2]):
+                if is_solid(ix, iy, iz): return True
+    return False
+
+
+def sweep_aabb_axis(box_min, box_max, axis, delta, is_solid):
+    """沿單一軸移動 AABB，逐層檢查移動路徑上的所有方塊格（不會因速度太快穿牆）。
+
+    回傳 (實際可移動量, 接觸面法線)；沒有碰撞時法線為 0，撞到時為 -1 或 1（朝向 AABB 的一側）。
+    目前已經重疊的方塊層不算阻擋，卡在方塊裡時仍能移出來。
+    """
+    if delta == 0: return 0.0, 0
+    other_axes = [a for a in range(3) if a != axis]
+    spans = [_cell_range(box_min[a], box_max[a]) for a in other_axes]
+
+    def layer_blocked(layer):
+        cell = [0, 0, 0]; cell[axis] = layer
+        for i in spans[0]:
+            cell[other_axes[0]] = i
+            for j in spans[1]:
+                cell[other_axes[1]] = j
+                if is_solid(cell[0], cell[1], cell[2]): return True
+        return False
+
+    if delta > 0:
+        leading = box_max[axis]
+        for layer in range(math.ceil(leading - EPSILON), math.ceil(leading + delta)):
+            if layer_blocked(layer):
+                return max(0.0, layer - leading), -1
+    else:
+        leading = box_min[axis]
+        for layer in range(math.floor(leading + EPSILON) - 1, math.floor(leading + delta) - 1, -1):
+            if layer_blocked(layer):
+                return min(0.0, layer + 1 - leading), 1
+    return delta, 0
@@ -0,0 +1,87 @@
+import os
+import csv
+import json
+import time
+import logging
+from collections import deque
+from contextlib import contextmanager
+
+
+class FrameProfiler:
+    """逐影格量測各階段耗時，保留最近 history 個影格算百分位數，可選擇寫出 CSV / JSON Lines 追蹤檔。"""
+
+    def __init__(self, section_names, history=600):
+        self.section_names = list(section_names)
+        self.frame_times = deque(maxlen=history)
+        self.current = {}       # 目前影格各階段累計秒數（同一影格可能呼叫多次，例如固定步長補步）
+        self.last_frame = {}    # 上一個完成的影格
+        self.counters = {}
+        self.frame_index = 0
+        self._last_frame_end = None
+        self._trace_file = None
+        self._trace_csv = None  # CSV 時為 csv.writer，JSON Lines 時為 None
+        self._trace_header_written = False
+        self.trace_path = None
+
+    @contextmanager
+    def section(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        self.current[name] = self.current.get(name, 0.0) + seconds
+
+    def end_frame(self, **counters):
+        # 影格時間取兩次 end_frame 的間隔，包含事件處理與等待垂直同步的時間
+        now = time.perf_counter()
+        frame_time = now - self._last_frame_end if self._last_frame_end is not None else 0.0
+        self._last_frame_end = now
+        if frame_time > 0: self.frame_times.append(frame_time)
+        self.last_frame, self.current = self.current, {}
+        self.counters = counters
+        self.frame_index += 1
+        if self._trace_file: self._write_trace_row(frame_time)
+
+    def percentiles(self, points=(50, 95, 99)):
+        if not self.frame_times: return {p: 0.0 for p in points}
+        ordered = sorted(self.frame_times)
+        return {p: ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] for p in points}
+
+    def overlay_lines(self):
+        pct = self.percentiles()
+        lines = [f"Frame ms p50:{pct[50] * 1000:.1f} p95:{pct[95] * 1000:.1f} p99:{pct[99] * 1000:.1f} (n={len(self.frame_times)})"]
+        for name in self.section_names:
+            lines.append(f"{name}: {self.last_frame.get(name, 0.0) * 1000:.2f}ms")
+        lines.extend(f"{name}: {value}" for name, value in self.counters.items())
+        if self.trace_path: lines.append(f"Trace: {self.trace_path}")
+        return lines
+
+    def start_trace(self, path):
+        self.stop_trace()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._trace_file = open(path, "w", newline="", encoding="utf-8")
+        self._trace_csv = csv.writer(self._trace_file) if path.endswith(".csv") else None
+        self._trace_header_written = False
+        self.trace_path = path
+        logging.info(f"效能追蹤開始寫入 {path}")
+
+    def stop_trace(self):
+        if not self._trace_file: return
+        self._trace_file.close()
+        logging.info(f"效能追蹤已寫入 {self.trace_path}")
+        self._trace_file = self._trace_csv = self.trace_path = None
+
+    def _write_trace_row(self, frame_time):
+        row = {"frame": self.frame_index, "frame_ms": round(frame_time * 1000, 3)}
+        for name in self.section_names:
+            row[f"{name}_ms"] = round(self.last_frame.get(name, 0.0) * 1000, 3)
+        row.update(self.counters)
+        if self._trace_csv:
+            if not self._trace_header_written:
+                self._trace_csv.writerow(row.keys()); self._trace_header_written = True
+            self._trace_csv.writerow(row.values())
+        else:
+            self._trace_file.write(json.dumps(row) + "\n")
@@ -0,0 +1,43 @@
+import math
+
+
+def raycast_voxels(origin, direction, max_distance, is_hit):
+    """Amanatides–Woo 體素走訪：沿射線依序拜訪每個穿過的方塊格一次。
+
+    is_hit(pos) 為 True 時停止，回傳 (方塊座標, 進入面的法線, 命中距離)；超過 max_distance 回傳 None。
+    direction 需為單位向量，距離才會是實際長度。
+    """
+    ox, oy, oz = origin
+    cell = [math.floor(ox), math.floor(oy), math.floor(oz)]
+    if is_hit(tuple(cell)):
+        # 起點就在方塊裡：沒有進入面，以射線主要方向的反方向當作面對玩家的面
+        axis = max(range(3), key=lambda i: abs(direction[i]))
+        normal = [0, 0, 0]; normal[axis] = -1 if direction[axis] > 0 else 1
+        return tuple(cell), tuple(normal), 0.0
+
+    step = [0, 0, 0]
+    t_max = [math.inf, math.inf, math.inf]
+    t_delta = [math.inf, math.inf, math.inf]
+    for axis in range(3):
+        d = direction[axis]
+        if d > 0:
+            step[axis] = 1
+            t_max[axis] = (cell[axis] + 1 - origin[axis]) / d
+            t_delta[axis] = 1 / d
+        elif d < 0:
+            step[axis] = -1
+            t_max[axis] = (cell[axis] - origin[axis]) / d
+            t_delta[axis] = -1 / d
+
+    while True:
+        # 下一個穿過的格子邊界在哪個軸上最近，就往那個軸前進一格
+        axis = 0 if t_max[0] <= t_max[1] and t_max[0] <= t_max[2] else (1 if t_max[1] <= t_max[2] else 2)
+        distance = t_max[axis]
+        if distance > max_distance:
+            return None
+        cell[axis] += step[axis]
+        t_max[axis] += t_delta[axis]
+        pos = (cell[0], cell[1], cell[2])
+        if is_hit(pos):
+            normal = [0, 0, 0]; normal[axis] = -step[axis]
+            return pos, tuple(normal), distance
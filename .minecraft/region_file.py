@@ -0,0 +1,268 @@
+import json
+import logging
+import os
+import struct
+import threading
+import zlib
+
+from world_store import BLOCK_PALETTE, SECTION_VOLUME, Chunk, WorldStore
+
+# 區域檔：每個檔案收納 32x32 個區塊，檔頭後接 1024 筆 (offset, length) 位移表，之後是各區塊紀錄
+REGION_SHIFT = 5
+REGION_SIZE = 1 << REGION_SHIFT
+REGION_MAGIC = b"MCPR"
+REGION_VERSION = 1
+HEADER_STRUCT = struct.Struct("<4sHH")
+OFFSET_STRUCT = struct.Struct("<II")
+TABLE_OFFSET = HEADER_STRUCT.size
+DATA_OFFSET = TABLE_OFFSET + OFFSET_STRUCT.size * REGION_SIZE * REGION_SIZE
+
+# 區塊紀錄：1 byte 旗標 + 內容；內容 = 區塊調色盤 + 各高度分段的方塊索引（每格 1 byte）
+# 差異紀錄（RECORD_FLAG_DELTA）：內容 = 區塊調色盤 + 與依種子重新生成的地形不同的格子 (y, z<<4|x, 方塊索引)，索引 0 代表被挖掉
+RECORD_FLAG_ZLIB = 0x01
+RECORD_FLAG_DELTA = 0x02
+SECTION_STRUCT = struct.Struct("<h")
+EDIT_COUNT_STRUCT = struct.Struct("<I")
+EDIT_STRUCT = struct.Struct("<hBB")
+
+
+def region_of(cx, cz):
+    return cx >> REGION_SHIFT, cz >> REGION_SHIFT
+
+
+def _table_index(cx, cz):
+    return (cz & (REGION_SIZE - 1)) * REGION_SIZE + (cx & (REGION_SIZE - 1))
+
+
+def _encode_palette(global_ids, palette):
+    # 以區塊自己的調色盤重新編號，存檔內容與執行期的全域 ID 無關
+    global_ids = sorted(set(global_ids) - {0})
+    to_local = bytearray(256)
+    parts = [bytes((len(global_ids),))]
+    for local_id, block_id in enumerate(global_ids, start=1):
+        to_local[block_id] = local_id
+        encoded_name = palette.name_for(block_id).encode("utf-8")
+        parts.append(bytes((len(encoded_name),)))
+        parts.append(encoded_name)
+    return to_local, parts
+
+
+def _decode_palette(payload, palette):
+    to_global = bytearray(256)
+    pos = 1
+    for local_id in range(1, payload[0] + 1):
+        name_length = payload[pos]
+        name = payload[pos + 1:pos + 1 + name_length].decode("utf-8")
+        to_global[local_id] = palette.id_for(name)
+        pos += 1 + name_length
+    return to_global, pos
+
+
+def _pack_record(flags, payload, compress):
+    if compress:
+        return bytes((flags | RECORD_FLAG_ZLIB,)) + zlib.compress(payload, 6)
+    return bytes((flags,)) + payload
+
+
+def encode_chunk(chunk, palette=BLOCK_PALETTE, compress=True):
+    global_ids = set()
+    for section in chunk.sections.values():
+        global_ids.update(section)
+    to_local, parts = _encode_palette(global_ids, palette)
+    parts.append(bytes((len(chunk.sections),)))
+    for sy in sorted(chunk.sections):
+        parts.append(SECTION_STRUCT.pack(sy))
+        parts.append(bytes(chunk.sections[sy]).translate(to_local))
+    return _pack_record(0, b"".join(parts), compress)
+
+
+def diff_chunk(chunk, base_chunk):
+    """列出 chunk 與 base_chunk 不同的格子，產生 (y, 分段內 z<<4|x, 全域方塊 ID)。"""
+    empty_section = bytes(SECTION_VOLUME)
+    for sy in sorted(set(chunk.sections) | set(base_chunk.sections)):
+        section = chunk.sections.get(sy, empty_section)
+        base_section = base_chunk.sections.get(sy, empty_section)
+        if section == base_section: continue
+        for index, (block_id, base_id) in enumerate(zip(section, base_section)):
+            if block_id != base_id:
+                yield sy * 16 + (index >> 8), index & 0xFF, block_id
+
+
+def encode_chunk_delta(chunk, base_chunk, palette=BLOCK_PALETTE, compress=True):
+    edits = list(diff_chunk(chunk, base_chunk))
+    to_local, parts = _encode_palette((block_id for _, _, block_id in edits), palette)
+    parts.append(EDIT_COUNT_STRUCT.pack(len(edits)))
+    parts.extend(EDIT_STRUCT.pack(y, xz, to_local[block_id]) for y, xz, block_id in edits)
+    return _pack_record(RECORD_FLAG_DELTA, b"".join(parts), compress)
+
+
+def decode_chunk(record, cx, cz, palette=BLOCK_PALETTE, base_chunk=None):
+    """還原區塊；差異紀錄需要 base_chunk（依種子重新生成的原始地形），會直接套用在它上面。"""
+    payload = record[1:]
+    if record[0] & RECORD_FLAG_ZLIB:
+        payload = zlib.decompress(payload)
+    to_global, pos = _decode_palette(payload, palette)
+
+    if record[0] & RECORD_FLAG_DELTA:
+        if base_chunk is None:
+            raise ValueError(f"區塊 ({cx}, {cz}) 是差異紀錄，但沒有可套用的原始地形")
+        (edit_count,) = EDIT_COUNT_STRUCT.unpack_from(payload, pos)
+        pos += EDIT_COUNT_STRUCT.size
+        for y, xz, local_id in EDIT_STRUCT.iter_unpack(payload[pos:pos + edit_count * EDIT_STRUCT.size]):
+            base_chunk.set_id(xz & 15, y, xz >> 4, to_global[local_id])
+        return base_chunk
+
+    chunk = Chunk(cx, cz)
+    section_count = payload[pos]
+    pos += 1
+    for _ in range(section_count):
+        (sy,) = SECTION_STRUCT.unpack_from(payload, pos)
+        pos += SECTION_STRUCT.size
+        section = bytearray(payload[pos:pos + SECTION_VOLUME].translate(to_global))
+        pos += SECTION_VOLUME
+        block_count = SECTION_VOLUME - section.count(0)
+        if block_count:
+            chunk.sections[sy] = section
+            chunk.section_counts[sy] = block_count
+    return chunk
+
+
+class RegionStorage:
+    """管理 worlds/region 底下的區域檔，提供整區塊的讀寫；寫入採暫存檔 + rename，避免寫到一半損毀。"""
+
+    def __init__(self, region_dir, palette=BLOCK_PALETTE, compress=True, base_chunk=None):
+        self.region_dir = region_dir
+        self.palette = palette
+        self.compress = compress
+        # base_chunk(cx, cz) 回傳依種子重新生成的原始區塊；有提供時改存差異紀錄，存檔大小只和玩家修改量有關
+        self.base_chunk = base_chunk
+        self._offset_tables = {}
+        self._lock = threading.Lock()
+
+    def region_path(self, rx, rz):
+        return os.path.join(self.region_dir, f"r.{rx}.{rz}.region")
+
+    def region_keys(self):
+        if not os.path.isdir(self.region_dir): return []
+        keys = []
+        for filename in os.listdir(self.region_dir):
+            parts = filename.split(".")
+            if len(parts) == 4 and parts[0] == "r" and parts[3] == "region":
+                try: keys.append((int(parts[1]), int(parts[2])))
+                except ValueError: logging.warning(f"忽略無法辨識的區域檔 {filename}")
+        return keys
+
+    def _read_offset_table(self, rx, rz):
+        table = self._offset_tables.get((rx, rz))
+        if table is not None: return table
+        table = [(0, 0)] * (REGION_SIZE * REGION_SIZE)
+        path = self.region_path(rx, rz)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                header = f.read(DATA_OFFSET)
+            if len(header) == DATA_OFFSET and header[:4] == REGION_MAGIC:
+                table = [OFFSET_STRUCT.unpack_from(header, TABLE_OFFSET + i * OFFSET_STRUCT.size) for i in range(REGION_SIZE * REGION_SIZE)]
+            else:
+                logging.error(f"區域檔 {path} 檔頭損毀，視為空區域。")
+        self._offset_tables[(rx, rz)] = table
+        return table
+
+    def chunk_keys(self):
+        keys = set()
+        with self._lock:
+            for rx, rz in self.region_keys():
+                table = self._read_offset_table(rx, rz)
+                for index, (offset, length) in enumerate(table):
+                    if length:
+                        keys.add((rx * REGION_SIZE + index % REGION_SIZE, rz * REGION_SIZE + index // REGION_SIZE))
+        return keys
+
+    def _read_records(self, rx, rz):
+        table = self._read_offset_table(rx, rz)
+        records = {}
+        path = self.region_path(rx, rz)
+        if not any(length for _, length in table): return records
+        with open(path, "rb") as f:
+            data = f.read()
+        for index, (offset, length) in enumerate(table):
+            if length:
+                records[(rx * REGION_SIZE + index % REGION_SIZE, rz * REGION_SIZE + index // REGION_SIZE)] = data[offset:offset + length]
+        return records
+
+    def load_chunk(self, cx, cz):
+        with self._lock:
+            rx, rz = region_of(cx, cz)
+            offset, length = self._read_offset_table(rx, rz)[_table_index(cx, cz)]
+            if not length: return None
+            with open(self.region_path(rx, rz), "rb") as f:
+                f.seek(offset)
+                record = f.read(length)
+        return self._decode_record(record, cx, cz)
+
+    def _decode_record(self, record, cx, cz):
+        base_chunk = self.base_chunk(cx, cz) if record[0] & RECORD_FLAG_DELTA and self.base_chunk else None
+        return decode_chunk(record, cx, cz, self.palette, base_chunk)
+
+    def _encode_record(self, chunk):
+        record = encode_chunk(chunk, self.palette, self.compress)
+        if self.base_chunk is None: return record
+        # 舊世界的區塊可能與目前種子生成的地形差很多，差異紀錄反而比較大時保留完整紀錄
+        delta_record = encode_chunk_delta(chunk, self.base_chunk(chunk.cx, chunk.cz), self.palette, self.compress)
+        return delta_record if len(delta_record) < len(record) else record
+
+    def load_all(self):
+        for rx, rz in self.region_keys():
+            with self._lock:
+                records = self._read_records(rx, rz)
+            for (cx, cz), record in records.items():
+                yield self._decode_record(record, cx, cz)
+
+    def save_chunks(self, chunks):
+        """寫入（覆蓋）指定區塊，其餘區塊沿用檔案中原本的紀錄。回傳寫入的位元組數。"""
+        records_by_region = {}
+        for chunk in chunks:
+            records_by_region.setdefault(region_of(chunk.cx, chunk.cz), {})[(chunk.cx, chunk.cz)] = self._encode_record(chunk)
+        bytes_written = 0
+        with self._lock:
+            for (rx, rz), new_records in records_by_region.items():
+                records = self._read_records(rx, rz)
+                records.update(new_records)
+                bytes_written += self._write_region(rx, rz, records)
+        return bytes_written
+
+    def _write_region(self, rx, rz, records):
+        table = bytearray(DATA_OFFSET - TABLE_OFFSET)
+        body = []
+        offset = DATA_OFFSET
+        for (cx, cz), record in records.items():
+            OFFSET_STRUCT.pack_into(table, _table_index(cx, cz) * OFFSET_STRUCT.size, offset, len(record))
+            body.append(record)
+            offset += len(record)
+        data = HEADER_STRUCT.pack(REGION_MAGIC, REGION_VERSION, 0) + bytes(table) + b"".join(body)
+
+        os.makedirs(self.region_dir, exist_ok=True)
+        path = self.region_path(rx, rz)
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+        self._offset_tables.pop((rx, rz), None)
+        return len(data)
+
+
+def migrate_json_world(json_path, storage):
+    """把舊版 worlds/world.json 一次性轉成區域檔，原檔改名為 .migrated 保留備份。"""
+    with open(json_path, "r", encoding="utf-8") as f:
+        content = f.read()
+    data = json.loads(content) if content.strip() else {}
+    if not isinstance(data, dict):
+        raise ValueError(f"{json_path} 不是預期的方塊字典格式")
+    legacy_world = WorldStore(storage.palette)
+    for k, v in data.items():
+        legacy_world[tuple(map(int, k.split(',')))] = v
+    bytes_written = storage.save_chunks(legacy_world.chunks.values())
+    os.replace(json_path, json_path + ".migrated")
+    logging.info(f"已將 {json_path} ({len(legacy_world)} 方塊, {len(legacy_world.chunks)} 區塊) 轉換為區域檔，共 {bytes_written} bytes。")
+    return len(legacy_world.chunks)
@@ -0,0 +1,197 @@
+import logging
+import random
+
+from world_store import WorldStore, Chunk, CHUNK_SIZE, SECTION_HEIGHT
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 有安裝 NumPy 時整個區塊以 3D 陣列一次生成，否則退回逐格的 Python 迴圈；兩者結果完全相同
+USE_NUMPY = np is not None
+
+BASE_Y_LEVEL = 8
+ORES_TO_GENERATE = [
+    ("coal_ore", 0, BASE_Y_LEVEL - 1, 80), ("iron_ore", 2, BASE_Y_LEVEL - 3, 50),
+    ("gold_ore", 4, BASE_Y_LEVEL - 5, 15), ("lapis_ore", 4, BASE_Y_LEVEL - 5, 10),
+    ("diamond_ore", 5, BASE_Y_LEVEL - 6, 5)
+]
+
+# 世界種子規則：每個區塊的樹木使用 chunk_rng(seed, chunk_x, chunk_z) 建立的獨立 random.Random，
+# 區塊內容只由 (seed, chunk_x, chunk_z) 決定，與生成順序無關，未修改的區塊可以隨時丟棄再重新生成。
+# 礦物種子規則：每個 (x, y, z, 礦物序號) 的擲骰值 = ore_roll(seed, x, y, z, ore_index)，範圍 1..1000，
+# 小於等於 rarity 即生成；依 ORES_TO_GENERATE 的順序第一個成功的礦物勝出。
+# 擲骰只由座標與種子決定（32 位元整數雜湊），與生成順序、執行緒、是否使用 NumPy 無關。
+_MASK32 = 0xFFFFFFFF
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+
+
+def chunk_rng(seed, chunk_x, chunk_z):
+    return random.Random(((seed & _MASK64) << 64) | ((chunk_x & _MASK32) << 32) | (chunk_z & _MASK32))
+
+
+def _seed32(seed):
+    return (seed ^ (seed >> 32)) & _MASK32
+
+
+def _mix32(h):
+    h ^= h >> 16; h = (h * 0x7FEB352D) & _MASK32
+    h ^= h >> 15; h = (h * 0x846CA68B) & _MASK32
+    h ^= h >> 16
+    return h
+
+
+def ore_roll(seed, x, y, z, ore_index):
+    h = _mix32(((y & _MASK32) << 8 | ore_index) & _MASK32)
+    h = _mix32((z & _MASK32) ^ h)
+    h = _mix32((x & _MASK32) ^ h)
+    h = _mix32(_seed32(seed) ^ h)
+    return h % 1000 + 1
+
+
+def _mix32_array(h):
+    h ^= h >> np.uint32(16); h *= np.uint32(0x7FEB352D)
+    h ^= h >> np.uint32(15); h *= np.uint32(0x846CA68B)
+    h ^= h >> np.uint32(16)
+    return h
+
+
+def _ore_roll_array(seed, xs, ys, zs, ore_index):
+    # 與 ore_roll 相同的雜湊，以 uint32 陣列運算（乘法自然溢位等同 & 0xFFFFFFFF）
+    to_u32 = lambda values: (np.asarray(values, dtype=np.int64) & _MASK32).astype(np.uint32)
+    h = _mix32_array((to_u32(ys) << np.uint32(8)) | np.uint32(ore_index))
+    h = _mix32_array(to_u32(zs) ^ h)
+    h = _mix32_array(to_u32(xs) ^ h)
+    h = _mix32_array(np.uint32(_seed32(seed)) ^ h)
+    return h % np.uint32(1000) + np.uint32(1)
+
+
+def generate_tree(world, xt, ys, zt, tree_type="oak", rng=random):
+    non_solid_blocks = {"oak_leaves", "birch_leaves"}
+    log_type = f"{tree_type}_log"
+    leaves_type = f"{tree_type}_leaves"
+
+    can_grow=True
+    for i in range(-1,2): 
+        for j in range(-1,2):
+            if i==0 and j==0: continue 
+            check_pos_ground=(xt+i,ys-1,zt+j)
+            block_on_ground=world.get(check_pos_ground)
+            if block_on_ground and block_on_ground not in ["grass_block", "dirt"] and block_on_ground not in non_solid_blocks:
+                can_grow=False; break
+            for k_up in range(5): 
+                check_pos_air=(xt+i,ys+k_up,zt+j)
+                block_in_air=world.get(check_pos_air)
+                if block_in_air and block_in_air not in non_solid_blocks: 
+                    can_grow=False; break
+            if not can_grow: break
+        if not can_grow: break
+
+    if not (world.get((xt,ys-1,zt)) in ["grass_block","dirt"]): 
+        can_grow=False
+
+    if not can_grow: return False
+
+    trunk_height=rng.randint(4,6); placed_logs=[]
+    for i in range(trunk_height):
+        log_pos=(xt,ys+i,zt)
+        if world.get(log_pos) and world.get(log_pos) not in [None] and world.get(log_pos) not in non_solid_blocks:
+            for plog_pos in placed_logs: world.pop(plog_pos,None) 
+            return False
+        world[log_pos]=log_type; placed_logs.append(log_pos)
+
+    leaf_y_base=ys+trunk_height-2 
+    leaf_height_layers=rng.randint(3,4) 
+    for leaf_y_offset in range(leaf_height_layers):
+        current_y=leaf_y_base+leaf_y_offset
+        radius=1 if (leaf_y_offset==leaf_height_layers-1 and leaf_height_layers>1) else 2 
+        if leaf_height_layers==1: radius=1 
+
+        for leaf_x_offset in range(-radius,radius+1):
+            for leaf_z_offset in range(-radius,radius+1):
+                if leaf_x_offset==0 and leaf_z_offset==0 and current_y < ys + trunk_height: continue
+                if radius==2 and abs(leaf_x_offset)==2 and abs(leaf_z_offset)==2 and rng.random()<0.5: continue
+                if radius==2 and (abs(leaf_x_offset)==2 or abs(leaf_z_offset)==2) and \
+                   (abs(leaf_x_offset)!=abs(leaf_z_offset)) and rng.random()<0.2: continue
+
+                leaf_pos=(xt+leaf_x_offset,current_y,zt+leaf_z_offset)
+                existing_block_at_leaf_pos=world.get(leaf_pos)
+                if not existing_block_at_leaf_pos or existing_block_at_leaf_pos in non_solid_blocks:
+                    world[leaf_pos]=leaves_type
+    return True
+
+def generate_chunk(world, chunk_x, chunk_z, chunk_size=CHUNK_SIZE, rng=random, seed=0, use_numpy=None):
+    base_y_level = BASE_Y_LEVEL
+    start_x, start_z = chunk_x * chunk_size, chunk_z * chunk_size
+
+    if use_numpy is None: use_numpy = USE_NUMPY
+    if use_numpy and chunk_size == CHUNK_SIZE:
+        world.put_chunk(generate_terrain_array_chunk(chunk_x, chunk_z, world.palette, seed), dirty=True)
+    else:
+        _fill_terrain_columns(world, start_x, start_z, chunk_size, seed)
+
+    if rng.random() < 0.15: 
+        for _ in range(rng.randint(1, 3)):
+            x_tree, z_tree = start_x + rng.randint(2, chunk_size-3), start_z + rng.randint(2, chunk_size-3)
+            if world.get((x_tree, base_y_level, z_tree)) == "grass_block":
+                tree_type = "birch" if rng.random() < 0.3 else "oak" 
+                generate_tree(world, x_tree, base_y_level + 1, z_tree, tree_type=tree_type, rng=rng)
+
+    logging.info(f"Generated chunk at ({chunk_x}, {chunk_z})")
+
+
+def _fill_terrain_columns(world, start_x, start_z, chunk_size, seed):
+    base_y_level = BASE_Y_LEVEL
+    for dx in range(chunk_size):
+        for dz in range(chunk_size):
+            x_coord, z_coord = start_x + dx, start_z + dz
+            world[(x_coord, 0, z_coord)] = "stone"
+            for y_offset in range(1, base_y_level - 4): world[(x_coord, y_offset, z_coord)] = "stone"
+            for y_offset in range(base_y_level - 4, base_y_level): world[(x_coord, y_offset, z_coord)] = "dirt"
+            world[(x_coord, base_y_level, z_coord)] = "grass_block"
+
+            for y_ore_check in range(1, base_y_level - 1):
+                if world.get((x_coord, y_ore_check, z_coord)) == "stone":
+                    for ore_index, (ore_type, min_d, max_d, rarity) in enumerate(ORES_TO_GENERATE):
+                        if min_d <= y_ore_check <= max_d and ore_roll(seed, x_coord, y_ore_check, z_coord, ore_index) <= rarity:
+                            world[(x_coord, y_ore_check, z_coord)] = ore_type
+                            break
+
+
+def generate_terrain_array_chunk(chunk_x, chunk_z, palette, seed=0):
+    """NumPy 版地形：以 [y, z, x] 的 uint8 陣列一次填好石頭/泥土/草地並擲礦物，直接轉成 Chunk 的分段。"""
+    base_y_level = BASE_Y_LEVEL
+    height = (base_y_level // SECTION_HEIGHT + 1) * SECTION_HEIGHT
+    blocks = np.zeros((height, CHUNK_SIZE, CHUNK_SIZE), dtype=np.uint8)
+    stone_id, dirt_id, grass_id = palette.id_for("stone"), palette.id_for("dirt"), palette.id_for("grass_block")
+    blocks[0:base_y_level - 4] = stone_id
+    blocks[base_y_level - 4:base_y_level] = dirt_id
+    blocks[base_y_level] = grass_id
+
+    # 只有 y=1..base_y_level-2 之間原本是石頭的格子會擲骰，順序在前的礦物優先
+    ys, zs, xs = np.meshgrid(np.arange(1, base_y_level - 1), np.arange(CHUNK_SIZE), np.arange(CHUNK_SIZE), indexing="ij")
+    candidates = blocks[1:base_y_level - 1] == stone_id
+    for ore_index, (ore_type, min_d, max_d, rarity) in enumerate(ORES_TO_GENERATE):
+        in_range = candidates & (ys >= min_d) & (ys <= max_d)
+        if not in_range.any(): continue
+        rolls = _ore_roll_array(seed, xs + chunk_x * CHUNK_SIZE, ys, zs + chunk_z * CHUNK_SIZE, ore_index)
+        hits = in_range & (rolls <= rarity)
+        blocks[1:base_y_level - 1][hits] = palette.id_for(ore_type)
+        candidates &= ~hits
+
+    chunk = Chunk(chunk_x, chunk_z)
+    for sy in range(height // SECTION_HEIGHT):
+        section = blocks[sy * SECTION_HEIGHT:(sy + 1) * SECTION_HEIGHT]
+        block_count = int(np.count_nonzero(section))
+        if block_count:
+            chunk.sections[sy] = bytearray(section.tobytes())
+            chunk.section_counts[sy] = block_count
+    return chunk
+
+
+def generate_chunk_payload(chunk_x, chunk_z, chunk_size=CHUNK_SIZE, seed=0):
+    """在背景執行緒中生成區塊：寫入獨立的暫存世界，回傳生成好的 Chunk，不碰主執行緒的資料。"""
+    scratch_world = WorldStore()
+    generate_chunk(scratch_world, chunk_x, chunk_z, chunk_size, rng=chunk_rng(seed, chunk_x, chunk_z), seed=seed)
+    return scratch_world.get_or_create_chunk(chunk_x, chunk_z)
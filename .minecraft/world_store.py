@@ -0,0 +1,228 @@
+import threading
+
+# 區塊水平邊長與垂直分段高度（需為 2 的次方，座標換算使用位元運算）
+CHUNK_SIZE = 16
+SECTION_HEIGHT = 16
+SECTION_VOLUME = CHUNK_SIZE * CHUNK_SIZE * SECTION_HEIGHT
+AIR_ID = 0
+
+
+class BlockPalette:
+    """方塊名稱與數字 ID 的對照表，ID 0 固定代表空氣。"""
+
+    def __init__(self, names=()):
+        self.names = [None]
+        self.ids = {}
+        self._lock = threading.Lock()  # 背景生成執行緒也可能登錄新方塊
+        for name in names:
+            self.id_for(name)
+
+    def id_for(self, name):
+        block_id = self.ids.get(name)
+        if block_id is None:
+            with self._lock:
+                block_id = self.ids.get(name)
+                if block_id is None:
+                    if len(self.names) > 255:
+                        raise ValueError(f"方塊種類超過 255 種，無法登錄 '{name}'")
+                    block_id = len(self.names)
+                    self.names.append(name)
+                    self.ids[name] = block_id
+        return block_id
+
+    def name_for(self, block_id):
+        return self.names[block_id]
+
+
+BLOCK_PALETTE = BlockPalette([
+    "stone", "dirt", "grass_block", "coal_ore", "iron_ore", "gold_ore", "lapis_ore", "diamond_ore",
+    "oak_log", "oak_leaves", "birch_log", "birch_leaves", "oak_planks", "birch_planks",
+    "cobblestone", "sand", "gravel", "crafting_table",
+])
+
+
+def local_index(lx, ly, lz):
+    # y 為最外層，同一高度的 16x16 平面在記憶體中連續
+    return (ly << 8) | (lz << 4) | lx
+
+
+class Chunk:
+    """一個 16x16 的區塊柱，依高度切成多個 16 格高的分段，每段是一個方塊 ID 的 bytearray。"""
+
+    __slots__ = ("cx", "cz", "sections", "section_counts")
+
+    def __init__(self, cx, cz):
+        self.cx = cx
+        self.cz = cz
+        self.sections = {}
+        self.section_counts = {}
+
+    def get_id(self, lx, y, lz):
+        section = self.sections.get(y >> 4)
+        if section is None:
+            return AIR_ID
+        return section[local_index(lx, y & 15, lz)]
+
+    def set_id(self, lx, y, lz, block_id):
+        """寫入一格並回傳原本的 ID，空段會自動建立或回收。"""
+        sy = y >> 4
+        section = self.sections.get(sy)
+        if section is None:
+            if block_id == AIR_ID:
+                return AIR_ID
+            section = self.sections[sy] = bytearray(SECTION_VOLUME)
+            self.section_counts[sy] = 0
+        index = local_index(lx, y & 15, lz)
+        old_id = section[index]
+        if old_id == block_id:
+            return old_id
+        section[index] = block_id
+        if old_id == AIR_ID:
+            self.section_counts[sy] += 1
+        elif block_id == AIR_ID:
+            self.section_counts[sy] -= 1
+            if self.section_counts[sy] == 0:
+                del self.sections[sy]
+                del self.section_counts[sy]
+        return old_id
+
+    def block_count(self):
+        return sum(self.section_counts.values())
+
+    def copy(self):
+        clone = Chunk(self.cx, self.cz)
+        clone.sections = {sy: bytearray(section) for sy, section in self.sections.items()}
+        clone.section_counts = dict(self.section_counts)
+        return clone
+
+    def iter_blocks(self):
+        """依序產生 (lx, y, lz, block_id)，只包含非空氣方塊。"""
+        for sy, section in self.sections.items():
+            base_y = sy * SECTION_HEIGHT
+            for index, block_id in enumerate(section):
+                if block_id:
+                    yield index & 15, base_y + (index >> 8), (index >> 4) & 15, block_id
+
+
+class WorldStore:
+    """以區塊分割的世界儲存，對外保留 dict 介面（鍵為 (x, y, z)，值為方塊名稱）。"""
+
+    def __init__(self, palette=BLOCK_PALETTE):
+        self.palette = palette
+        self.chunks = {}
+        self._block_count = 0
+        # 自上次寫入磁碟後有變動（或新生成尚未存檔）的區塊
+        self.dirty_chunks = set()
+
+    # --- 區塊層級操作 ---
+    def get_chunk(self, cx, cz):
+        return self.chunks.get((cx, cz))
+
+    def get_or_create_chunk(self, cx, cz):
+        chunk = self.chunks.get((cx, cz))
+        if chunk is None:
+            chunk = self.chunks[(cx, cz)] = Chunk(cx, cz)
+        return chunk
+
+    def put_chunk(self, chunk, dirty=False):
+        """放入整個區塊；若該處已有方塊（例如玩家先放置的），以既有方塊覆蓋新區塊。"""
+        key = (chunk.cx, chunk.cz)
+        existing = self.chunks.get(key)
+        if existing is not None:
+            for lx, y, lz, block_id in existing.iter_blocks():
+                chunk.set_id(lx, y, lz, block_id)
+            self._block_count -= existing.block_count()
+            dirty = dirty or key in self.dirty_chunks
+        self.chunks[key] = chunk
+        self._block_count += chunk.block_count()
+        if dirty:
+            self.dirty_chunks.add(key)
+
+    def remove_chunk(self, cx, cz):
+        """從記憶體移除區塊，回傳 (chunk, 是否尚未存檔)。"""
+        chunk = self.chunks.pop((cx, cz), None)
+        if chunk is None:
+            return None, False
+        self._block_count -= chunk.block_count()
+        was_dirty = (cx, cz) in self.dirty_chunks
+        self.dirty_chunks.discard((cx, cz))
+        return chunk, was_dirty
+
+    def chunk_keys(self):
+        return self.chunks.keys()
+
+    # --- dict 相容介面 ---
+    def get(self, pos, default=None):
+        x, y, z = pos
+        chunk = self.chunks.get((x >> 4, z >> 4))
+        if chunk is None:
+            return default
+        section = chunk.sections.get(y >> 4)
+        if section is None:
+            return default
+        block_id = section[((y & 15) << 8) | ((z & 15) << 4) | (x & 15)]
+        if block_id == AIR_ID:
+            return default
+        return self.palette.names[block_id]
+
+    def __getitem__(self, pos):
+        block_type = self.get(pos)
+        if block_type is None:
+            raise KeyError(pos)
+        return block_type
+
+    def __contains__(self, pos):
+        return self.get(pos) is not None
+
+    def __setitem__(self, pos, block_type):
+        x, y, z = pos
+        block_id = self.palette.id_for(block_type) if block_type is not None else AIR_ID
+        chunk = self.get_or_create_chunk(x >> 4, z >> 4)
+        old_id = chunk.set_id(x & 15, y, z & 15, block_id)
+        if old_id == block_id:
+            return
+        self.dirty_chunks.add((chunk.cx, chunk.cz))
+        if old_id == AIR_ID:
+            self._block_count += 1
+        elif block_id == AIR_ID:
+            self._block_count -= 1
+
+    def pop(self, pos, *default):
+        x, y, z = pos
+        chunk = self.chunks.get((x >> 4, z >> 4))
+        old_id = chunk.set_id(x & 15, y, z & 15, AIR_ID) if chunk is not None else AIR_ID
+        if old_id == AIR_ID:
+            if default:
+                return default[0]
+            raise KeyError(pos)
+        self._block_count -= 1
+        self.dirty_chunks.add((chunk.cx, chunk.cz))
+        return self.palette.names[old_id]
+
+    def __delitem__(self, pos):
+        self.pop(pos)
+
+    def __len__(self):
+        return self._block_count
+
+    def __bool__(self):
+        return self._block_count > 0
+
+    def __iter__(self):
+        return self.keys()
+
+    def items(self):
+        names = self.palette.names
+        for chunk in list(self.chunks.values()):
+            base_x, base_z = chunk.cx * CHUNK_SIZE, chunk.cz * CHUNK_SIZE
+            for lx, y, lz, block_id in chunk.iter_blocks():
+                yield (base_x + lx, y, base_z + lz), names[block_id]
+
+    def keys(self):
+        for pos, _ in self.items():
+            yield pos
+
+    def clear(self):
+        self.chunks.clear()
+        self._block_count = 0
+        self.dirty_chunks.clear()
@@ -0,0 +1,88 @@
+"""區塊地形生成速度比較：改版前的 random.randint 逐格迴圈（基準）vs 逐格 Python 迴圈 vs NumPy 陣列版本。
+
+用法（在專案根目錄）:  python benchmarks/chunk_generation.py [區塊數]
+"""
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, ".minecraft"))
+
+import terrain
+from world_store import WorldStore
+
+
+def baseline_generate_chunk(world, chunk_x, chunk_z, chunk_size=terrain.CHUNK_SIZE, rng=random):
+    """改版前的 terrain.generate_chunk 原樣複製：逐格寫入世界、每格每種礦物各擲一次 rng.randint，作為速度比較的基準。"""
+    base_y_level = 8
+    ores_to_generate = [
+        ("coal_ore", 0, base_y_level - 1, 80), ("iron_ore", 2, base_y_level - 3, 50),
+        ("gold_ore", 4, base_y_level - 5, 15), ("lapis_ore", 4, base_y_level - 5, 10),
+        ("diamond_ore", 5, base_y_level - 6, 5)
+    ]
+
+    start_x, start_z = chunk_x * chunk_size, chunk_z * chunk_size
+
+    for dx in range(chunk_size):
+        for dz in range(chunk_size):
+            x_coord, z_coord = start_x + dx, start_z + dz
+            world[(x_coord, 0, z_coord)] = "stone"
+            for y_offset in range(1, base_y_level - 4): world[(x_coord, y_offset, z_coord)] = "stone"
+            for y_offset in range(base_y_level - 4, base_y_level): world[(x_coord, y_offset, z_coord)] = "dirt"
+            world[(x_coord, base_y_level, z_coord)] = "grass_block"
+
+            for y_ore_check in range(1, base_y_level - 1):
+                if world.get((x_coord, y_ore_check, z_coord)) == "stone":
+                    for ore_type, min_d, max_d, rarity in ores_to_generate:
+                        if min_d <= y_ore_check <= max_d and rng.randint(1, 1000) <= rarity:
+                            world[(x_coord, y_ore_check, z_coord)] = ore_type
+                            break
+
+    if rng.random() < 0.15:
+        for _ in range(rng.randint(1, 3)):
+            x_tree, z_tree = start_x + rng.randint(2, chunk_size-3), start_z + rng.randint(2, chunk_size-3)
+            if world.get((x_tree, base_y_level, z_tree)) == "grass_block":
+                tree_type = "birch" if rng.random() < 0.3 else "oak"
+                terrain.generate_tree(world, x_tree, base_y_level + 1, z_tree, tree_type=tree_type, rng=rng)
+
+    logging.info(f"Generated chunk at ({chunk_x}, {chunk_z})")
+
+
+def run_baseline(chunk_count):
+    start_time = time.perf_counter()
+    for i in range(chunk_count):
+        random.seed(i)
+        baseline_generate_chunk(WorldStore(), i % 8 - 4, i // 8 - 4)
+    return chunk_count / (time.perf_counter() - start_time)
+
+
+def run(chunk_count, use_numpy, seed=12345):
+    worlds = []
+    start_time = time.perf_counter()
+    for i in range(chunk_count):
+        world = WorldStore()
+        # 樹木仍使用 rng；兩種版本給同一個 rng 種子，結果應完全相同
+        terrain.generate_chunk(world, i % 8 - 4, i // 8 - 4, rng=random.Random(i), seed=seed, use_numpy=use_numpy)
+        worlds.append(world)
+    return chunk_count / (time.perf_counter() - start_time), worlds
+
+
+def main():
+    chunk_count = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    baseline_rate = run_baseline(chunk_count)
+    print(f"改版前基準 : {baseline_rate:8.1f} chunks/s")
+    python_rate, python_worlds = run(chunk_count, use_numpy=False)
+    print(f"Python 迴圈: {python_rate:8.1f} chunks/s  ({python_rate / baseline_rate:.1f}x)")
+    if terrain.np is None:
+        print("未安裝 NumPy，略過陣列版本。")
+        return
+    numpy_rate, numpy_worlds = run(chunk_count, use_numpy=True)
+    print(f"NumPy 陣列 : {numpy_rate:8.1f} chunks/s  ({numpy_rate / baseline_rate:.1f}x)")
+    identical = all(dict(a.items()) == dict(b.items()) for a, b in zip(python_worlds, numpy_worlds))
+    print(f"兩種版本生成結果相同: {identical}")
+
+
+if __name__ == "__main__":
+    main()
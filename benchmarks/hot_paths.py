@@ -0,0 +1,197 @@
+"""無視窗的熱點效能測試：地形生成、區塊網格、準星射線、碰撞、世界存讀檔，結果輸出成 JSON。
+
+Game 的建構子需要 pyglet 視窗，這裡用 HeadlessGame 只設定各熱點用到的欄位，
+直接呼叫 Game 上的原始方法；區塊網格只量 CPU 端產生頂點陣列的時間，不含 GL 上傳。
+
+用法（在專案根目錄）:  python benchmarks/hot_paths.py [--sizes 10000,100000,1000000] [--output result.json]
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, ".minecraft"))
+
+import pyglet
+pyglet.options['headless'] = True  # 沒有 X 顯示的機器上匯入 pyglet.window 也不會失敗
+
+# 先設定根 logger，匯入 game 時它的 basicConfig 不會生效，延遲開檔的 game.log 也就不會被建立
+logging.basicConfig(level=logging.WARNING)
+
+import game
+import terrain
+from physics import SolidBlockLookup
+from block_registry import BlockRegistry, NON_SOLID_BLOCKS
+from lighting import SkyHeightMap
+from region_file import RegionStorage
+from world_store import WorldStore, Chunk, CHUNK_SIZE, BLOCK_PALETTE
+
+
+class HeadlessGame(game.Game):
+    """不建立視窗的 Game：只填入網格、射線、碰撞與存檔用到的欄位，材質一律對應到 stone。"""
+
+    def __init__(self, world, region_dir=None):
+        self.world = world
+        self.chunk_size = CHUNK_SIZE
+        self.world_seed = 0
+        self.position = [0.5, 20.0, 0.5]
+        self.rotation = [0.0, 0.0]
+        self.player_height = 1.8; self.sneak_camera_offset_y = 0.25
+        self.is_sneaking = False
+        self.mode = "survival"
+        self.solid_lookup = SolidBlockLookup(world.palette, NON_SOLID_BLOCKS)
+        self.greedy_meshing = True
+        placeholder_group = object()
+        self.atlas_uvs = {"stone": (0.0, 0.0, 1.0, 1.0)}
+        self.atlas_group = self.atlas_no_cull_group = placeholder_group
+        self.repeat_texture_groups = {"stone": placeholder_group}
+        self.repeat_texture_no_cull_groups = {"stone": placeholder_group}
+        self.block_registry = BlockRegistry(world.palette, self.atlas_uvs)
+        self.sky_height_map = SkyHeightMap(self.block_registry)
+        if region_dir: self.region_storage = RegionStorage(region_dir)
+
+
+def _timed_rate(count, fn):
+    start_time = time.perf_counter()
+    for i in range(count): fn(i)
+    elapsed = time.perf_counter() - start_time
+    return {"calls": count, "seconds": round(elapsed, 4), "per_second": round(count / elapsed, 1)}
+
+
+def _generated_world(radius, seed=12345):
+    world = WorldStore()
+    for cx in range(-radius, radius + 1):
+        for cz in range(-radius, radius + 1):
+            terrain.generate_chunk(world, cx, cz, CHUNK_SIZE, rng=terrain.chunk_rng(seed, cx, cz), seed=seed)
+    return world
+
+
+def bench_generate_chunk(chunk_count):
+    results = {}
+    for label, use_numpy in (("python", False), ("numpy", True)):
+        if use_numpy and terrain.np is None:
+            results[label] = {"skipped": "numpy not installed"}
+            continue
+        results[label] = _timed_rate(chunk_count, lambda i: terrain.generate_chunk(
+            WorldStore(), i % 8 - 4, i // 8 - 4, CHUNK_SIZE, rng=random.Random(i), seed=12345, use_numpy=use_numpy))
+    return results
+
+
+def bench_chunk_meshing(world):
+    results = {}
+    chunk_keys = sorted(world.chunk_keys())
+    for label, greedy, packed in (("greedy", True, False), ("per_face", False, False), ("packed", True, True)):
+        headless = HeadlessGame(world)
+        headless.greedy_meshing = greedy
+        quad_count = vertex_bytes = 0
+        start_time = time.perf_counter()
+        for chunk_key in chunk_keys:
+            if packed:
+                # 著色器路徑：每個頂點 8 bytes；索引緩衝區所有區塊共用一份，不算在各區塊內
+                vertices, opaque_quads, transparent_quads = headless._packed_chunk_vertices({"stone": 0}, *chunk_key)
+                quad_count += opaque_quads + transparent_quads
+                vertex_bytes += vertices.itemsize * len(vertices)
+            else:
+                for vertices, tex_coords, colors in headless._chunk_group_arrays(*chunk_key).values():
+                    quad_count += len(vertices) // 12
+                    vertex_bytes += vertices.itemsize * (len(vertices) + len(tex_coords)) + colors.itemsize * len(colors)
+        elapsed = time.perf_counter() - start_time
+        results[label] = {"chunks": len(chunk_keys), "quads": quad_count, "gpu_bytes": vertex_bytes,
+                          "bytes_per_quad": round(vertex_bytes / max(quad_count, 1), 1), "seconds": round(elapsed, 4),
+                          "ms_per_chunk": round(elapsed * 1000 / len(chunk_keys), 3)}
+    results["packed"]["gpu_bytes_vs_greedy"] = round(results["packed"]["gpu_bytes"] / max(results["greedy"]["gpu_bytes"], 1), 3)
+    return results
+
+
+def bench_get_target_block(world, count):
+    headless = HeadlessGame(world)
+    rng = random.Random(1)
+    # 從地表上方往各方向看，包含打到地面與看向天空（走完整段距離）的情況
+    views = [(rng.uniform(-180, 180), rng.uniform(-89, 30)) for _ in range(256)]
+    def call(i):
+        headless.rotation[0], headless.rotation[1] = views[i % len(views)]
+        headless.get_target_block()
+    headless.position = [0.5, float(terrain.BASE_Y_LEVEL + 2), 0.5]
+    return _timed_rate(count, call)
+
+
+def bench_check_collision(world, count):
+    headless = HeadlessGame(world)
+    rng = random.Random(2)
+    positions = [(rng.uniform(-20, 20), rng.uniform(terrain.BASE_Y_LEVEL - 2, terrain.BASE_Y_LEVEL + 4), rng.uniform(-20, 20)) for _ in range(256)]
+    return _timed_rate(count, lambda i: headless.check_collision_bbox(*positions[i % len(positions)]))
+
+
+def _synthetic_chunks(block_count, seed=7):
+    """依方塊數建立合成世界：每個區塊由下往上堆滿隨機方塊，直到總數達到 block_count。"""
+    rng = random.Random(seed)
+    names = ["stone", "dirt", "grass_block", "cobblestone", "oak_planks", "sand", "gravel", "coal_ore"]
+    ids = [BLOCK_PALETTE.id_for(name) for name in names]
+    per_chunk = CHUNK_SIZE * CHUNK_SIZE * 64
+    chunks = []
+    remaining = block_count
+    side = math.ceil(math.sqrt(math.ceil(block_count / per_chunk)))
+    for index in range(side * side):
+        if remaining <= 0: break
+        chunk = Chunk(index % side, index // side)
+        for i in range(min(remaining, per_chunk)):
+            chunk.set_id(i & 15, i >> 8, (i >> 4) & 15, rng.choice(ids))
+        remaining -= min(remaining, per_chunk)
+        chunks.append(chunk)
+    return chunks
+
+
+def bench_world_storage(block_count):
+    chunks = _synthetic_chunks(block_count)
+    region_dir = tempfile.mkdtemp(prefix="mc_bench_")
+    try:
+        headless = HeadlessGame(WorldStore(), region_dir=region_dir)
+        bytes_written, save_seconds = headless._write_chunks_timed(chunks)
+        start_time = time.perf_counter()
+        loaded_blocks = 0
+        for cx, cz in headless.region_storage.chunk_keys():
+            loaded_blocks += headless.region_storage.load_chunk(cx, cz).block_count()
+        load_seconds = time.perf_counter() - start_time
+    finally:
+        shutil.rmtree(region_dir, ignore_errors=True)
+    return {"blocks": loaded_blocks, "chunks": len(chunks), "bytes": bytes_written,
+            "save_seconds": round(save_seconds, 4), "load_seconds": round(load_seconds, 4)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="存讀檔測試的合成世界方塊數，逗號分隔")
+    parser.add_argument("--chunks", type=int, default=32, help="地形生成測試的區塊數")
+    parser.add_argument("--calls", type=int, default=20000, help="射線與碰撞測試的呼叫次數")
+    parser.add_argument("--output", help="JSON 輸出路徑（預設印在標準輸出）")
+    args = parser.parse_args()
+
+    world = _generated_world(radius=2)
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": terrain.np.__version__ if terrain.np is not None else None,
+        "results": {
+            "generate_chunk": bench_generate_chunk(args.chunks),
+            "chunk_meshing": bench_chunk_meshing(world),
+            "get_target_block": bench_get_target_block(world, args.calls),
+            "check_collision_bbox": bench_check_collision(world, args.calls),
+            "world_storage": {size: bench_world_storage(int(size)) for size in args.sizes.split(",")},
+        },
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f: f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()